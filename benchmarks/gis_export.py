@@ -0,0 +1,46 @@
+# File: DilasaKMLTool_v4/benchmarks/gis_export.py
+# ----------------------------------------------------------------------
+# Purpose: Times the chunked GIS exporters (GeoJSON Lines, GeoPackage,
+#          FlatGeobuf) on a large synthetic polygon_data set.
+# Usage:   python -m benchmarks.gis_export [polygon_count]
+# ----------------------------------------------------------------------
+import os
+import sys
+import time
+import tempfile
+
+from core.geo_exporters import GIS_EXPORT_FORMATS
+from benchmarks.synthetic import make_polygon_records
+
+TEMPLATE_SIZE = 10000
+
+def _iter_records(polygon_count, template):
+    """Cycles a pre-generated template with fresh ids, so record generation stays out of the timing."""
+    for i in range(polygon_count):
+        record = dict(template[i % len(template)])
+        record["id"] = i + 1
+        record["uuid"] = f"bench-{i:08d}"
+        yield record
+
+def run(polygon_count=1000000):
+    template = list(make_polygon_records(TEMPLATE_SIZE))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for key, (name, ext, exporter) in GIS_EXPORT_FORMATS.items():
+            path = os.path.join(tmp_dir, f"bench{ext}")
+            start = time.perf_counter()
+            try:
+                written = exporter(_iter_records(polygon_count, template), path)
+            except RuntimeError as e:
+                print(f"{name}: skipped ({e})")
+                continue
+            results.append((name, written, time.perf_counter() - start, os.path.getsize(path)))
+
+    print(f"GIS export, {polygon_count} polygons")
+    print(f"{'format':<16} {'features':>10} {'seconds':>8} {'size MB':>9} {'features/s':>11}")
+    for name, written, seconds, size in results:
+        print(f"{name:<16} {written:>10} {seconds:>8.1f} {size / 1e6:>9.1f} {written / seconds:>11.0f}")
+    return results
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
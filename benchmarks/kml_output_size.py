@@ -0,0 +1,69 @@
+# File: DilasaKMLTool_v4/benchmarks/kml_output_size.py
+# ----------------------------------------------------------------------
+# Purpose: Compares file size, write time and load (parse) time of the KML
+#          output variants on a realistic consolidated export.
+# Usage:   python -m benchmarks.kml_output_size [polygon_count]
+# ----------------------------------------------------------------------
+import os
+import sys
+import time
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+import simplekml
+
+from core.kml_generator import (add_polygon_to_kml_object, create_shared_polygon_style, save_kml_document,
+                                open_kml_output, StreamingKMLWriter, DEFAULT_KML_COORDINATE_PRECISION)
+from benchmarks.synthetic import make_polygon_records
+
+def _write_simplekml(records, path, shared_style, precision, kmz=False):
+    doc = simplekml.Kml(name="Benchmark")
+    style = create_shared_polygon_style() if shared_style else None
+    for record in records:
+        add_polygon_to_kml_object(doc, record, style, precision)
+    save_kml_document(doc, path, kmz)
+
+def _write_streaming(records, path, precision, kmz=False):
+    with open_kml_output(path, kmz) as kml_file, StreamingKMLWriter(kml_file, "Benchmark", precision) as writer:
+        for record in records:
+            writer.add_polygon(record)
+
+def _load_time(path):
+    """Time to read and fully parse the document, a proxy for viewer load time."""
+    start = time.perf_counter()
+    if path.endswith(".kmz"):
+        with zipfile.ZipFile(path) as archive:
+            ET.fromstring(archive.read("doc.kml"))
+    else:
+        ET.parse(path)
+    return time.perf_counter() - start
+
+def run(polygon_count=50000):
+    records = list(make_polygon_records(polygon_count))
+    precision = DEFAULT_KML_COORDINATE_PRECISION
+    variants = [
+        ("simplekml, style per placemark, full precision (before)", "before.kml", lambda p: _write_simplekml(records, p, False, None)),
+        ("simplekml, shared style, full precision", "shared.kml", lambda p: _write_simplekml(records, p, True, None)),
+        (f"simplekml, shared style, {precision} decimals", "shared_q.kml", lambda p: _write_simplekml(records, p, True, precision)),
+        (f"streaming, shared style, {precision} decimals", "stream_q.kml", lambda p: _write_streaming(records, p, precision)),
+        (f"streaming, shared style, {precision} decimals, KMZ", "stream_q.kmz", lambda p: _write_streaming(records, p, precision, kmz=True)),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, file_name, write in variants:
+            path = os.path.join(tmp_dir, file_name)
+            start = time.perf_counter()
+            write(path)
+            write_seconds = time.perf_counter() - start
+            results.append((label, os.path.getsize(path), write_seconds, _load_time(path)))
+
+    baseline_size = results[0][1]
+    print(f"KML output comparison, {polygon_count} polygons")
+    print(f"{'variant':<58} {'size MB':>9} {'vs before':>10} {'write s':>8} {'load s':>7}")
+    for label, size, write_seconds, load_seconds in results:
+        print(f"{label:<58} {size / 1e6:>9.1f} {size / baseline_size:>9.0%} {write_seconds:>8.1f} {load_seconds:>7.2f}")
+    return results
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
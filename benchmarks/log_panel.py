@@ -0,0 +1,62 @@
+# File: DilasaKMLTool_v4/benchmarks/log_panel.py
+# ----------------------------------------------------------------------
+# Purpose: Compares logging a burst of messages (as a large import with
+#          many duplicate/error rows does) straight into a QTextEdit, the
+#          way the log panel used to, with the buffered LogPanel.
+# Usage:   python -m benchmarks.log_panel [message_count]
+# ----------------------------------------------------------------------
+import os
+import sys
+import time
+import tempfile
+
+from PySide6.QtWidgets import QApplication, QTextEdit
+from PySide6.QtGui import QColor
+
+from ui.widgets.log_panel import LogPanel
+
+DIRECT_SAMPLE_SIZE = 1000 # Per-message appends are timed on a sample and extrapolated, the full run takes minutes
+LEVEL_COLORS = {"info": "#0078D7", "error": "#D32F2F", "success": "#388E3C"}
+
+def _messages(message_count):
+    return [(f"Skipped duplicate RC 'RC-{i:07d}'.", "error" if i % 7 == 0 else "info") for i in range(message_count)]
+
+def _direct_append_seconds(app, messages):
+    text_edit = QTextEdit(); text_edit.setReadOnly(True); text_edit.resize(800, 300); text_edit.show()
+    start = time.perf_counter()
+    for message, level in messages:
+        text_edit.setTextColor(QColor(LEVEL_COLORS[level]))
+        text_edit.append(f"[{level.upper()}] {message}")
+        text_edit.ensureCursorVisible()
+    app.processEvents()
+    seconds = time.perf_counter() - start
+    text_edit.close()
+    return seconds
+
+def _log_panel_seconds(app, messages, log_file_path, detail=False):
+    panel = LogPanel(LEVEL_COLORS, "#333333", log_file_path); panel.resize(800, 300); panel.show()
+    start = time.perf_counter()
+    for i, (message, level) in enumerate(messages):
+        panel.log(message, level, detail)
+        if i % 1000 == 0: app.processEvents() # The import loop lets the event loop (and the flush timer) run now and then
+    panel.flush(); app.processEvents()
+    seconds = time.perf_counter() - start
+    panel.close_log_file(); panel.close()
+    return seconds
+
+def run(message_count=50000):
+    app = QApplication.instance() or QApplication(sys.argv)
+    messages = _messages(message_count)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample_size = min(message_count, DIRECT_SAMPLE_SIZE)
+        direct = _direct_append_seconds(app, messages[:sample_size]) * message_count / sample_size
+        buffered = _log_panel_seconds(app, messages, os.path.join(tmp_dir, "panel.log"))
+        detail = _log_panel_seconds(app, messages, os.path.join(tmp_dir, "detail.log"), detail=True)
+    print(f"Logging {message_count} messages")
+    print(f"  QTextEdit append per message    {direct:8.2f} s (extrapolated from {sample_size})")
+    print(f"  LogPanel (panel + file)         {buffered:8.2f} s")
+    print(f"  LogPanel detail (file only)     {detail:8.2f} s")
+    return direct, buffered, detail
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
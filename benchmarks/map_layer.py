@@ -0,0 +1,78 @@
+# File: DilasaKMLTool_v4/benchmarks/map_layer.py
+# ----------------------------------------------------------------------
+# Purpose: Times the map records layer: building the bbox grid index and
+#          answering pans at several zoom levels (index query, zoom
+#          simplification and JSON encoding of the page message), and the
+#          density grids used for zoomed-out views (full build, incremental
+#          update after a filter change, viewport lookup).
+# Usage:   python -m benchmarks.map_layer [polygon_count]
+# ----------------------------------------------------------------------
+import sys
+import json
+import time
+import random
+
+import numpy as np
+
+from core.geo_exporters import records_to_lonlat_rings
+from core.spatial_index import BBoxGridIndex, DensityGrids, ring_bboxes, viewport_layer
+from benchmarks.synthetic import make_polygon_records
+
+PANS_PER_ZOOM = 50
+DENSITY_CHANGED_FRACTION = 0.05 # Share of the records swapped out by the simulated filter change
+# Zoom level -> viewport size in degrees (about a 1200 x 800 pixel map panel)
+VIEWPORT_DEGREES = {zoom: (1200 * 360.0 / (256 * 2 ** zoom), 800 * 360.0 / (256 * 2 ** zoom)) for zoom in (7, 10, 13, 16, 18)}
+
+def run(polygon_count=100000):
+    rings, valid = records_to_lonlat_rings(list(make_polygon_records(polygon_count)))
+    rings = rings[valid]
+    ids = np.arange(1, len(rings) + 1)
+
+    start = time.perf_counter()
+    index = BBoxGridIndex(ring_bboxes(rings))
+    build_seconds = time.perf_counter() - start
+
+    # Pans centred on random polygons, so every viewport has plots in it
+    rng = random.Random(42)
+    results = []
+    for zoom, (width, height) in VIEWPORT_DEGREES.items():
+        timings, sizes, counts, in_view = [], [], [], []
+        for _ in range(PANS_PER_ZOOM):
+            lon, lat = rings[rng.randrange(len(rings)), 0]
+            viewport = (lon - width / 2, lat - height / 2, lon + width / 2, lat + height / 2)
+            start = time.perf_counter()
+            polygons, points = viewport_layer(index, rings, ids, viewport, zoom)
+            message = json.dumps({"type": "records", "polygons": polygons, "points": points})
+            timings.append(time.perf_counter() - start)
+            sizes.append(len(message)); counts.append((len(polygons), len(points))); in_view.append(len(index.query(*viewport)))
+        results.append((zoom, np.median(in_view), np.median(counts, axis=0), np.median(timings), max(timings), np.median(sizes)))
+
+    centroids = rings[:, :-1].mean(axis=1)
+    density_grids = DensityGrids()
+    start = time.perf_counter()
+    density_grids.sync(ids, centroids)
+    density_build_seconds = time.perf_counter() - start
+    # A filter change that drops some records and brings back as many others
+    changed = int(len(ids) * DENSITY_CHANGED_FRACTION)
+    start = time.perf_counter()
+    density_grids.sync(ids[changed:], centroids[changed:])
+    density_grids.sync(ids, centroids)
+    density_update_seconds = (time.perf_counter() - start) / 2
+    width, height = VIEWPORT_DEGREES[7]
+    lon, lat = centroids.mean(axis=0)
+    start = time.perf_counter()
+    cells, _, _ = density_grids.cells((lon - width / 2, lat - height / 2, lon + width / 2, lat + height / 2), 7)
+    message = json.dumps({"type": "records", "cells": cells})
+    density_query_seconds = time.perf_counter() - start
+
+    print(f"Map records layer, {len(rings)} polygons; index built in {build_seconds * 1000:.0f} ms ({index.nx} x {index.ny} cells)")
+    print(f"{'zoom':>4} {'in view':>8} {'polygons':>9} {'points':>7} {'median ms':>10} {'max ms':>7} {'msg KB':>7}")
+    print("(medians over the pans, except max ms)")
+    for zoom, in_view, (polygon_count_sent, point_count_sent), median, worst, size in results:
+        print(f"{zoom:>4} {in_view:>8.0f} {polygon_count_sent:>9.0f} {point_count_sent:>7.0f} {median * 1000:>10.1f} {worst * 1000:>7.1f} {size / 1024:>7.0f}")
+    print(f"Density grids: build {density_build_seconds * 1000:.0f} ms, update after a {changed}-record change "
+          f"{density_update_seconds * 1000:.0f} ms, zoom 7 view {len(cells)} cells in {density_query_seconds * 1000:.1f} ms ({len(message) / 1024:.0f} KB)")
+    return build_seconds, results
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,96 @@
+# File: DilasaKMLTool_v4/benchmarks/startup.py
+# ----------------------------------------------------------------------
+# Purpose: Tracks application startup cost in fresh interpreters:
+#          import time of ui.main_window per top-level package (parsed
+#          from python -X importtime), whether any of the heavy modules
+#          that should load on first use were imported at startup, and
+#          the time from process start to the main window's first paint
+#          (run against an empty temporary database).
+# Usage:   python -m benchmarks.startup [runs]
+# ----------------------------------------------------------------------
+import os
+import sys
+import time
+import tempfile
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_MODULE = "ui.main_window"
+# Only needed by specific features; none of these should be imported before the main window is shown
+DEFERRED_MODULES = ["folium", "branca", "geopandas", "ee", "requests", "simplekml", "PySide6.QtWebEngineWidgets"]
+FIRST_PAINT_TIMEOUT_MS = 60000
+TOP_PACKAGES_SHOWN = 12
+
+def parse_importtime(stderr_text):
+    """{module: (self_us, cumulative_us)} from the "import time:" lines of python -X importtime output."""
+    modules = {}
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def import_times(module=STARTUP_MODULE):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen")))
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+def _measure_first_paint():
+    """Runs in the child process: builds the main window like main_app.py and prints the seconds to its first paint."""
+    start = time.perf_counter()
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QObject, QEvent, QTimer
+    from ui.widgets.map_view_widget import register_tile_url_scheme
+    register_tile_url_scheme()
+    app = QApplication(sys.argv)
+    from ui.main_window import MainWindow
+    window = MainWindow()
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Type.Paint and watched is window:
+                print(f"{time.perf_counter() - start:.4f}", flush=True)
+                window.removeEventFilter(self)
+                QTimer.singleShot(0, app.quit)
+            return False
+
+    paint_filter = FirstPaintFilter()
+    window.installEventFilter(paint_filter)
+    QTimer.singleShot(FIRST_PAINT_TIMEOUT_MS, app.quit)
+    window.show()
+    app.exec()
+    window.close()
+
+def first_paint_seconds():
+    with tempfile.TemporaryDirectory() as app_data_dir:
+        result = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--first-paint"], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                                env=dict(os.environ, APPDATA=app_data_dir, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen")))
+    lines = result.stdout.strip().splitlines()
+    try: return float(lines[-1])
+    except (IndexError, ValueError):
+        raise RuntimeError(f"first paint not reached: {(result.stderr.strip().splitlines() or ['no output'])[-1]}")
+
+def run(runs=3):
+    modules = import_times()
+    total_us = modules[STARTUP_MODULE][1]
+    by_package = {}
+    for name, (self_us, _) in modules.items():
+        by_package[name.split(".")[0]] = by_package.get(name.split(".")[0], 0) + self_us
+    loaded_deferred = [name for name in DEFERRED_MODULES if name in modules]
+
+    print(f"import {STARTUP_MODULE}: {total_us / 1000:.0f} ms, {len(modules)} modules")
+    print(f"{'package':<24} {'self ms':>8}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:TOP_PACKAGES_SHOWN]:
+        print(f"{package:<24} {self_us / 1000:>8.1f}")
+    print(f"Deferred modules imported at startup: {', '.join(loaded_deferred) if loaded_deferred else 'none'}")
+
+    paint_times = [first_paint_seconds() for _ in range(runs)]
+    print(f"Time to first paint: median {statistics.median(paint_times):.2f} s over {runs} run(s) (min {min(paint_times):.2f} s)")
+    return total_us / 1e6, loaded_deferred, paint_times
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--first-paint"]: _measure_first_paint()
+    else: run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
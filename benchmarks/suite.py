@@ -0,0 +1,252 @@
+# File: DilasaKMLTool_v4/benchmarks/suite.py
+# ----------------------------------------------------------------------
+# Purpose: Regression benchmark suite for the import, DB, KML and table
+#          hot paths. Every case times one stage over a number of rows
+#          (1k / 100k / 1M) on synthetic data, the median of a few runs is
+#          saved as a JSON baseline, and "compare" reports the cases that
+#          got slower than the baseline by more than a threshold (exit
+#          code 1 when there are regressions, so it can gate a CI job).
+# Usage:   python -m benchmarks.suite run [--sizes 1k,100k] [--cases ...] [--output results.json]
+#          python -m benchmarks.suite run --baseline benchmarks/baselines/<machine>.json
+#          python -m benchmarks.suite compare BASELINE.json RESULTS.json [--threshold 0.15]
+# ----------------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import datetime
+import argparse
+import tempfile
+import functools
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINES_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "baselines")
+SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+DEFAULT_SIZES = ["1k", "100k"] # 1m takes several minutes per case; ask for it explicitly
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.15 # Relative slowdown reported as a regression
+MIN_SIGNIFICANT_SECONDS = 0.005 # Differences below this are timer noise whatever the ratio
+
+# --- Synthetic inputs, built once per size and shared by the cases ---
+@functools.lru_cache(maxsize=2)
+def _csv_rows(size):
+    from benchmarks.synthetic import make_csv_rows
+    return list(make_csv_rows(size))
+
+@functools.lru_cache(maxsize=2)
+def _processed_records(size):
+    from core.data_processor import process_csv_row_data
+    return [process_csv_row_data(row) for row in _csv_rows(size)]
+
+@functools.lru_cache(maxsize=2)
+def _display_rows(size):
+    from benchmarks.synthetic import make_display_rows
+    return make_display_rows(size)
+
+def _qt_app():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv)
+
+class _TemporaryDatabase:
+    """A DatabaseManager on an empty database in a temporary AppData folder."""
+    def __enter__(self):
+        from database.db_manager import DatabaseManager
+        self.folder = tempfile.mkdtemp(prefix="dilasa_bench_")
+        self.previous_app_data = os.environ.get("APPDATA")
+        os.environ["APPDATA"] = self.folder
+        self.db_manager = DatabaseManager()
+        return self.db_manager
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.db_manager.close()
+        if self.previous_app_data is None: os.environ.pop("APPDATA", None)
+        else: os.environ["APPDATA"] = self.previous_app_data
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+# --- Cases: case(size, timer) runs the stage under "with timer:" and may return extra metrics ---
+class _Timer:
+    """Accumulates the time spent inside "with timer:" blocks, so case setup is not measured."""
+    def __init__(self): self.seconds = 0.0
+    def __enter__(self): self._start = time.perf_counter()
+    def __exit__(self, exc_type, exc_value, traceback): self.seconds += time.perf_counter() - self._start
+
+def case_parse_utm_string(size, timer):
+    from core.data_processor import CSV_HEADERS, parse_utm_string
+    utm_strings = [row[CSV_HEADERS["p1_utm"]] for row in _csv_rows(size)]
+    with timer:
+        for utm_string in utm_strings: parse_utm_string(utm_string)
+
+def case_process_csv_row_data(size, timer):
+    from core.data_processor import process_csv_row_data
+    rows = _csv_rows(size)
+    with timer:
+        for row in rows: process_csv_row_data(row)
+
+def case_add_or_update_polygon_data(size, timer):
+    records = [dict(record) for record in _processed_records(size)]
+    with _TemporaryDatabase() as db_manager:
+        with timer:
+            for record in records: db_manager.add_or_update_polygon_data(record)
+
+def case_bulk_add_polygon_data(size, timer):
+    records = _processed_records(size)
+    with _TemporaryDatabase() as db_manager:
+        with timer: db_manager.bulk_add_polygon_data(records)
+
+def case_add_polygon_to_kml_object(size, timer):
+    import simplekml
+    from core.kml_generator import add_polygon_to_kml_object, create_shared_polygon_style
+    from benchmarks.synthetic import make_polygon_records
+    records = list(make_polygon_records(size))
+    with timer:
+        kml_document = simplekml.Kml(name="benchmark")
+        shared_style = create_shared_polygon_style()
+        for record in records: add_polygon_to_kml_object(kml_document, record, shared_style)
+
+def case_filter_accepts_row(size, timer):
+    # A filter change: one NumPy mask over all rows and one remap of the visible rows
+    from PySide6.QtCore import QDate
+    from ui.main_window import PolygonTableModel, PolygonFilterProxyModel
+    _qt_app()
+    model = PolygonTableModel()
+    model.update_data(_display_rows(size))
+    proxy = PolygonFilterProxyModel()
+    proxy.setSourceModel(model)
+    with timer:
+        proxy.set_filters("3a", QDate(2024, 3, 1), QDate(2024, 6, 30), "Not Exported", "All")
+        visible_rows = proxy.rowCount()
+    return {"visible_rows": visible_rows}
+
+def case_table_model_data(size, timer):
+    # size data() calls spread over a size-row table, cycling through the roles a repaint asks for
+    from PySide6.QtCore import Qt
+    from ui.main_window import PolygonTableModel
+    _qt_app()
+    model = PolygonTableModel()
+    model.update_data(_display_rows(size))
+    roles = [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.FontRole, Qt.ItemDataRole.ForegroundRole, Qt.ItemDataRole.TextAlignmentRole,
+             Qt.ItemDataRole.CheckStateRole, Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.BackgroundRole]
+    column_count = model.columnCount()
+    calls = [(model.index(row, row % column_count), roles[row % len(roles)]) for row in range(size)]
+    with timer:
+        for index, role in calls: model.data(index, role)
+
+def case_csv_to_kml(size, timer):
+    # The whole headless flow: CSV file -> processed rows -> DB -> one consolidated KML
+    import csv
+    from core.batch_jobs import import_rows, iter_csv_rows, export_kml
+    rows = _csv_rows(size)
+    with _TemporaryDatabase() as db_manager:
+        csv_path = os.path.join(os.environ["APPDATA"], "survey.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8-sig") as csv_file:
+            writer = csv.DictWriter(csv_file, list(rows[0]))
+            writer.writeheader(); writer.writerows(rows)
+        with timer:
+            imported = import_rows(db_manager, iter_csv_rows(csv_path))
+            exported = export_kml(db_manager, db_manager.get_all_valid_for_kml_ids(), os.path.join(os.environ["APPDATA"], "kml"))
+    return {"import_seconds": imported["seconds"]["total"], "export_seconds": exported["seconds"]["total"], "exported": exported["exported"]}
+
+CASES = {
+    "parse_utm_string": case_parse_utm_string,
+    "process_csv_row_data": case_process_csv_row_data,
+    "add_or_update_polygon_data": case_add_or_update_polygon_data,
+    "bulk_add_polygon_data": case_bulk_add_polygon_data,
+    "add_polygon_to_kml_object": case_add_polygon_to_kml_object,
+    "filter_accepts_row": case_filter_accepts_row,
+    "table_model_data": case_table_model_data,
+    "csv_to_kml": case_csv_to_kml,
+}
+
+# --- Running and comparing ---
+def _git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError: return None
+
+def run_suite(case_names=None, size_labels=DEFAULT_SIZES, repeat=DEFAULT_REPEAT):
+    """
+    Runs the cases at the given sizes and returns the results document:
+    {"meta": {...}, "results": {"<case>@<size>": {"seconds", "runs", "per_row_us", ...extra metrics}}}.
+    """
+    results = {}
+    for size_label in size_labels:
+        size = SIZES[size_label]
+        for case_name in case_names or CASES:
+            runs, extra = [], {}
+            for _ in range(repeat):
+                timer = _Timer()
+                extra = CASES[case_name](size, timer) or {}
+                runs.append(timer.seconds)
+            seconds = statistics.median(runs)
+            results[f"{case_name}@{size_label}"] = dict(extra, seconds=seconds, runs=runs, per_row_us=seconds / size * 1e6)
+            print(f"{case_name + '@' + size_label:<36} {seconds:10.4f} s  {seconds / size * 1e6:9.2f} us/row", flush=True)
+    meta = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "commit": _git_commit(), "python": platform.python_version(),
+            "platform": platform.platform(), "machine": platform.node(), "repeat": repeat}
+    return {"meta": meta, "results": results}
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Prints a case-by-case comparison of two results documents and returns the keys that regressed:
+    slower than the baseline by more than threshold (relative) and MIN_SIGNIFICANT_SECONDS (absolute).
+    """
+    regressions = []
+    print(f"Baseline: {baseline['meta'].get('commit')} ({baseline['meta'].get('created')}), "
+          f"current: {current['meta'].get('commit')} ({current['meta'].get('created')}), threshold {threshold:.0%}")
+    print(f"{'case':<36} {'baseline s':>11} {'current s':>11} {'change':>8}")
+    for key in sorted(set(baseline["results"]) | set(current["results"])):
+        if key not in baseline["results"] or key not in current["results"]:
+            print(f"{key:<36} {'only in ' + ('current' if key in current['results'] else 'baseline'):>32}"); continue
+        before, after = baseline["results"][key]["seconds"], current["results"][key]["seconds"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if abs(after - before) >= MIN_SIGNIFICANT_SECONDS:
+            if change > threshold: flag = "REGRESSION"; regressions.append(key)
+            elif change < -threshold: flag = "faster"
+        print(f"{key:<36} {before:>11.4f} {after:>11.4f} {change:>+8.1%} {flag}")
+    print(f"{len(regressions)} regression(s)" + (f": {', '.join(regressions)}" if regressions else ""))
+    return regressions
+
+def _load(path):
+    with open(path, encoding="utf-8") as results_file: return json.load(results_file)
+
+def _save(document, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as results_file: json.dump(document, results_file, indent=2)
+    print(f"Results saved to {path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="Regression benchmarks for the import, DB, KML and table hot paths.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmark cases")
+    run_parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help=f"Comma-separated sizes out of {', '.join(SIZES)}")
+    run_parser.add_argument("--cases", help=f"Comma-separated cases (default: all): {', '.join(CASES)}")
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--output", default=os.path.join(BASELINES_DIR, f"{platform.node() or 'local'}.json"),
+                            help="Where the results are written (default: the baseline file of this machine)")
+    run_parser.add_argument("--baseline", help="Compare the new results against this baseline instead of overwriting it")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        return 1 if compare_results(_load(args.baseline), _load(args.current), args.threshold) else 0
+    size_labels = [label.strip().lower() for label in args.sizes.split(",") if label.strip()]
+    case_names = [name.strip() for name in args.cases.split(",")] if args.cases else None
+    unknown = [label for label in size_labels if label not in SIZES] + [name for name in case_names or [] if name not in CASES]
+    if unknown: parser.error(f"unknown size(s)/case(s): {', '.join(unknown)}")
+    document = run_suite(case_names, size_labels, args.repeat)
+    if args.baseline:
+        output = args.output if args.output != run_parser.get_default("output") else os.path.join(tempfile.gettempdir(), "dilasa_benchmark_results.json")
+        _save(document, output)
+        return 1 if compare_results(_load(args.baseline), document, args.threshold) else 0
+    _save(document, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# File: DilasaKMLTool_v4/benchmarks/survey_csv.py
+# ----------------------------------------------------------------------
+# Purpose: Writes large synthetic mWater survey exports (exactly the
+#          CSV_HEADERS columns, UTF-8 with BOM like mWater) for load tests,
+#          so scale problems can be reproduced without farmer data. Plots
+#          are UTM quads clustered in villages of a District > Block >
+#          Village hierarchy with a skewed plot count per village, inside
+#          the chosen zones. Configurable shares of points are left blank,
+#          malformed or written in the neighbouring UTM zone, and of rows
+#          are re-exported with an earlier Response Code. Rows are streamed
+#          to disk, so tens of millions of rows need no extra memory.
+# Usage:   python -m benchmarks.survey_csv OUTPUT.csv [--rows 1000000] [--zones 43Q,44Q]
+#          [--missing-rate 0.02] [--malformed-rate 0.01] [--cross-zone-rate 0.005] [--duplicate-rate 0.01]
+# ----------------------------------------------------------------------
+import csv
+import sys
+import time
+import uuid
+import random
+import argparse
+import itertools
+
+import utm
+
+from core.data_processor import CSV_HEADERS
+
+DEFAULT_ZONES = ["43Q", "44Q"]
+DEFAULT_MISSING_RATE = 0.02 # Share of points left blank
+DEFAULT_MALFORMED_RATE = 0.01 # Share of points with an unparseable UTM string
+DEFAULT_CROSS_ZONE_RATE = 0.005 # Share of points written in the neighbouring UTM zone
+DEFAULT_DUPLICATE_RATE = 0.01 # Share of rows repeating an earlier response (same Response Code and UUID)
+DEFAULT_DISTRICTS = 12
+DEFAULT_BLOCKS_PER_DISTRICT = 10
+DEFAULT_VILLAGES_PER_BLOCK = 40
+VILLAGE_SIZE_SKEW = 0.8 # Zipf exponent of plots per village: a few villages hold many of the plots
+DUPLICATE_POOL_SIZE = 10000 # Recent rows a duplicate is drawn from
+ROWS_PER_BATCH = 10000
+PROGRESS_EVERY_ROWS = 1000000
+UTM_BAND_LETTERS = "CDEFGHJKLMNPQRSTUVWX"
+METRES_PER_DEGREE_LATITUDE = 110574.0
+
+VILLAGE_PREFIXES = ["Wad", "Pim", "Shir", "Kan", "Bor", "Dhan", "Ked", "Mal", "Sav", "Nim", "Ran", "Pal", "Kol", "Ane", "Jam",
+                    "Sang", "Tak", "Ural", "Deo", "Khar", "Mhas", "Nandur", "Pathar", "Sonar", "Vadgaon", "Ambe", "Chinch", "Gho"]
+VILLAGE_SUFFIXES = ["gaon", "pur", "wadi", "ner", "khed", "ale", "oli", "ade", "vali", "shet", "ali", "ur"]
+SAME_NAME_QUALIFIERS = ["Bk.", "Kh.", "Budruk", "Khurd", "Tarf"]
+FIRST_NAMES = ["Sunil", "Ramesh", "Sanjay", "Vitthal", "Dnyaneshwar", "Balu", "Sakharam", "Anil", "Ganesh", "Kisan", "Pandurang",
+               "Suresh", "Shivaji", "Dattatray", "Namdev", "Sunita", "Sangita", "Manisha", "Anita", "Lata", "Savita", "Kalpana"]
+SURNAMES = ["Pawar", "Jadhav", "Shinde", "More", "Gaikwad", "Kale", "Bhosale", "Patil", "Kadam", "Chavan", "Deshmukh", "Salunkhe",
+            "Wagh", "Mane", "Thorat", "Kharat", "Ghuge", "Sonawane", "Waghmare", "Borse"]
+
+def parse_zone(zone_designator):
+    """'43Q' -> (43, 'Q'), with the easting and northing ranges plots are drawn from."""
+    zone_number, zone_letter = int(zone_designator[:-1]), zone_designator[-1].upper()
+    if not 1 <= zone_number <= 60 or zone_letter not in UTM_BAND_LETTERS: raise ValueError(f"Not a UTM zone: '{zone_designator}'")
+    lat_min = -80 + 8 * UTM_BAND_LETTERS.index(zone_letter)
+    false_northing = 10000000 if lat_min < 0 else 0
+    northing_range = (false_northing + lat_min * METRES_PER_DEGREE_LATITUDE, false_northing + (lat_min + 8) * METRES_PER_DEGREE_LATITUDE)
+    return zone_number, zone_letter, (200000, 800000), northing_range
+
+def build_villages(zones, districts=DEFAULT_DISTRICTS, blocks_per_district=DEFAULT_BLOCKS_PER_DISTRICT,
+                   villages_per_block=DEFAULT_VILLAGES_PER_BLOCK, rng=None):
+    """
+    Returns [(zone_number, zone_letter, village_easting, village_northing, village, block, district), ...].
+    Districts are spread over the zones; blocks lie within ~25 km of their district centre and
+    villages within ~8 km of their block centre, so plots form realistic clusters.
+    """
+    rng = rng or random.Random(0)
+    parsed_zones = [parse_zone(zone) for zone in zones]
+    used_village_names = set()
+    villages = []
+    for district_index in range(districts):
+        zone_number, zone_letter, (e_min, e_max), (n_min, n_max) = parsed_zones[district_index % len(parsed_zones)]
+        district = f"{rng.choice(VILLAGE_PREFIXES)}{rng.choice(VILLAGE_SUFFIXES)}".title()
+        district_e, district_n = rng.uniform(e_min + 40000, e_max - 40000), rng.uniform(n_min + 40000, n_max - 40000)
+        for _ in range(blocks_per_district):
+            block = f"{rng.choice(VILLAGE_PREFIXES)}{rng.choice(VILLAGE_SUFFIXES)}".title()
+            block_e, block_n = district_e + rng.uniform(-25000, 25000), district_n + rng.uniform(-25000, 25000)
+            for _ in range(villages_per_block):
+                base_name = f"{rng.choice(VILLAGE_PREFIXES)}{rng.choice(VILLAGE_SUFFIXES)}"
+                # Same-named villages are told apart the way revenue records do, then by number
+                candidates = itertools.chain([base_name], (f"{base_name} {part}" for part in SAME_NAME_QUALIFIERS), (f"{base_name} {n}" for n in itertools.count(2)))
+                name = next(candidate for candidate in candidates if candidate not in used_village_names)
+                used_village_names.add(name)
+                villages.append((zone_number, zone_letter, block_e + rng.uniform(-8000, 8000), block_n + rng.uniform(-8000, 8000), name, block, district))
+    return villages
+
+def _malformed_utm(zone_number, zone_letter, easting, northing, rng):
+    """One of the ways surveyors mistype a UTM point. Every variant fails parse_utm_string."""
+    easting_text = f"{easting:.0f}"
+    # Letter O typed for a zero in the easting (for the last digit if the easting has no zero), so the point never parses
+    easting_typo = easting_text.replace("0", "O", 1) if "0" in easting_text else easting_text[:-1] + "O"
+    return rng.choice([
+        f"{zone_number}{zone_letter} {easting:.0f}",                            # Northing missing
+        f"{zone_number} {easting:.0f} {northing:.0f}",                          # Zone letter missing
+        f"{zone_number}{zone_letter} {easting:.0f}, {northing:.0f}",            # Comma separated
+        f"{zone_number}{zone_letter} {easting_typo} {northing:.0f}",            # Letter O for zero
+        f"{zone_number}{zone_letter}{easting:.0f} {northing:.0f}",              # Zone run into the easting
+        f"{rng.uniform(16, 22):.6f}, {rng.uniform(73, 80):.6f}",                # Lat/lon typed instead
+    ])
+
+def _cross_zone_utm(zone_number, zone_letter, easting, northing):
+    """The same point written in the neighbouring zone, as GPS units near a zone edge report it."""
+    lat, lon = utm.to_latlon(easting, northing, zone_number, zone_letter)
+    neighbour = zone_number + 1 if easting >= 500000 else zone_number - 1
+    neighbour = (neighbour - 1) % 60 + 1
+    cross_easting, cross_northing, _, _ = utm.from_latlon(lat, lon, force_zone_number=neighbour, force_zone_letter=zone_letter)
+    return f"{neighbour}{zone_letter} {cross_easting:.0f} {cross_northing:.0f}"
+
+def iter_survey_rows(count, zones=DEFAULT_ZONES, missing_rate=DEFAULT_MISSING_RATE, malformed_rate=DEFAULT_MALFORMED_RATE,
+                     cross_zone_rate=DEFAULT_CROSS_ZONE_RATE, duplicate_rate=DEFAULT_DUPLICATE_RATE, villages=None, seed=42, stats=None):
+    """
+    Yields count rows as lists in CSV_HEADERS order.
+
+    Args:
+        stats (dict, optional): Updated with what was injected: duplicates, missing_points, malformed_points,
+                                cross_zone_points, and rows by their number of bad points (bad_points_0 .. bad_points_4,
+                                where 1 exercises point substitution and 2+ the too-many-missing error).
+    """
+    rng = random.Random(seed)
+    villages = list(villages or build_villages(zones, rng=random.Random(seed)))
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) ** VILLAGE_SIZE_SKEW for rank in range(len(villages))))
+    rng.shuffle(villages) # Which villages are the big ones is random, not tied to the hierarchy order
+    stats = stats if stats is not None else {}
+    for key in ["rows", "duplicates", "missing_points", "malformed_points", "cross_zone_points"] + [f"bad_points_{i}" for i in range(5)]:
+        stats.setdefault(key, 0)
+    point_fault_rate = missing_rate + malformed_rate + cross_zone_rate
+    duplicate_pool = []
+    response_code = 100000000 + rng.randrange(100000000)
+    emitted = 0
+    while emitted < count:
+        for village in rng.choices(villages, cum_weights=cum_weights, k=min(ROWS_PER_BATCH, count - emitted)):
+            emitted += 1; stats["rows"] += 1
+            if duplicate_pool and rng.random() < duplicate_rate:
+                stats["duplicates"] += 1
+                yield duplicate_pool[rng.randrange(len(duplicate_pool))]
+                continue
+            zone_number, zone_letter, village_e, village_n, village_name, block, district = village
+            base_e, base_n = village_e + rng.uniform(-1500, 1500), village_n + rng.uniform(-1500, 1500)
+            width, height = rng.uniform(40, 160), rng.uniform(40, 160) # 0.4 to 6 acre plots
+            base_alt = rng.uniform(200, 700)
+            response_code += rng.randint(1, 40)
+            row = [str(uuid.UUID(int=rng.getrandbits(128), version=4)), str(response_code),
+                   f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}", village_name, block, district,
+                   f"{width * height / 4046.86:.2f}"]
+            bad_points = 0
+            for de, dn in ((0, 0), (width, 0), (width, height), (0, height)):
+                easting, northing = base_e + de + rng.uniform(-3, 3), base_n + dn + rng.uniform(-3, 3)
+                altitude = f"{base_alt + rng.uniform(-2, 2):.1f}"
+                fault = rng.random() if point_fault_rate else 1.0
+                if fault < missing_rate:
+                    utm_str, altitude = "", ""; stats["missing_points"] += 1; bad_points += 1
+                elif fault < missing_rate + malformed_rate:
+                    utm_str = _malformed_utm(zone_number, zone_letter, easting, northing, rng); stats["malformed_points"] += 1; bad_points += 1
+                elif fault < point_fault_rate:
+                    utm_str = _cross_zone_utm(zone_number, zone_letter, easting, northing); stats["cross_zone_points"] += 1
+                else:
+                    utm_str = f"{zone_number}{zone_letter} {easting:.0f} {northing:.0f}"
+                row += [utm_str, altitude]
+            stats[f"bad_points_{bad_points}"] += 1
+            if len(duplicate_pool) < DUPLICATE_POOL_SIZE: duplicate_pool.append(row)
+            else: duplicate_pool[rng.randrange(DUPLICATE_POOL_SIZE)] = row
+            yield row
+
+def write_survey_csv(output_path, count, progress=True, **options):
+    """Streams count rows (see iter_survey_rows for the options) to output_path. Returns the injected-data stats."""
+    stats = {}
+    start = time.perf_counter()
+    with open(output_path, "w", newline="", encoding="utf-8-sig") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(CSV_HEADERS.values())
+        rows = iter_survey_rows(count, stats=stats, **options)
+        while True:
+            batch = list(itertools.islice(rows, ROWS_PER_BATCH))
+            if not batch: break
+            writer.writerows(batch)
+            if progress and stats["rows"] % PROGRESS_EVERY_ROWS < len(batch):
+                print(f"  {stats['rows']} rows written ({time.perf_counter() - start:.0f} s)", file=sys.stderr, flush=True)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.survey_csv", description="Write a synthetic mWater survey export for load tests.")
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--zones", default=",".join(DEFAULT_ZONES), help="Comma-separated UTM zones, e.g. 43Q,44Q")
+    parser.add_argument("--missing-rate", type=float, default=DEFAULT_MISSING_RATE)
+    parser.add_argument("--malformed-rate", type=float, default=DEFAULT_MALFORMED_RATE)
+    parser.add_argument("--cross-zone-rate", type=float, default=DEFAULT_CROSS_ZONE_RATE)
+    parser.add_argument("--duplicate-rate", type=float, default=DEFAULT_DUPLICATE_RATE)
+    parser.add_argument("--districts", type=int, default=DEFAULT_DISTRICTS)
+    parser.add_argument("--blocks-per-district", type=int, default=DEFAULT_BLOCKS_PER_DISTRICT)
+    parser.add_argument("--villages-per-block", type=int, default=DEFAULT_VILLAGES_PER_BLOCK)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    zones = [zone.strip() for zone in args.zones.split(",") if zone.strip()]
+    villages = build_villages(zones, args.districts, args.blocks_per_district, args.villages_per_block, random.Random(args.seed))
+    stats = write_survey_csv(args.output, args.rows, zones=zones, missing_rate=args.missing_rate, malformed_rate=args.malformed_rate,
+                             cross_zone_rate=args.cross_zone_rate, duplicate_rate=args.duplicate_rate, villages=villages, seed=args.seed)
+    print(f"{stats['rows']} rows in {len(villages)} villages written to {args.output} in {stats['seconds']:.1f} s "
+          f"({stats['rows'] / stats['seconds']:.0f} rows/s)")
+    print(f"  duplicate responses {stats['duplicates']}, missing points {stats['missing_points']}, "
+          f"malformed points {stats['malformed_points']}, cross-zone points {stats['cross_zone_points']}")
+    print("  rows by bad points: " + ", ".join(f"{i}: {stats[f'bad_points_{i}']}" for i in range(5))
+          + " (1 is substituted, 2+ is an error)")
+    return stats
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# File: DilasaKMLTool_v4/benchmarks/synthetic.py
+# ----------------------------------------------------------------------
+# Purpose: Builds realistic, fully synthetic polygon records (as stored in
+#          polygon_data) for benchmarks, so no farmer data is needed.
+# ----------------------------------------------------------------------
+import random
+
+# (zone_num, zone_letter, easting range, northing range) roughly covering Maharashtra
+SURVEY_ZONES = [
+    (43, "Q", (300000, 780000), (1800000, 2360000)),
+    (44, "Q", (200000, 560000), (1800000, 2360000)),
+]
+
+def make_polygon_record(record_index, rng):
+    """Returns one valid_for_kml record shaped like a polygon_data row (without id)."""
+    zone_num, zone_letter, (e_min, e_max), (n_min, n_max) = rng.choice(SURVEY_ZONES)
+    # Plots cluster around villages, so draw the village centre first
+    village_index = rng.randrange(2000)
+    village_rng = random.Random(village_index * 7919 + zone_num)
+    village_e = village_rng.uniform(e_min, e_max)
+    village_n = village_rng.uniform(n_min, n_max)
+    base_e = village_e + rng.uniform(-1500, 1500)
+    base_n = village_n + rng.uniform(-1500, 1500)
+    width, height = rng.uniform(40, 160), rng.uniform(40, 160) # 0.4 to 6 acre plots
+    corners = [(0, 0), (width, 0), (width, height), (0, height)]
+    base_alt = rng.uniform(200, 700)
+
+    record = {
+        "uuid": f"{record_index:08d}-{rng.getrandbits(32):08x}-synthetic",
+        "response_code": f"SYN-{record_index:08d}",
+        "farmer_name": f"Farmer {record_index}",
+        "village_name": f"Village {village_index}",
+        "block": f"Block {village_index // 40}",
+        "district": f"District {village_index // 400}",
+        "proposed_area_acre": f"{width * height / 4046.86:.2f}",
+        "status": "valid_for_kml",
+        "error_messages": None,
+    }
+    for i, (de, dn) in enumerate(corners, start=1):
+        easting = round(base_e + de + rng.uniform(-3, 3), 2)
+        northing = round(base_n + dn + rng.uniform(-3, 3), 2)
+        record.update({
+            f"p{i}_utm_str": f"{zone_num}{zone_letter} {easting} {northing}",
+            f"p{i}_altitude": round(base_alt + rng.uniform(-2, 2), 1),
+            f"p{i}_easting": easting, f"p{i}_northing": northing,
+            f"p{i}_zone_num": zone_num, f"p{i}_zone_letter": zone_letter,
+            f"p{i}_substituted": False,
+        })
+    return record
+
+def make_polygon_records(count, seed=42):
+    """Yields count synthetic records, with ids 1..count like rows fetched from the DB."""
+    rng = random.Random(seed)
+    for record_index in range(count):
+        record = make_polygon_record(record_index, rng)
+        record["id"] = record_index + 1
+        yield record
+
+def make_display_rows(count, error_rate=0.03, exported_rate=0.4, seed=42):
+    """
+    Returns count tuples shaped like get_all_polygon_data_for_display rows:
+    (id, status, uuid, farmer_name, village_name, date_added, kml_export_count, last_kml_export_date).
+    """
+    rng = random.Random(seed)
+    rows = []
+    for record_index in range(count):
+        status = "error_too_many_missing_points" if rng.random() < error_rate else "valid_for_kml"
+        date_added = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+        exported = rng.random() < exported_rate
+        rows.append((record_index + 1, status, f"{record_index:08d}-{rng.getrandbits(32):08x}-synthetic",
+                     f"Farmer {record_index}", f"Village {rng.randrange(2000)}", date_added,
+                     rng.randint(1, 12) if exported else 0, "2025-01-15T10:00:00" if exported else None))
+    return rows
+
+def make_csv_rows(count, seed=42):
+    """Yields count rows shaped like csv.DictReader rows of an mWater export (CSV_HEADERS columns), all valid."""
+    from core.data_processor import CSV_HEADERS
+    for record in make_polygon_records(count, seed):
+        row = {CSV_HEADERS["uuid"]: record["uuid"], CSV_HEADERS["response_code"]: record["response_code"],
+               CSV_HEADERS["farmer_name"]: record["farmer_name"], CSV_HEADERS["village"]: record["village_name"],
+               CSV_HEADERS["block"]: record["block"], CSV_HEADERS["district"]: record["district"],
+               CSV_HEADERS["area"]: record["proposed_area_acre"]}
+        for i in range(1, 5):
+            row[CSV_HEADERS[f"p{i}_utm"]] = record[f"p{i}_utm_str"]
+            row[CSV_HEADERS[f"p{i}_alt"]] = str(record[f"p{i}_altitude"])
+        yield row
@@ -0,0 +1,42 @@
+# File: DilasaKMLTool_v4/benchmarks/table_export.py
+# ----------------------------------------------------------------------
+# Purpose: Times the displayed-table exporters (CSV, XLSX, Parquet) on a
+#          large synthetic table, the way the main window feeds them:
+#          a column snapshot plus the indexes of the visible rows.
+# Usage:   python -m benchmarks.table_export [row_count]
+# ----------------------------------------------------------------------
+import os
+import sys
+import time
+import tempfile
+
+from core.table_exporters import TABLE_EXPORT_FORMATS
+from benchmarks.synthetic import make_display_rows
+
+HEADERS = ["ID", "Status", "UUID", "Farmer Name", "Village", "Date Added", "Export Count", "Last Exported"]
+
+def run(row_count=500000):
+    rows = make_display_rows(row_count)
+    columns = [list(column) for column in zip(*rows)]
+    row_indexes = list(range(0, row_count, 2)) # Every other row, as if a filter were active
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for key, (name, ext, exporter) in TABLE_EXPORT_FORMATS.items():
+            path = os.path.join(tmp_dir, f"bench{ext}")
+            options = {"integer_columns": {"ID", "Export Count"}} if key == "parquet" else {}
+            start = time.perf_counter()
+            try:
+                written = exporter(HEADERS, columns, row_indexes, path, **options)
+            except RuntimeError as e:
+                print(f"{name}: skipped ({e})")
+                continue
+            results.append((name, written, time.perf_counter() - start, os.path.getsize(path)))
+
+    print(f"Displayed table export, {len(row_indexes)} of {row_count} rows")
+    print(f"{'format':<16} {'rows':>10} {'seconds':>8} {'size MB':>9} {'rows/s':>11}")
+    for name, written, seconds, size in results:
+        print(f"{name:<16} {written:>10} {seconds:>8.1f} {size / 1e6:>9.1f} {written / seconds:>11.0f}")
+    return results
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
@@ -0,0 +1,116 @@
+# File: DilasaKMLTool_v4/benchmarks/table_model.py
+# ----------------------------------------------------------------------
+# Purpose: Measures PolygonTableModel cost on a large table: load time,
+#          data() calls per second for the roles a repaint asks for, and
+#          time-to-paint of the sorted/filtered table view, and the cost of
+#          a reload after a small export (incremental update vs reset),
+#          re-filter and re-sort times, and bulk check operations.
+# Usage:   python -m benchmarks.table_model [row_count]
+# ----------------------------------------------------------------------
+import sys
+import time
+import random
+
+from PySide6.QtWidgets import QApplication, QTableView
+from PySide6.QtCore import Qt, QDate
+
+from ui.main_window import PolygonTableModel, PolygonFilterProxyModel
+from benchmarks.synthetic import make_display_rows
+
+# Roles a QTableView asks for on every visible cell during a paint
+PAINT_ROLES = [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.FontRole, Qt.ItemDataRole.ForegroundRole,
+               Qt.ItemDataRole.TextAlignmentRole, Qt.ItemDataRole.CheckStateRole, Qt.ItemDataRole.DecorationRole,
+               Qt.ItemDataRole.BackgroundRole]
+
+def _data_calls_per_second(model, visible_rows=40, passes=50):
+    indexes = [model.index(row, col) for row in range(visible_rows) for col in range(model.columnCount())]
+    start = time.perf_counter()
+    for _ in range(passes):
+        for index in indexes:
+            for role in PAINT_ROLES: model.data(index, role)
+    return passes * len(indexes) * len(PAINT_ROLES) / (time.perf_counter() - start)
+
+def _repaint_seconds(view, repeats=10):
+    start = time.perf_counter()
+    for _ in range(repeats): view.viewport().repaint()
+    return (time.perf_counter() - start) / repeats
+
+def _rows_after_export(rows, exported_count, seed=7):
+    """Copy of rows where exported_count random records got one more KML export."""
+    rng = random.Random(seed)
+    exported = list(rows)
+    for row in rng.sample(range(len(rows)), exported_count):
+        exported[row] = rows[row][:6] + (rows[row][6] + 1, "2026-01-01T00:00:00")
+    return exported
+
+def run(row_count=500000):
+    app = QApplication.instance() or QApplication(sys.argv)
+    rows = make_display_rows(row_count)
+
+    model = PolygonTableModel()
+    start = time.perf_counter()
+    model.update_data(rows)
+    load_seconds = time.perf_counter() - start
+    calls_per_second = _data_calls_per_second(model)
+
+    proxy = PolygonFilterProxyModel()
+    view = QTableView()
+    view.resize(1400, 900)
+    start = time.perf_counter()
+    proxy.setSourceModel(model)
+    view.setModel(proxy)
+    view.setSortingEnabled(True)
+    view.sortByColumn(PolygonTableModel.DATE_ADDED_COL, Qt.SortOrder.DescendingOrder)
+    view.show()
+    view.viewport().repaint()
+    first_paint_seconds = time.perf_counter() - start
+    app.processEvents()
+    repaint_seconds = _repaint_seconds(view)
+
+    changed_rows = []
+    model.dataChanged.connect(lambda top_left, bottom_right, roles=None: changed_rows.append(bottom_right.row() - top_left.row() + 1))
+    start = time.perf_counter()
+    model.update_data(_rows_after_export(rows, 10))
+    app.processEvents()
+    reload_seconds = time.perf_counter() - start
+
+    filter_seconds = {}
+    for label, filters in [("uuid contains", ("3a", None, None, "All", "All")),
+                           ("date range + not exported", ("", QDate(2024, 3, 1), QDate(2024, 6, 30), "Not Exported", "All")),
+                           ("cleared", ("", None, None, "All", "All"))]:
+        start = time.perf_counter()
+        proxy.set_filters(*filters)
+        app.processEvents()
+        filter_seconds[label] = (time.perf_counter() - start, proxy.rowCount())
+    start = time.perf_counter()
+    view.sortByColumn(PolygonTableModel.EXPORT_COUNT_COL, Qt.SortOrder.AscendingOrder)
+    app.processEvents()
+    resort_seconds = time.perf_counter() - start
+
+    proxy.set_filters("3a", None, None, "All", "All")
+    check_seconds = {}
+    for label, check in [("check all", lambda: model.set_all_checkboxes(Qt.CheckState.Checked)),
+                         ("invert visible", lambda: model.invert_checkboxes(proxy.accepted_source_mask())),
+                         ("check not exported", lambda: model.set_rows_checked(model.rows_matching(exported=False))),
+                         ("checked ids", model.get_checked_item_db_ids)]:
+        start = time.perf_counter()
+        check()
+        app.processEvents()
+        check_seconds[label] = time.perf_counter() - start
+
+    print(f"PolygonTableModel, {row_count} rows")
+    print(f"  update_data (load)        {load_seconds:8.2f} s")
+    print(f"  data() calls per second   {calls_per_second:8.0f}")
+    print(f"  sort + first paint        {first_paint_seconds:8.2f} s")
+    print(f"  full viewport repaint     {repaint_seconds * 1000:8.1f} ms")
+    print(f"  reload after 10 exports   {reload_seconds:8.2f} s ({sum(changed_rows)} rows changed)")
+    for label, (seconds, visible_rows) in filter_seconds.items():
+        print(f"  filter: {label:<26} {seconds:6.2f} s ({visible_rows} rows visible)")
+    print(f"  re-sort by export count   {resort_seconds:8.2f} s")
+    for label, seconds in check_seconds.items():
+        print(f"  {label:<25} {seconds * 1000:8.1f} ms")
+    view.close()
+    return load_seconds, calls_per_second, first_paint_seconds, repaint_seconds, reload_seconds, filter_seconds, resort_seconds, check_seconds
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
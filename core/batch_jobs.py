@@ -0,0 +1,136 @@
+# File: DilasaKMLTool_v4/core/batch_jobs.py
+# ----------------------------------------------------------------------
+# Purpose: Qt-free versions of the import and KML generation flows of the
+#          main window, for scripted runs (see the dilasa command line).
+#          Rows are processed and written in batches, and every job
+#          returns its counts together with per-stage timings in seconds.
+# ----------------------------------------------------------------------
+import os
+import csv
+import time
+import datetime
+
+from core.data_processor import CSV_HEADERS, process_csv_row_data
+from core.kml_generator import StreamingKMLWriter, open_kml_output, save_placemark_index, write_region_hierarchy_kml
+from core.kml_export_engine import export_kml_files_parallel
+
+IMPORT_BATCH_SIZE = 5000 # Processed rows written per bulk insert
+DUPLICATE_ACTIONS = ("skip", "overwrite")
+IMPORT_COUNT_KEYS = ("rows", "imported", "overwritten", "skipped", "duplicates", "errors")
+KML_OUTPUT_MODES = ("single", "multiple", "regions")
+
+def iter_csv_rows(csv_path):
+    """Streams row dicts from an mWater CSV export (BOM-tolerant), without reading the whole file."""
+    with open(csv_path, mode='r', encoding='utf-8-sig', newline='') as csv_file:
+        yield from csv.DictReader(csv_file)
+
+def _row_response_code(row_dict):
+    for key, value in row_dict.items():
+        if key and key.lstrip('\ufeff') == CSV_HEADERS["response_code"]: return (value or "").strip()
+    return ""
+
+def import_rows(db_manager, rows, on_duplicate="skip", batch_size=IMPORT_BATCH_SIZE):
+    """
+    Processes mWater row dicts and stores them, like the main window import but without prompts:
+    rows whose Response Code is already in the database are skipped or overwritten per on_duplicate.
+    Counts are per record: a Response Code repeated within the rows is stored once (the last row wins
+    with "overwrite", the first with "skip") and its extra rows are counted as duplicates.
+
+    Args:
+        db_manager (DatabaseManager): Open database.
+        rows (iterable): Row dicts as read by csv.DictReader (may be a generator).
+        on_duplicate (str): "skip" or "overwrite".
+        batch_size (int): Rows per bulk insert.
+
+    Returns:
+        dict: the IMPORT_COUNT_KEYS counts (rows, imported, overwritten, skipped, duplicates, errors),
+              and seconds {"process", "db", "total"}.
+    """
+    if on_duplicate not in DUPLICATE_ACTIONS: raise ValueError(f"on_duplicate must be one of {DUPLICATE_ACTIONS}, not '{on_duplicate}'")
+    result = dict.fromkeys(IMPORT_COUNT_KEYS, 0)
+    process_seconds = db_seconds = 0.0
+    start = time.perf_counter()
+    batch = []
+    seen_codes = set() # Response codes already stored by an earlier batch of this run
+
+    def flush():
+        nonlocal db_seconds
+        db_start = time.perf_counter()
+        records_by_code = {}
+        for record in batch:
+            if on_duplicate == "overwrite" or record["response_code"] not in records_by_code: records_by_code[record["response_code"]] = record
+        repeated = [record for code, record in records_by_code.items() if code in seen_codes]
+        records = [record for code, record in records_by_code.items() if code not in seen_codes]
+        seen_codes.update(records_by_code)
+        result["duplicates"] += len(batch) - len(records)
+        if on_duplicate == "overwrite":
+            existing_records, new_records = [], []
+            for record in records: (existing_records if db_manager.check_duplicate_response_code(record["response_code"]) else new_records).append(record)
+            overwritten = db_manager.bulk_overwrite_polygon_data(existing_records)
+            result["overwritten"] += overwritten; result["errors"] += len(existing_records) - overwritten
+            db_manager.bulk_overwrite_polygon_data(repeated) # A later row of a record stored earlier in this run still wins
+        else: new_records = records
+        inserted, skipped = db_manager.bulk_add_polygon_data(new_records)
+        result["imported"] += inserted; result["skipped"] += skipped
+        db_seconds += time.perf_counter() - db_start
+        batch.clear()
+
+    for row_dict in rows:
+        result["rows"] += 1
+        if not _row_response_code(row_dict): result["errors"] += 1; continue
+        process_start = time.perf_counter()
+        processed_flat = process_csv_row_data(row_dict)
+        process_seconds += time.perf_counter() - process_start
+        if not processed_flat.get("uuid") or not processed_flat.get("response_code"): result["errors"] += 1; continue
+        processed_flat["last_modified"] = datetime.datetime.now().isoformat()
+        batch.append(processed_flat)
+        if len(batch) >= batch_size: flush()
+    if batch: flush()
+    result["seconds"] = {"process": process_seconds, "db": db_seconds, "total": time.perf_counter() - start}
+    return result
+
+def export_kml(db_manager, record_ids, output_folder, mode="single", kmz=False, coordinate_precision=None, mark_exported=True):
+    """
+    Writes KML/KMZ output for the 'valid_for_kml' records among record_ids, in one of the
+    KML_OUTPUT_MODES of the Generate KML action, and records the export on the written records.
+
+    Returns:
+        dict: mode, records (valid records requested), exported, failed, files, output (file or
+              folder to open), and seconds {"write", "db", "total"}.
+    """
+    if mode not in KML_OUTPUT_MODES: raise ValueError(f"mode must be one of {KML_OUTPUT_MODES}, not '{mode}'")
+    start = time.perf_counter()
+    valid_ids = db_manager.get_valid_for_kml_ids(list(record_ids))
+    result = {"mode": mode, "records": len(valid_ids), "exported": 0, "failed": 0, "files": 0, "output": None}
+    ids_gen, db_seconds = [], 0.0
+    ext = "kmz" if kmz else "kml"
+    ts = datetime.datetime.now().strftime('%d.%m.%y')
+    write_start = time.perf_counter()
+    if valid_ids:
+        os.makedirs(output_folder, exist_ok=True)
+        if mode == "single":
+            out_path = os.path.join(output_folder, f"Consolidate_ALL_KML_{ts}_{len(valid_ids)}.{ext}")
+            with open_kml_output(out_path, kmz) as kml_file, StreamingKMLWriter(kml_file, f"Consolidated - {ts}", coordinate_precision) as writer:
+                for record in db_manager.iter_polygon_data_by_ids(valid_ids):
+                    if writer.add_polygon(record): ids_gen.append(record['id'])
+            if ids_gen:
+                result["files"], result["output"] = 1, out_path
+                if not kmz: save_placemark_index(out_path, writer)
+            else: os.remove(out_path)
+        elif mode == "multiple":
+            results, _ = export_kml_files_parallel(list(db_manager.iter_polygon_data_by_ids(valid_ids)), output_folder, kmz, coordinate_precision)
+            ids_gen = [record_id for record_id, path, _ in results if path]
+            result["files"], result["output"] = len(ids_gen), output_folder
+        else:
+            region_folder = os.path.join(output_folder, f"Region_KML_{ts}_{len(valid_ids)}")
+            root_path, ids_gen, file_count = write_region_hierarchy_kml(db_manager.get_region_groups_for_ids(valid_ids), db_manager.iter_polygon_data_by_ids,
+                                                                        region_folder, f"Regions - {ts}", coordinate_precision, kmz)
+            if ids_gen: result["files"], result["output"] = file_count, root_path
+    write_seconds = time.perf_counter() - write_start
+    if ids_gen and mark_exported:
+        db_start = time.perf_counter()
+        db_manager.update_kml_export_status_bulk(ids_gen)
+        db_seconds = time.perf_counter() - db_start
+    result["exported"], result["failed"] = len(ids_gen), len(valid_ids) - len(ids_gen)
+    result["seconds"] = {"write": write_seconds, "db": db_seconds, "total": time.perf_counter() - start}
+    return result
@@ -3,6 +3,8 @@
 # ----------------------------------------------------------------------
 import re
 
+from core.tracing import traced
+
 # Expected CSV Headers - Centralized here for data_processor
 # The main UI part will also need to be aware of these if it directly interacts with CSVs
 # or if it needs to display data based on these specific field names.
@@ -48,6 +50,7 @@ def parse_utm_string(utm_str):
     except ValueError:
         return None
 
+@traced("import.process_row")
 def process_csv_row_data(row_dict_from_reader):
     """
     Processes a single row dictionary (from csv.DictReader).
@@ -0,0 +1,243 @@
+# File: DilasaKMLTool_v4/core/geo_exporters.py
+# ----------------------------------------------------------------------
+# Purpose: Batched exporters for GIS formats other than KML:
+#          newline-delimited GeoJSON, GeoPackage and FlatGeobuf.
+#          Records are consumed in chunks, so memory stays bounded by the
+#          chunk size, and UTM -> lon/lat conversion is vectorized per chunk.
+#          progress_callback/cancel_check let a worker thread drive them.
+# ----------------------------------------------------------------------
+import os
+import json
+import sqlite3
+import itertools
+
+import numpy as np
+import utm
+
+from core.tracing import traced
+
+DEFAULT_EXPORT_CHUNK_SIZE = 10000
+DEFAULT_EXPORT_COORDINATE_PRECISION = 7
+WGS84_SRS_ID = 4326
+
+# Attribute columns written for every feature (polygon_data column names)
+EXPORT_PROPERTY_FIELDS = ["uuid", "response_code", "farmer_name", "village_name", "block", "district",
+                          "proposed_area_acre", "kml_export_count", "last_kml_export_date", "date_added"]
+
+# Little-endian WKB Polygon with one closed 5-point ring, built for a whole chunk at once
+_WKB_POLYGON_DTYPE = np.dtype([("byte_order", "u1"), ("geometry_type", "<u4"), ("ring_count", "<u4"),
+                               ("point_count", "<u4"), ("coordinates", "<f8", (10,))])
+# GeoPackage geometry blob: "GP" header with a [minx, maxx, miny, maxy] envelope, then the WKB
+_GPKG_GEOMETRY_DTYPE = np.dtype([("magic", "S2"), ("version", "u1"), ("flags", "u1"), ("srs_id", "<i4"),
+                                 ("envelope", "<f8", (4,)), ("wkb", _WKB_POLYGON_DTYPE)])
+
+_EASTING_KEYS = [f"p{i}_easting" for i in range(1, 5)]
+_NORTHING_KEYS = [f"p{i}_northing" for i in range(1, 5)]
+_ZONE_NUM_KEYS = [f"p{i}_zone_num" for i in range(1, 5)]
+_ZONE_LETTER_KEYS = [f"p{i}_zone_letter" for i in range(1, 5)]
+
+class GISExportCancelled(Exception):
+    pass
+
+@traced("gis.utm_to_lonlat")
+def records_to_lonlat_rings(records, coordinate_precision=None):
+    """
+    Converts the UTM points of a chunk of polygon records into closed lon/lat rings.
+    Points are grouped by UTM zone so each zone is converted with a single vectorized call.
+
+    Returns:
+        tuple: (rings, valid) - rings is a float64 array of shape (n, 5, 2) holding (lon, lat)
+               pairs, valid a boolean array marking records whose four points converted.
+    """
+    count = len(records)
+    # Missing values become NaN (numbers) or "" (zone letters) and fail the point_ok check below
+    eastings = np.array([[record.get(key) for key in _EASTING_KEYS] for record in records], dtype=float).reshape(count, 4)
+    northings = np.array([[record.get(key) for key in _NORTHING_KEYS] for record in records], dtype=float).reshape(count, 4)
+    zone_nums = np.array([[record.get(key) for key in _ZONE_NUM_KEYS] for record in records], dtype=float).reshape(count, 4)
+    zone_letters = np.array([[record.get(key) or "" for key in _ZONE_LETTER_KEYS] for record in records], dtype="<U1").reshape(count, 4)
+
+    lats = np.full((count, 4), np.nan)
+    lons = np.full((count, 4), np.nan)
+    point_ok = ~np.isnan(eastings) & ~np.isnan(northings) & (zone_nums > 0) & (zone_letters != "")
+    for zone_num, zone_letter in set(zip(zone_nums[point_ok].astype(int).tolist(), zone_letters[point_ok].tolist())):
+        zone_mask = point_ok & (zone_nums == zone_num) & (zone_letters == zone_letter)
+        try:
+            lats[zone_mask], lons[zone_mask] = utm.to_latlon(eastings[zone_mask], northings[zone_mask], zone_num, zone_letter)
+        except utm.error.OutOfRangeError:
+            # Some point in this zone is out of range: convert one by one and drop only the bad ones
+            for row, i in zip(*np.nonzero(zone_mask)):
+                try: lats[row, i], lons[row, i] = utm.to_latlon(eastings[row, i], northings[row, i], zone_num, zone_letter)
+                except utm.error.OutOfRangeError: pass
+
+    valid = ~np.isnan(lats).any(axis=1) & ~np.isnan(lons).any(axis=1)
+    rings = np.empty((count, 5, 2))
+    rings[:, :4, 0], rings[:, :4, 1] = lons, lats
+    rings[:, 4] = rings[:, 0] # Close the ring
+    if coordinate_precision is not None:
+        rings = np.round(rings, coordinate_precision)
+    return rings, valid
+
+def iter_record_chunks(records, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE, coordinate_precision=None, cancel_check=None):
+    """
+    Yields (records_chunk, rings) for the records whose points converted, chunk by chunk.
+    Raises GISExportCancelled before a chunk when cancel_check() returns True.
+    """
+    record_iterator = iter(records)
+    while True:
+        if cancel_check and cancel_check(): raise GISExportCancelled()
+        chunk = list(itertools.islice(record_iterator, chunk_size))
+        if not chunk: return
+        rings, valid = records_to_lonlat_rings(chunk, coordinate_precision)
+        if not valid.all():
+            chunk = [record for record, is_valid in zip(chunk, valid) if is_valid]
+            rings = rings[valid]
+        if chunk: yield chunk, rings
+
+def _wkb_polygons(rings):
+    """Returns a structured array of WKB polygons (one 93-byte element per ring)."""
+    wkb = np.empty(len(rings), dtype=_WKB_POLYGON_DTYPE)
+    wkb["byte_order"], wkb["geometry_type"], wkb["ring_count"], wkb["point_count"] = 1, 3, 1, 5
+    wkb["coordinates"] = rings.reshape(len(rings), 10)
+    return wkb
+
+def _property_values(record):
+    return [record.get(field) for field in EXPORT_PROPERTY_FIELDS]
+
+# --- GeoJSON (newline-delimited) ---
+def export_geojsonseq(records, output_path, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+                      coordinate_precision=DEFAULT_EXPORT_COORDINATE_PRECISION, progress_callback=None, cancel_check=None):
+    """
+    Writes one GeoJSON Feature per line (newline-delimited GeoJSON, .geojsonl).
+    Returns the number of features written.
+    """
+    # Geometry text comes from one format template per chunk; only the properties go through json
+    coordinate_format = "{:.%df}" % coordinate_precision if coordinate_precision is not None else "{!r}"
+    geometry_template = ('{{"type":"Polygon","coordinates":[[' +
+                         ",".join(f"[{coordinate_format},{coordinate_format}]" for _ in range(5)) + "]]}}")
+    encode_properties = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    written = 0
+    with open(output_path, "w", encoding="utf-8", newline="\n") as output_file:
+        for chunk, rings in iter_record_chunks(records, chunk_size, coordinate_precision, cancel_check):
+            lines = []
+            for record, ring in zip(chunk, rings.reshape(len(chunk), 10).tolist()):
+                properties = encode_properties({field: record.get(field) for field in EXPORT_PROPERTY_FIELDS})
+                lines.append(f'{{"type":"Feature","properties":{properties},"geometry":{geometry_template.format(*ring)}}}')
+            output_file.write("\n".join(lines) + "\n")
+            written += len(chunk)
+            if progress_callback: progress_callback(written)
+    return written
+
+# --- GeoPackage ---
+def _create_geopackage(conn, table_name):
+    conn.execute("PRAGMA application_id = 1196444487") # 'GPKG'
+    conn.execute("PRAGMA user_version = 10300")        # GeoPackage 1.3
+    conn.execute("""CREATE TABLE gpkg_spatial_ref_sys (
+        srs_name TEXT NOT NULL, srs_id INTEGER NOT NULL PRIMARY KEY, organization TEXT NOT NULL,
+        organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT)""")
+    conn.executemany("INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)", [
+        ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", "undefined cartesian coordinate reference system"),
+        ("Undefined geographic SRS", 0, "NONE", 0, "undefined", "undefined geographic coordinate reference system"),
+        ("WGS 84 geodetic", WGS84_SRS_ID, "EPSG", WGS84_SRS_ID,
+         'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],'
+         'AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,'
+         'AUTHORITY["EPSG","9122"]],AXIS["Latitude",NORTH],AXIS["Longitude",EAST],AUTHORITY["EPSG","4326"]]',
+         "longitude/latitude coordinates in decimal degrees on the WGS 84 spheroid"),
+    ])
+    conn.execute("""CREATE TABLE gpkg_contents (
+        table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE, description TEXT DEFAULT '',
+        last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+        min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER)""")
+    conn.execute("""CREATE TABLE gpkg_geometry_columns (
+        table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+        srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL, PRIMARY KEY (table_name, column_name))""")
+    property_columns = ", ".join(f'"{field}" TEXT' if field != "kml_export_count" else f'"{field}" INTEGER'
+                                 for field in EXPORT_PROPERTY_FIELDS)
+    conn.execute(f'CREATE TABLE "{table_name}" (fid INTEGER PRIMARY KEY AUTOINCREMENT, geom POLYGON, {property_columns})')
+    conn.execute("INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) VALUES (?, 'features', ?, ?)",
+                 (table_name, table_name, WGS84_SRS_ID))
+    conn.execute("INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', 'POLYGON', ?, 0, 0)", (table_name, WGS84_SRS_ID))
+
+def export_geopackage(records, output_path, table_name="polygon_data", chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+                      coordinate_precision=DEFAULT_EXPORT_COORDINATE_PRECISION, progress_callback=None, cancel_check=None):
+    """
+    Writes a GeoPackage (SQLite) with one polygon feature table, using only the sqlite3 module.
+    Each chunk is inserted with executemany inside one transaction.
+    Returns the number of features written.
+    """
+    if os.path.exists(output_path): os.remove(output_path)
+    conn = sqlite3.connect(output_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF") # Fresh output file, nothing to recover on failure
+        conn.execute("PRAGMA synchronous = OFF")
+        _create_geopackage(conn, table_name)
+        columns_sql = ", ".join(f'"{field}"' for field in EXPORT_PROPERTY_FIELDS)
+        insert_sql = f'INSERT INTO "{table_name}" (geom, {columns_sql}) VALUES (?{", ?" * len(EXPORT_PROPERTY_FIELDS)})'
+        bounds = [np.inf, np.inf, -np.inf, -np.inf] # min_x, min_y, max_x, max_y
+        written = 0
+        for chunk, rings in iter_record_chunks(records, chunk_size, coordinate_precision, cancel_check):
+            blobs = np.empty(len(chunk), dtype=_GPKG_GEOMETRY_DTYPE)
+            blobs["magic"], blobs["version"], blobs["flags"], blobs["srs_id"] = b"GP", 0, 0b00000011, WGS84_SRS_ID
+            min_xy, max_xy = rings.min(axis=1), rings.max(axis=1)
+            blobs["envelope"] = np.column_stack([min_xy[:, 0], max_xy[:, 0], min_xy[:, 1], max_xy[:, 1]])
+            blobs["wkb"] = _wkb_polygons(rings)
+            blob_bytes = blobs.tobytes()
+            item_size = _GPKG_GEOMETRY_DTYPE.itemsize
+            conn.executemany(insert_sql, ([blob_bytes[i * item_size:(i + 1) * item_size]] + _property_values(record)
+                                          for i, record in enumerate(chunk)))
+            conn.commit()
+            bounds = [min(bounds[0], min_xy[:, 0].min()), min(bounds[1], min_xy[:, 1].min()),
+                      max(bounds[2], max_xy[:, 0].max()), max(bounds[3], max_xy[:, 1].max())]
+            written += len(chunk)
+            if progress_callback: progress_callback(written)
+        if written:
+            conn.execute("UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ? WHERE table_name = ?",
+                         [float(value) for value in bounds] + [table_name])
+            conn.commit()
+        return written
+    finally:
+        conn.close()
+
+# --- FlatGeobuf ---
+def export_flatgeobuf(records, output_path, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE,
+                      coordinate_precision=DEFAULT_EXPORT_COORDINATE_PRECISION, progress_callback=None,
+                      spatial_index=True, cancel_check=None):
+    """
+    Writes a FlatGeobuf file through GDAL (pyogrio), streaming chunks as Arrow record batches
+    so all chunks go through a single GDAL write.
+    Requires the optional pyogrio (installed with geopandas) and pyarrow packages.
+    Returns the number of features written.
+    """
+    try:
+        import pyarrow as pa
+        from pyogrio.raw import write_arrow
+    except ImportError as e:
+        raise RuntimeError(f"FlatGeobuf export needs the 'pyogrio' and 'pyarrow' packages ({e}). Install them with: pip install pyogrio pyarrow")
+
+    schema = pa.schema([pa.field(field, pa.int64() if field == "kml_export_count" else pa.string())
+                        for field in EXPORT_PROPERTY_FIELDS] +
+                       [pa.field("geometry", pa.binary(), metadata={b"ARROW:extension:name": b"geoarrow.wkb"})])
+    written = [0]
+
+    def record_batches():
+        for chunk, rings in iter_record_chunks(records, chunk_size, coordinate_precision, cancel_check):
+            wkb_bytes = _wkb_polygons(rings).tobytes()
+            offsets = np.arange(len(chunk) + 1, dtype=np.int32) * _WKB_POLYGON_DTYPE.itemsize
+            geometry = pa.Array.from_buffers(pa.binary(), len(chunk), [None, pa.py_buffer(offsets), pa.py_buffer(wkb_bytes)])
+            columns = [pa.array([record.get(field) for record in chunk], type=schema.field(field).type)
+                       for field in EXPORT_PROPERTY_FIELDS]
+            written[0] += len(chunk)
+            if progress_callback: progress_callback(written[0])
+            yield pa.record_batch(columns + [geometry], schema=schema)
+
+    if os.path.exists(output_path): os.remove(output_path)
+    write_arrow(pa.RecordBatchReader.from_batches(schema, record_batches()), output_path, driver="FlatGeobuf",
+                geometry_name="geometry", geometry_type="Polygon", crs=f"EPSG:{WGS84_SRS_ID}",
+                layer_options={"SPATIAL_INDEX": "YES" if spatial_index else "NO"})
+    return written[0]
+
+# Format key -> (display name, file extension, exporter)
+GIS_EXPORT_FORMATS = {
+    "geojsonseq": ("GeoJSON Lines", ".geojsonl", export_geojsonseq),
+    "gpkg": ("GeoPackage", ".gpkg", export_geopackage),
+    "fgb": ("FlatGeobuf", ".fgb", export_flatgeobuf),
+}
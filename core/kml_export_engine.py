@@ -0,0 +1,95 @@
+# File: DilasaKMLTool_v4/core/kml_export_engine.py
+# ----------------------------------------------------------------------
+# Purpose: Writes one KML/KMZ file per polygon record using a pool of
+#          worker processes. Qt-free: the UI drives it from a QThread and
+#          gets progress through a callback.
+# ----------------------------------------------------------------------
+import os
+import concurrent.futures
+
+from core.kml_generator import add_polygon_to_kml_object, create_shared_polygon_style, save_kml_document
+
+DEFAULT_CHUNK_SIZE = 50 # Records per task sent to a worker; small enough for responsive progress/cancel
+MIN_RECORDS_FOR_POOL = 200 # Below this, starting worker processes costs more than it saves
+
+def export_kml_chunk(records, output_folder, kmz=False, coordinate_precision=None):
+    """
+    Writes one file per record (named by UUID) into output_folder.
+    Runs inside a worker process, so it only takes and returns picklable values.
+
+    Returns:
+        list: One (record_id, output_path, error_message) tuple per record.
+              output_path is None and error_message is set when the record failed.
+    """
+    import simplekml # Imported on first export, not when the app starts
+    results = []
+    shared_style = create_shared_polygon_style()
+    extension = "kmz" if kmz else "kml"
+    for record in records:
+        output_path = os.path.join(output_folder, f"{record.get('uuid')}.{extension}")
+        try:
+            kml_document = simplekml.Kml(name=record.get('uuid'))
+            if add_polygon_to_kml_object(kml_document, record, shared_style, coordinate_precision):
+                save_kml_document(kml_document, output_path, kmz)
+                results.append((record.get('id'), output_path, None))
+            else:
+                results.append((record.get('id'), None, "Polygon coordinates could not be converted."))
+        except Exception as e:
+            results.append((record.get('id'), None, str(e)))
+    return results
+
+def export_kml_files_parallel(records, output_folder, kmz=False, coordinate_precision=None,
+                              max_workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                              progress_callback=None, cancel_check=None):
+    """
+    Exports one KML/KMZ file per record, spreading chunks of records across worker processes.
+
+    Args:
+        records (list): Full polygon record dicts (as from DatabaseManager.iter_polygon_data_by_ids).
+        output_folder (str): Folder the files are written to.
+        kmz (bool): Write compressed .kmz files instead of .kml.
+        coordinate_precision (int, optional): Decimal places kept for lon/lat.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count.
+        chunk_size (int): Records per worker task.
+        progress_callback (callable, optional): Called as progress_callback(done_count, total_count).
+        cancel_check (callable, optional): Returns True when the export should stop. Chunks not yet
+                                           started are dropped; chunks already running finish, and
+                                           their results are still returned.
+
+    Returns:
+        tuple: (results, cancelled) where results is the list of
+               (record_id, output_path, error_message) tuples for the processed records.
+               If the pool itself fails (e.g. a worker process dies, BrokenProcessPool), the files
+               already written keep their results and only the unfinished records are failed.
+    """
+    total = len(records)
+    chunks = [records[start:start + chunk_size] for start in range(0, total, chunk_size)]
+    results = []
+    cancelled = False
+
+    if total < MIN_RECORDS_FOR_POOL or max_workers == 1:
+        for chunk in chunks:
+            if cancel_check and cancel_check(): cancelled = True; break
+            results.extend(export_kml_chunk(chunk, output_folder, kmz, coordinate_precision))
+            if progress_callback: progress_callback(len(results), total)
+        return results, cancelled
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(export_kml_chunk, chunk, output_folder, kmz, coordinate_precision) for chunk in chunks}
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=0.2, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled(): continue
+                    results.extend(future.result())
+                if done and progress_callback: progress_callback(len(results), total)
+                if not cancelled and cancel_check and cancel_check():
+                    cancelled = True
+                    # Drop chunks that have not started; keep waiting for the running ones
+                    pending = {future for future in pending if not future.cancel()}
+    except Exception as e:
+        print(f"KML Export Engine Error: {e}")
+        finished_ids = {record_id for record_id, _, _ in results}
+        if not cancelled: # Cancelled chunks were never meant to run, so they are not failures
+            results.extend((record.get('id'), None, f"Export engine error: {e}") for record in records if record.get('id') not in finished_ids)
+    return results, cancelled
@@ -1,10 +1,31 @@
 # File: DilasaKMLTool_v4/core/kml_generator.py
 # ----------------------------------------------------------------------
-import simplekml
 import utm # For UTM to Lat/Lon conversion
+import os
+import re
+import json
+import zipfile
+import hashlib
+import unicodedata
+import tempfile
+from contextlib import contextmanager
+from xml.sax.saxutils import escape as xml_escape
+
+from core.tracing import traced
 
 # No CSV_HEADERS needed here directly if data is passed pre-processed
 
+# Placemark styling shared by the simplekml and the streaming writers
+KML_LINE_COLOR = "ff00ffff" # KML yellow (aabbggrr), same as simplekml.Color.yellow
+KML_LINE_WIDTH = 2
+KML_POLY_OUTLINE = 1 # True (draw outline)
+KML_POLY_FILL = 0    # False (do not fill)
+KML_SHARED_STYLE_ID = "dilasa_polygon_style"
+
+# Decimal places kept for lon/lat. 7 decimals is ~1 cm on the ground, well below survey GPS accuracy.
+# None keeps full float precision.
+DEFAULT_KML_COORDINATE_PRECISION = 7
+
 def create_kml_description_for_placemark(polygon_db_record):
     """
     Creates the formatted KML description string from a polygon data dictionary
@@ -22,12 +43,13 @@ def create_kml_description_for_placemark(polygon_db_record):
     )
     return description
 
-def add_polygon_to_kml_object(kml_document, polygon_db_record):
+@traced("kml.utm_to_lonlat")
+def polygon_record_to_kml_coordinates(polygon_db_record, coordinate_precision=None):
     """
-    Adds a single polygon to a simplekml.Kml object.
-    polygon_db_record is a dictionary containing all necessary data for one polygon,
-    including p1_easting, p1_northing, p1_altitude, p1_zone_num, p1_zone_letter, etc.
-    Returns True if polygon was added successfully, False otherwise.
+    Converts the four UTM points of a polygon record into a closed ring of
+    (lon, lat, altitude) tuples, the order KML expects.
+    If coordinate_precision is given, lon/lat are rounded to that many decimal places.
+    Returns the list of 5 coordinates, or None if the points cannot be converted.
     """
     kml_coordinates_with_altitude = []
     
@@ -42,20 +64,60 @@ def add_polygon_to_kml_object(kml_document, polygon_db_record):
             if None in [easting, northing, zone_num, zone_letter]:
                 # This check should ideally be redundant if status is 'valid_for_kml'
                 print(f"KML GEN Error: Missing critical UTM components for Point {i} in UUID {polygon_db_record.get('uuid')}")
-                return False 
+                return None 
             
             # Convert UTM to Latitude/Longitude
             # The `utm` library typically handles zone letters to determine N/S hemisphere.
             lat, lon = utm.to_latlon(easting, northing, zone_num, zone_letter)
+            if coordinate_precision is not None:
+                lat, lon = round(lat, coordinate_precision), round(lon, coordinate_precision)
             kml_coordinates_with_altitude.append((lon, lat, altitude))
         
         if len(kml_coordinates_with_altitude) != 4:
             print(f"KML GEN Error: Could not form 4 valid coordinates for UUID {polygon_db_record.get('uuid')}")
-            return False
+            return None
 
         # Close the polygon by adding the first point at the end
         kml_coordinates_with_altitude.append(kml_coordinates_with_altitude[0])
+        return kml_coordinates_with_altitude
+
+    except utm.error.OutOfRangeError as e_utm:
+        print(f"KML GEN Error (UTM Conversion): {e_utm} for UUID {polygon_db_record.get('uuid')}")
+        return None
+    except Exception as e:
+        print(f"KML GEN Error (General): Converting coordinates of polygon {polygon_db_record.get('uuid', 'N/A')} failed: {e}")
+        return None
+
+def create_shared_polygon_style():
+    """
+    Creates the polygon style as a single simplekml.Style. Assigning the same Style object
+    to many polygons makes simplekml write it once at document level and reference it
+    with styleUrl, instead of writing a <Style> per placemark.
+    """
+    import simplekml # Only the simplekml document paths need it; the streaming writer and the app's startup do not
+    style = simplekml.Style()
+    style.linestyle.color = KML_LINE_COLOR
+    style.linestyle.width = KML_LINE_WIDTH
+    style.polystyle.outline = KML_POLY_OUTLINE
+    style.polystyle.fill = KML_POLY_FILL
+    return style
+
+@traced("kml.add_placemark")
+def add_polygon_to_kml_object(kml_document, polygon_db_record, shared_style=None, coordinate_precision=None, kml_coordinates=None):
+    """
+    Adds a single polygon to a simplekml.Kml object.
+    polygon_db_record is a dictionary containing all necessary data for one polygon,
+    including p1_easting, p1_northing, p1_altitude, p1_zone_num, p1_zone_letter, etc.
+    shared_style (from create_shared_polygon_style) is referenced instead of creating
+    a per-placemark style; coordinate_precision rounds lon/lat to that many decimals.
+    kml_coordinates can pass a ring already built by polygon_record_to_kml_coordinates.
+    Returns True if polygon was added successfully, False otherwise.
+    """
+    kml_coordinates_with_altitude = kml_coordinates or polygon_record_to_kml_coordinates(polygon_db_record, coordinate_precision)
+    if kml_coordinates_with_altitude is None:
+        return False
 
+    try:
         # Create KML Polygon
         placemark_name = polygon_db_record.get("uuid", "Unnamed Polygon")
         polygon = kml_document.newpolygon(name=placemark_name)
@@ -65,23 +127,424 @@ def add_polygon_to_kml_object(kml_document, polygon_db_record):
         polygon.description = create_kml_description_for_placemark(polygon_db_record)
         
         # Apply styling
-        polygon.style.linestyle.color = simplekml.Color.yellow  # KML yellow (aabbggrr -> ff00ffff)
-        polygon.style.linestyle.width = 2
-        polygon.style.polystyle.outline = 1  # True (draw outline)
-        polygon.style.polystyle.fill = 0     # False (do not fill)
+        if shared_style is not None:
+            polygon.style = shared_style
+            return True
+
+        polygon.style.linestyle.color = KML_LINE_COLOR
+        polygon.style.linestyle.width = KML_LINE_WIDTH
+        polygon.style.polystyle.outline = KML_POLY_OUTLINE
+        polygon.style.polystyle.fill = KML_POLY_FILL
         
         return True # Polygon added successfully
 
-    except utm.error.OutOfRangeError as e_utm:
-        print(f"KML GEN Error (UTM Conversion): {e_utm} for UUID {polygon_db_record.get('uuid')}")
-        return False
     except Exception as e:
         print(f"KML GEN Error (General): Adding polygon {polygon_db_record.get('uuid', 'N/A')} to KML failed: {e}")
         return False
 
+class StreamingKMLWriter:
+    """
+    Writes a KML document placemark by placemark straight to a binary file handle,
+    without building a simplekml object tree, so memory stays constant however many
+    polygons are written. Placemarks match what add_polygon_to_kml_object produces,
+    except that all of them reference one shared document-level style.
+
+    The writer also keeps a per-placemark index (uuid -> byte offset and length in the
+    uncompressed document), which save_placemark_index stores next to a .kml file so
+    update_consolidated_kml can later replace single placemarks without re-exporting.
+
+    Usage:
+        with open_kml_output(path, kmz=False) as kml_file, StreamingKMLWriter(kml_file, "Doc name") as writer:
+            for record in records: writer.add_polygon(record)
+    """
+    def __init__(self, output_file, document_name, coordinate_precision=None):
+        self.output_file = output_file
+        self.document_name = document_name
+        self.coordinate_precision = coordinate_precision
+        self.placemark_count = 0
+        self.bytes_written = 0
+        self.header_end = None
+        self.placemark_index = {} # uuid -> [byte offset, byte length]
+        self._header_written = False
+        self._closed = False
+
+    def __enter__(self):
+        self.write_header()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _write(self, text):
+        self._write_bytes(text.encode("utf-8"))
+
+    def _write_bytes(self, data):
+        self.output_file.write(data)
+        self.bytes_written += len(data)
+
+    def write_header(self, raw_header=None):
+        """
+        Writes the XML declaration, the Document element and the shared style.
+        raw_header (bytes) copies the header of an existing streamed document instead.
+        """
+        if self._header_written: return
+        if raw_header is not None:
+            self._write_bytes(raw_header)
+            self.header_end = self.bytes_written
+            self._header_written = True
+            return
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2">\n'
+            '    <Document>\n'
+            f'        <Style id="{KML_SHARED_STYLE_ID}">\n'
+            '            <LineStyle>\n'
+            f'                <color>{KML_LINE_COLOR}</color>\n'
+            '                <colorMode>normal</colorMode>\n'
+            f'                <width>{KML_LINE_WIDTH}</width>\n'
+            '            </LineStyle>\n'
+            '            <PolyStyle>\n'
+            '                <colorMode>normal</colorMode>\n'
+            f'                <fill>{KML_POLY_FILL}</fill>\n'
+            f'                <outline>{KML_POLY_OUTLINE}</outline>\n'
+            '            </PolyStyle>\n'
+            '        </Style>\n'
+            f'        <name>{xml_escape(str(self.document_name))}</name>\n'
+        )
+        self.header_end = self.bytes_written
+        self._header_written = True
+
+    @traced("kml.write_placemark")
+    def add_polygon(self, polygon_db_record):
+        """
+        Writes one polygon placemark. Same input and return value as add_polygon_to_kml_object:
+        True if the placemark was written, False if the record's points could not be converted.
+        """
+        kml_coordinates_with_altitude = polygon_record_to_kml_coordinates(polygon_db_record, self.coordinate_precision)
+        if kml_coordinates_with_altitude is None:
+            return False
+        self.write_header()
+        placemark_uuid = str(polygon_db_record.get("uuid", "Unnamed Polygon"))
+        placemark_offset = self.bytes_written
+        coordinates_text = " ".join(f"{lon},{lat},{alt}" for lon, lat, alt in kml_coordinates_with_altitude)
+        self._write(
+            '        <Placemark>\n'
+            f'            <name>{xml_escape(placemark_uuid)}</name>\n'
+            f'            <description>{xml_escape(create_kml_description_for_placemark(polygon_db_record))}</description>\n'
+            f'            <styleUrl>#{KML_SHARED_STYLE_ID}</styleUrl>\n'
+            '            <Polygon>\n'
+            '                <outerBoundaryIs>\n'
+            '                    <LinearRing>\n'
+            f'                        <coordinates>{coordinates_text}</coordinates>\n'
+            '                    </LinearRing>\n'
+            '                </outerBoundaryIs>\n'
+            '            </Polygon>\n'
+            '        </Placemark>\n'
+        )
+        self.placemark_index[placemark_uuid] = [placemark_offset, self.bytes_written - placemark_offset]
+        self.placemark_count += 1
+        return True
+
+    def copy_placemark(self, placemark_uuid, raw_placemark):
+        """Writes an already serialized placemark (bytes) unchanged, keeping the index up to date."""
+        self.write_header()
+        self.placemark_index[placemark_uuid] = [self.bytes_written, len(raw_placemark)]
+        self._write_bytes(raw_placemark)
+        self.placemark_count += 1
+
+    def close(self):
+        """Writes the closing Document/kml tags. Does not close the underlying file handle."""
+        if self._closed: return
+        self.write_header()
+        self._write('    </Document>\n</kml>\n')
+        self._closed = True
+
+@contextmanager
+def open_kml_output(output_path, kmz=False):
+    """
+    Opens a binary handle for writing a KML document to output_path.
+    With kmz=True the document is deflate-compressed as doc.kml inside a KMZ (zip) archive,
+    still written as a stream.
+    """
+    if not kmz:
+        with open(output_path, "wb") as kml_file:
+            yield kml_file
+        return
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as kmz_archive:
+        with kmz_archive.open("doc.kml", "w", force_zip64=True) as kml_file:
+            yield kml_file
+
+# --- Incremental Export (per-placemark index) ---
+KML_INDEX_SUFFIX = ".idx.json"
+
+def _kml_file_signature(kml_path):
+    """(size in bytes, modification time in ns) of the file, used to tell whether an index still describes it."""
+    file_stat = os.stat(kml_path)
+    return file_stat.st_size, file_stat.st_mtime_ns
+
+def save_placemark_index(kml_path, writer):
+    """Stores the writer's placemark index next to kml_path (as <kml_path>.idx.json). Call it after the file is closed."""
+    file_size, file_mtime_ns = _kml_file_signature(kml_path)
+    index_data = {
+        "version": 2,
+        "header_end": writer.header_end,
+        "coordinate_precision": writer.coordinate_precision,
+        "file_size": file_size,
+        "file_mtime_ns": file_mtime_ns,
+        "placemarks": writer.placemark_index,
+    }
+    with open(kml_path + KML_INDEX_SUFFIX, "w", encoding="utf-8") as index_file:
+        json.dump(index_data, index_file)
+
+def load_placemark_index(kml_path):
+    """Returns the index saved by save_placemark_index, or None if there is none."""
+    try:
+        with open(kml_path + KML_INDEX_SUFFIX, "r", encoding="utf-8") as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return None
+
+def _read_indexed_placemark(kml_file, placemark_uuid, offset, length):
+    """Reads one placemark slice and checks it really is a whole placemark."""
+    kml_file.seek(offset)
+    raw_placemark = kml_file.read(length)
+    stripped = raw_placemark.strip()
+    if len(raw_placemark) != length or not stripped.startswith(b"<Placemark") or not stripped.endswith(b"</Placemark>"):
+        raise ValueError(f"The placemark index does not match the file contents (at placemark '{placemark_uuid}'). Re-export the consolidated KML.")
+    return raw_placemark
+
+@traced("kml.update_consolidated")
+def update_consolidated_kml(kml_path, changed_records, coordinate_precision=None, append_new_records=False):
+    """
+    Updates a consolidated .kml written by StreamingKMLWriter (with a saved placemark index):
+    placemarks of changed_records that are already in the file are replaced where they are, every
+    other placemark is copied byte for byte, and changed records not in the file are appended only
+    if append_new_records is set. The file is rewritten to a temporary file and then swapped in, so
+    the original stays intact if anything fails.
+
+    The index records the file's size and modification time; if the file was edited, re-saved or
+    replaced since, or a placemark slice does not hold a whole placemark, nothing is written.
+
+    Args:
+        kml_path (str): Consolidated .kml file to update.
+        changed_records (iterable): Full polygon record dicts to write.
+        coordinate_precision (int, optional): Defaults to the precision the file was written with.
+        append_new_records (bool): Also append changed records whose uuid is not in the file.
+
+    Returns:
+        tuple: (written_record_ids, updated_count, added_count)
+
+    Raises:
+        ValueError: If the file has no usable placemark index, or the index no longer matches the file.
+    """
+    index_data = load_placemark_index(kml_path)
+    if not index_data or index_data.get("header_end") is None:
+        raise ValueError(f"No placemark index found for '{kml_path}'. Only consolidated KML files written by this tool (not KMZ) can be updated.")
+    if (index_data.get("file_size"), index_data.get("file_mtime_ns")) != _kml_file_signature(kml_path):
+        raise ValueError(f"'{kml_path}' was modified after it was exported, so its placemark index is out of date. Re-export the consolidated KML.")
+    if coordinate_precision is None:
+        coordinate_precision = index_data.get("coordinate_precision")
+    old_placemarks = index_data["placemarks"]
+    records_by_uuid = {str(record.get("uuid", "Unnamed Polygon")): record for record in changed_records}
+
+    output_folder = os.path.dirname(os.path.abspath(kml_path))
+    fd, temp_path = tempfile.mkstemp(suffix=".kml", prefix="kml_update_", dir=output_folder)
+    written_ids, updated_count, added_count = [], 0, 0
+    try:
+        with open(kml_path, "rb") as old_file, os.fdopen(fd, "wb") as new_file:
+            header = old_file.read(index_data["header_end"])
+            if not header.rstrip().endswith(b"</name>"):
+                raise ValueError(f"The placemark index does not match the header of '{kml_path}'. Re-export the consolidated KML.")
+            writer = StreamingKMLWriter(new_file, None, coordinate_precision)
+            writer.write_header(raw_header=header)
+            for placemark_uuid, (offset, length) in sorted(old_placemarks.items(), key=lambda item: item[1][0]):
+                raw_placemark = _read_indexed_placemark(old_file, placemark_uuid, offset, length)
+                record = records_by_uuid.pop(placemark_uuid, None)
+                if record is not None and writer.add_polygon(record):
+                    written_ids.append(record.get("id")); updated_count += 1
+                else:
+                    writer.copy_placemark(placemark_uuid, raw_placemark)
+            if append_new_records:
+                for record in records_by_uuid.values():
+                    if writer.add_polygon(record): written_ids.append(record.get("id")); added_count += 1
+            writer.close()
+        os.replace(temp_path, kml_path)
+        save_placemark_index(kml_path, writer)
+    except Exception:
+        if os.path.exists(temp_path): os.remove(temp_path)
+        raise
+    return written_ids, updated_count, added_count
+
+@traced("kml.save_document")
+def save_kml_document(kml_document, output_path, kmz=False):
+    """Saves a simplekml.Kml document as .kml, or compressed as .kmz."""
+    if kmz: kml_document.savekmz(output_path)
+    else: kml_document.save(output_path)
+
+# --- Region-based Level-of-Detail Hierarchy ---
+# Region sizes (in screen pixels) at which each level is loaded. Village polygons only load
+# once a village covers REGION_VILLAGE_MIN_LOD_PIXELS on screen; until then a single
+# centroid point per village is shown instead.
+REGION_DISTRICT_MIN_LOD_PIXELS = 16
+REGION_BLOCK_MIN_LOD_PIXELS = 128
+REGION_VILLAGE_MIN_LOD_PIXELS = 384
+REGION_ROOT_FILE_NAME = "index"
+REGION_SLUG_MAX_LENGTH = 40 # Characters of the readable part of a region file name, per name
+
+def _region_slug(name):
+    """Readable, file-system safe part of a region file name. Keeps Unicode letters and their combining marks (e.g. Devanagari)."""
+    kept = "".join(ch if ch.isalnum() or ch in "_-" or unicodedata.category(ch).startswith("M") else "_" for ch in unicodedata.normalize("NFC", name))
+    return re.sub(r"_+", "_", kept).strip("_")[:REGION_SLUG_MAX_LENGTH] or "Unknown"
+
+def _region_file_stem(*names):
+    """
+    File name (without extension) for a district/block/village group: readable slugs of the names
+    plus a short hash of the exact names, so groups whose slugs coincide (e.g. "Wadi (Bk)" and
+    "Wadi Bk") still get different files.
+    """
+    level = ("district", "block", "village")[len(names) - 1]
+    key_hash = hashlib.sha1("\x1f".join(names).encode("utf-8")).hexdigest()[:8]
+    return f"{level}_{'__'.join(_region_slug(name) for name in names)}_{key_hash}"
+
+class _RegionStemRegistry:
+    """Hands out region file stems, resolving the (unlikely) case of two groups getting the same stem."""
+    def __init__(self): self._owners = {} # lower-cased stem -> names; lower-cased for case-insensitive file systems
+
+    def stem_for(self, *names):
+        base_stem = stem = _region_file_stem(*names)
+        suffix = 1
+        while self._owners.setdefault(stem.lower(), names) != names:
+            suffix += 1; stem = f"{base_stem}_{suffix}"
+        return stem
+
+def _merge_bounds(bounds_a, bounds_b):
+    """Bounds are (north, south, east, west) tuples; either may be None."""
+    if bounds_a is None: return bounds_b
+    if bounds_b is None: return bounds_a
+    return (max(bounds_a[0], bounds_b[0]), min(bounds_a[1], bounds_b[1]),
+            max(bounds_a[2], bounds_b[2]), min(bounds_a[3], bounds_b[3]))
+
+def _region_for_bounds(bounds, min_lod_pixels, max_lod_pixels=-1):
+    import simplekml
+    north, south, east, west = bounds
+    return simplekml.Region(latlonaltbox=simplekml.LatLonAltBox(north=north, south=south, east=east, west=west),
+                            lod=simplekml.Lod(minlodpixels=min_lod_pixels, maxlodpixels=max_lod_pixels))
+
+def _region_link_href(stem, kmz):
+    """
+    Link target of a sibling region file. Viewers resolve relative links inside a KMZ against
+    the archive's doc.kml, so a link to a sibling .kmz has to step out of the archive first.
+    """
+    return f"../{stem}.kmz" if kmz else f"{stem}.kml"
+
+def _add_region_network_link(kml_document, name, href, bounds, min_lod_pixels):
+    import simplekml
+    network_link = kml_document.newnetworklink(name=name)
+    network_link.link.href = href
+    network_link.link.viewrefreshmode = simplekml.ViewRefreshMode.onregion
+    network_link.region = _region_for_bounds(bounds, min_lod_pixels)
+    return network_link
+
+@traced("kml.region_hierarchy")
+def write_region_hierarchy_kml(region_rows, fetch_records, output_folder, document_name,
+                               coordinate_precision=None, kmz=False, progress_callback=None):
+    """
+    Writes a District > Block > Village hierarchy of KML files linked with NetworkLink
+    and Region/Lod elements, so viewers only load the polygons of villages large enough
+    on screen. Each level file also carries village centroid points (with polygon counts)
+    that are shown while the village polygons are not yet loaded.
+
+    Args:
+        region_rows (iterable): (record_id, district, block, village_name) tuples.
+        fetch_records (callable): fetch_records(record_ids) -> iterable of full record dicts.
+                                  Called once per village, so only one village is in memory.
+        output_folder (str): Folder the files are written to; the entry file is index.kml/.kmz.
+        document_name (str): Name of the root document.
+        coordinate_precision (int, optional): Decimal places kept for lon/lat.
+        kmz (bool): Write .kmz files instead of .kml. Their links point one level up (../name.kmz),
+                    out of the linking archive to the sibling file.
+        progress_callback (callable, optional): Called as progress_callback(done_villages, total_villages).
+
+    Returns:
+        tuple: (root_file_path, exported_record_ids, written_file_count)
+    """
+    import simplekml
+    extension = "kmz" if kmz else "kml"
+    hierarchy = {} # district -> block -> village -> [record ids]
+    for record_id, district, block, village in region_rows:
+        district, block, village = (district or "").strip(), (block or "").strip(), (village or "").strip()
+        hierarchy.setdefault(district, {}).setdefault(block, {}).setdefault(village, []).append(record_id)
+
+    os.makedirs(output_folder, exist_ok=True)
+    shared_style = create_shared_polygon_style()
+    exported_ids = []
+    stems = _RegionStemRegistry()
+    written_files = 0
+    total_villages = sum(len(villages) for blocks in hierarchy.values() for villages in blocks.values())
+    done_villages = 0
+
+    root_document = simplekml.Kml(name=document_name)
+    for district, blocks in sorted(hierarchy.items()):
+        district_document = simplekml.Kml(name=district or "Unknown District")
+        district_bounds = None
+        for block, villages in sorted(blocks.items()):
+            block_document = simplekml.Kml(name=block or "Unknown Block")
+            block_bounds = None
+            for village, record_ids in sorted(villages.items()):
+                # Village level: the actual polygons
+                village_document = simplekml.Kml(name=village or "Unknown Village")
+                village_bounds, lat_sum, lon_sum, polygon_count = None, 0.0, 0.0, 0
+                for record in fetch_records(record_ids):
+                    coordinates = polygon_record_to_kml_coordinates(record, coordinate_precision)
+                    if coordinates is None or not add_polygon_to_kml_object(village_document, record, shared_style, kml_coordinates=coordinates):
+                        continue
+                    lons, lats = [c[0] for c in coordinates[:4]], [c[1] for c in coordinates[:4]]
+                    village_bounds = _merge_bounds(village_bounds, (max(lats), min(lats), max(lons), min(lons)))
+                    lat_sum += sum(lats) / 4; lon_sum += sum(lons) / 4; polygon_count += 1
+                    exported_ids.append(record['id'])
+                done_villages += 1
+                if progress_callback: progress_callback(done_villages, total_villages)
+                if not polygon_count: continue
+
+                village_stem = stems.stem_for(district, block, village)
+                save_kml_document(village_document, os.path.join(output_folder, f"{village_stem}.{extension}"), kmz)
+                written_files += 1
+                _add_region_network_link(block_document, village or "Unknown Village", _region_link_href(village_stem, kmz),
+                                         village_bounds, REGION_VILLAGE_MIN_LOD_PIXELS)
+
+                # Aggregated centroid, visible until the village polygons take over
+                centroid_lon, centroid_lat = lon_sum / polygon_count, lat_sum / polygon_count
+                if coordinate_precision is not None:
+                    centroid_lon, centroid_lat = round(centroid_lon, coordinate_precision), round(centroid_lat, coordinate_precision)
+                centroid = district_document.newpoint(name=f"{village or 'Unknown Village'} ({polygon_count})",
+                                                      coords=[(centroid_lon, centroid_lat)])
+                centroid.region = _region_for_bounds(village_bounds, 0, REGION_VILLAGE_MIN_LOD_PIXELS)
+                block_bounds = _merge_bounds(block_bounds, village_bounds)
+
+            if block_bounds is None: continue
+            block_stem = stems.stem_for(district, block)
+            save_kml_document(block_document, os.path.join(output_folder, f"{block_stem}.{extension}"), kmz)
+            written_files += 1
+            _add_region_network_link(district_document, block or "Unknown Block", _region_link_href(block_stem, kmz),
+                                     block_bounds, REGION_BLOCK_MIN_LOD_PIXELS)
+            district_bounds = _merge_bounds(district_bounds, block_bounds)
+
+        if district_bounds is None: continue
+        district_stem = stems.stem_for(district)
+        save_kml_document(district_document, os.path.join(output_folder, f"{district_stem}.{extension}"), kmz)
+        written_files += 1
+        _add_region_network_link(root_document, district or "Unknown District", _region_link_href(district_stem, kmz),
+                                 district_bounds, REGION_DISTRICT_MIN_LOD_PIXELS)
+
+    root_path = os.path.join(output_folder, f"{REGION_ROOT_FILE_NAME}.{extension}")
+    save_kml_document(root_document, root_path, kmz)
+    return root_path, exported_ids, written_files + 1
+
 # Example usage (if testing kml_generator.py directly)
 if __name__ == '__main__':
     print("Testing KML Generator module...")
+    import simplekml
     kml_test = simplekml.Kml(name="Test KML Document")
     
     # Sample data similar to what would be fetched from DB for a 'valid_for_kml' record
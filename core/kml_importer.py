@@ -0,0 +1,188 @@
+# File: DilasaKMLTool_v4/core/kml_importer.py
+# ----------------------------------------------------------------------
+# Purpose: Streams Placemarks out of KML/KMZ files and turns them back
+#          into polygon_data records (the reverse of kml_generator).
+#          Parsed with iterparse and each Placemark is dropped from the
+#          tree once read, so memory stays flat for very large files.
+# ----------------------------------------------------------------------
+import os
+import uuid
+import zipfile
+import datetime
+import itertools
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import utm
+
+DEFAULT_IMPORT_BATCH_SIZE = 5000
+KML_IMPORT_RESPONSE_CODE_PREFIX = "KML-" # KML carries no response code, imported records get a synthetic one
+
+# Description labels written by create_kml_description_for_placemark -> polygon_data column
+KML_DESCRIPTION_FIELDS = {
+    "Farmer name": "farmer_name",
+    "Village": "village_name",
+    "Block": "block",
+    "District": "district",
+    "Proposed Area (acre)": "proposed_area_acre",
+}
+
+_local_tags = {} # Namespaced tag -> local name; files only use a handful of distinct tags
+
+def _local_tag(element):
+    """Tag without its XML namespace, e.g. '{http://www.opengis.net/kml/2.2}Placemark' -> 'Placemark'."""
+    tag = element.tag
+    local_name = _local_tags.get(tag)
+    if local_name is None:
+        local_name = _local_tags[tag] = tag.rsplit("}", 1)[-1]
+    return local_name
+
+def _find_child_text(element, name):
+    for child in element.iter():
+        if _local_tag(child) == name:
+            return (child.text or "").strip()
+    return ""
+
+def parse_kml_description(description):
+    """
+    Maps a placemark description in the create_kml_description_for_placemark format back to
+    polygon_data fields. Unknown lines are ignored and "N/A" values are returned as empty strings.
+    """
+    fields = {}
+    for line in (description or "").splitlines():
+        label, separator, value = line.partition(":")
+        column = KML_DESCRIPTION_FIELDS.get(label.strip())
+        if separator and column:
+            value = value.strip()
+            fields[column] = "" if value == "N/A" else value
+    return fields
+
+def _parse_coordinates(coordinates_text):
+    """'lon,lat[,alt] lon,lat[,alt] ...' -> list of (lon, lat, alt) floats. Malformed tuples are skipped."""
+    points = []
+    for token in coordinates_text.split():
+        parts = token.split(",")
+        try:
+            lon, lat = float(parts[0]), float(parts[1])
+            alt = float(parts[2]) if len(parts) > 2 and parts[2] else 0.0
+        except (ValueError, IndexError):
+            continue
+        points.append((lon, lat, alt))
+    return points
+
+def _open_kml_stream(kml_path):
+    """Opens a .kml file, or the main document inside a .kmz (doc.kml, else the first .kml entry), as a binary stream."""
+    if not zipfile.is_zipfile(kml_path):
+        return open(kml_path, "rb")
+    archive = zipfile.ZipFile(kml_path)
+    kml_names = [name for name in archive.namelist() if name.lower().endswith(".kml")]
+    if not kml_names:
+        archive.close()
+        raise ValueError(f"No KML document found inside '{os.path.basename(kml_path)}'.")
+    return archive.open("doc.kml" if "doc.kml" in kml_names else kml_names[0])
+
+def iter_kml_placemarks(kml_path):
+    """
+    Yields one dict per Placemark that holds a Polygon: {"name", "description", "coordinates"}
+    where coordinates is the outer ring as a list of (lon, lat, alt).
+    Each Placemark is removed from its parent after it is read, so the tree never grows.
+    """
+    with _open_kml_stream(kml_path) as kml_stream:
+        open_elements = []
+        for event, element in ET.iterparse(kml_stream, events=("start", "end")):
+            if event == "start":
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if _local_tag(element) != "Placemark":
+                continue
+            outer_ring = None
+            for child in element.iter():
+                if _local_tag(child) == "outerBoundaryIs":
+                    outer_ring = _find_child_text(child, "coordinates")
+                    break
+            if outer_ring is not None:
+                yield {"name": _find_child_text(element, "name"),
+                       "description": _find_child_text(element, "description"),
+                       "coordinates": _parse_coordinates(outer_ring)}
+            element.clear()
+            if open_elements: open_elements[-1].remove(element)
+
+def _placemark_corners(coordinates):
+    """Drops the closing point of a ring, returning the distinct corners in order."""
+    if len(coordinates) > 1 and coordinates[0][:2] == coordinates[-1][:2]:
+        return coordinates[:-1]
+    return coordinates
+
+# polygon_data point columns, per point number
+_POINT_KEYS = [tuple(f"p{number}_{field}" for field in ("utm_str", "altitude", "easting", "northing", "zone_num", "zone_letter", "substituted"))
+               for number in range(1, 5)]
+
+_UTM_ZONE_LETTERS = np.array(list("CDEFGHJKLMNPQRSTUVWXX")) # 8 degree latitude bands from -80, X covers up to 84
+
+def _latlon_to_utm(lats, lons):
+    """
+    Vectorized lon/lat -> UTM for many points, grouped by zone.
+    Zone numbers and letters follow utm.latlon_to_zone_number / utm.latitude_to_zone_letter.
+    Returns (eastings, northings, zone_nums, zone_letters) arrays.
+    """
+    lons = (lons % 360 + 540) % 360 - 180
+    zone_nums = ((lons + 180) // 6).astype(int) + 1
+    zone_nums[(lats >= 56) & (lats < 64) & (lons >= 3) & (lons < 12)] = 32 # Norway
+    svalbard = (lats >= 72) & (lats <= 84) & (lons >= 0) & (lons < 42)
+    zone_nums[svalbard] = np.array([31, 33, 35, 37])[np.searchsorted([9, 21, 33], lons[svalbard], side="right")]
+    in_band = (lats >= -80) & (lats <= 84)
+    zone_letters = np.full(len(lats), "", dtype="<U1")
+    zone_letters[in_band] = _UTM_ZONE_LETTERS[((lats[in_band] + 80) // 8).astype(int)]
+    eastings = np.full(len(lats), np.nan)
+    northings = np.full(len(lats), np.nan)
+    for zone_num, zone_letter in set(zip(zone_nums.tolist(), zone_letters.tolist())):
+        if not zone_letter: continue # Outside the UTM latitude band
+        zone_mask = (zone_nums == zone_num) & (zone_letters == zone_letter)
+        eastings[zone_mask], northings[zone_mask], _, _ = utm.from_latlon(lats[zone_mask], lons[zone_mask], zone_num, zone_letter)
+    return eastings, northings, zone_nums, zone_letters
+
+def placemarks_to_polygon_records(placemarks):
+    """
+    Converts a batch of parsed placemarks into polygon_data records, the same shape
+    process_csv_row_data produces. Placemarks without a 4-corner polygon are kept
+    with an error status so they show up in the table for review.
+    """
+    now_iso = datetime.datetime.now().isoformat()
+    records, corner_lists = [], []
+    for placemark in placemarks:
+        record_uuid = placemark["name"] or str(uuid.uuid4())
+        record = {"uuid": record_uuid, "response_code": f"{KML_IMPORT_RESPONSE_CODE_PREFIX}{record_uuid}",
+                  "farmer_name": "", "village_name": "", "block": "", "district": "", "proposed_area_acre": "",
+                  "status": "valid_for_kml", "error_messages": None, "last_modified": now_iso}
+        record.update(parse_kml_description(placemark["description"]))
+        corners = _placemark_corners(placemark["coordinates"])
+        if len(corners) != 4:
+            record["status"] = "error_parsing"
+            record["error_messages"] = f"KML polygon has {len(corners)} corner(s), expected 4."
+        records.append(record)
+        corner_lists.append(corners[:4])
+
+    points = [(record_index, point_index, lon, lat, alt) for record_index, corners in enumerate(corner_lists)
+              for point_index, (lon, lat, alt) in enumerate(corners)]
+    if points:
+        record_indexes, point_indexes, lons, lats, alts = (list(column) for column in zip(*points))
+        eastings, northings, zone_nums, zone_letters = _latlon_to_utm(np.array(lats, dtype=float), np.array(lons, dtype=float))
+        for record_index, point_index, altitude, easting, northing, zone_num, zone_letter in zip(
+                record_indexes, point_indexes, alts, eastings.tolist(), northings.tolist(), zone_nums.tolist(), zone_letters.tolist()):
+            record, number = records[record_index], point_index + 1
+            if not zone_letter:
+                record["status"] = "error_parsing"
+                record["error_messages"] = f"Point {number} is outside the UTM latitude range."
+                continue
+            record.update(zip(_POINT_KEYS[point_index], (f"{zone_num}{zone_letter} {easting:.2f} {northing:.2f}", altitude,
+                                                         easting, northing, zone_num, zone_letter, False)))
+    return records
+
+def iter_kml_polygon_records(kml_path, batch_size=DEFAULT_IMPORT_BATCH_SIZE):
+    """Streams a KML/KMZ file as batches (lists) of polygon_data records, ready for DatabaseManager.bulk_add_polygon_data."""
+    placemarks = iter_kml_placemarks(kml_path)
+    while True:
+        batch = list(itertools.islice(placemarks, batch_size))
+        if not batch: return
+        yield placemarks_to_polygon_records(batch)
@@ -0,0 +1,219 @@
+# File: DilasaKMLTool_v4/core/spatial_index.py
+# ----------------------------------------------------------------------
+# Purpose: Bounding-box grid index over polygon rings, so the map only
+#          receives the polygons inside the current viewport, and the
+#          zoom-dependent simplification of what is sent: polygons too
+#          small to see become points, points are thinned to one per few
+#          pixels, and coordinates are rounded to the precision the zoom
+#          level can show. Zoomed-out views use density grids instead:
+#          centroid counts per screen cell, kept for several zoom levels
+#          and updated incrementally as the set of records changes.
+# ----------------------------------------------------------------------
+import math
+
+import numpy as np
+
+GRID_TARGET_ITEMS_PER_CELL = 8
+GRID_MAX_CELLS_PER_AXIS = 2048
+GRID_MAX_CELLS_PER_ITEM = 64      # Larger (usually bad) polygons are kept in a separate list and always tested
+GRID_FULL_SCAN_FRACTION = 0.25    # Queries covering more of the grid than this test every bbox directly
+
+TILE_SIZE_PIXELS = 256
+MIN_POLYGON_PIXELS = 4            # Polygons smaller than this on screen are drawn as points
+POINT_CELL_PIXELS = 3             # At most one point per cell of this size
+MAX_VIEWPORT_POLYGONS = 5000
+MAX_VIEWPORT_POINTS = 10000
+
+DENSITY_ZOOM_LEVELS = range(3, 12) # Zoom levels with a precomputed density grid
+DENSITY_CELL_PIXELS = 16           # Grid cell size on screen at its zoom level
+
+def ring_bboxes(rings):
+    """(n, 4) array of (min_lon, min_lat, max_lon, max_lat) for (n, k, 2) lon/lat rings."""
+    rings = np.asarray(rings, dtype=float)
+    if not len(rings): return np.empty((0, 4))
+    return np.column_stack([rings[:, :, 0].min(axis=1), rings[:, :, 1].min(axis=1),
+                            rings[:, :, 0].max(axis=1), rings[:, :, 1].max(axis=1)])
+
+class BBoxGridIndex:
+    """
+    Static uniform-grid index over bounding boxes. Each bbox is listed under every grid cell it touches,
+    stored CSR-style (cell start offsets into one item array), so a query gathers the items of a few cell
+    runs and tests their bboxes exactly, all with NumPy. query() returns item positions in ascending order.
+    """
+    def __init__(self, bboxes, cell_size=None):
+        self.bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+        count = len(self.bboxes)
+        if count:
+            self.min_x, self.min_y = self.bboxes[:, 0].min(), self.bboxes[:, 1].min()
+            span_x = max(self.bboxes[:, 2].max() - self.min_x, 1e-9)
+            span_y = max(self.bboxes[:, 3].max() - self.min_y, 1e-9)
+        else:
+            self.min_x = self.min_y = 0.0; span_x = span_y = 1.0
+        if cell_size is None:
+            # Cells holding a few items each on average, but never smaller than a typical polygon
+            typical_extent = np.median(np.maximum(self.bboxes[:, 2] - self.bboxes[:, 0], self.bboxes[:, 3] - self.bboxes[:, 1])) if count else 0.0
+            cell_size = max(math.sqrt(span_x * span_y * GRID_TARGET_ITEMS_PER_CELL / max(count, 1)), 2 * typical_extent)
+        self.cell_size = max(cell_size, span_x / GRID_MAX_CELLS_PER_AXIS, span_y / GRID_MAX_CELLS_PER_AXIS)
+        self.nx = min(int(span_x / self.cell_size) + 1, GRID_MAX_CELLS_PER_AXIS)
+        self.ny = min(int(span_y / self.cell_size) + 1, GRID_MAX_CELLS_PER_AXIS)
+
+        x0, y0, x1, y1 = self._cell_ranges(self.bboxes)
+        spans_x, spans_y = x1 - x0 + 1, y1 - y0 + 1
+        oversized = spans_x * spans_y > GRID_MAX_CELLS_PER_ITEM
+        self.oversized = np.nonzero(oversized)[0]
+        items = np.nonzero(~oversized)[0]
+        x0, y0, spans_x, spans_y = x0[items], y0[items], spans_x[items], spans_y[items]
+        # One (cell, item) entry per touched cell: repeat each item over its span, then add its row/column offsets
+        cells_per_item = spans_x * spans_y
+        entry_items = np.repeat(items, cells_per_item)
+        offsets = np.arange(len(entry_items)) - np.repeat(np.cumsum(cells_per_item) - cells_per_item, cells_per_item)
+        entry_spans_x = np.repeat(spans_x, cells_per_item)
+        entry_cells = (np.repeat(y0, cells_per_item) + offsets // entry_spans_x) * self.nx + np.repeat(x0, cells_per_item) + offsets % entry_spans_x
+        order = np.argsort(entry_cells, kind="stable")
+        self.cell_items = entry_items[order]
+        self.cell_starts = np.searchsorted(entry_cells[order], np.arange(self.nx * self.ny + 1))
+
+    def __len__(self): return len(self.bboxes)
+
+    def _cell_ranges(self, bboxes):
+        def cell(values, origin, cell_count):
+            return np.clip(((values - origin) // self.cell_size).astype(np.int64), 0, cell_count - 1)
+        return (cell(bboxes[:, 0], self.min_x, self.nx), cell(bboxes[:, 1], self.min_y, self.ny),
+                cell(bboxes[:, 2], self.min_x, self.nx), cell(bboxes[:, 3], self.min_y, self.ny))
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """Positions of the bboxes intersecting (min_x, min_y, max_x, max_y), ascending."""
+        if not len(self.bboxes): return np.empty(0, dtype=np.int64)
+        (x0,), (y0,), (x1,), (y1,) = self._cell_ranges(np.array([[min_x, min_y, max_x, max_y]], dtype=float))
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > GRID_FULL_SCAN_FRACTION * self.nx * self.ny:
+            candidates = None # Most of the grid: a direct test over every bbox is cheaper than gathering
+        else:
+            # Each grid row of the query range is one contiguous run of cells, so one slice of cell_items
+            runs = [self.cell_items[self.cell_starts[row * self.nx + x0]:self.cell_starts[row * self.nx + x1 + 1]] for row in range(y0, y1 + 1)]
+            candidates = np.unique(np.concatenate(runs + [self.oversized]))
+        bboxes = self.bboxes if candidates is None else self.bboxes[candidates]
+        hits = (bboxes[:, 0] <= max_x) & (bboxes[:, 2] >= min_x) & (bboxes[:, 1] <= max_y) & (bboxes[:, 3] >= min_y)
+        return np.nonzero(hits)[0] if candidates is None else candidates[hits]
+
+def degrees_per_pixel(zoom, latitude=0.0):
+    """(longitude, latitude) degrees covered by one screen pixel at a Web Mercator zoom level."""
+    lon_degrees = 360.0 / (TILE_SIZE_PIXELS * 2 ** zoom)
+    return lon_degrees, lon_degrees * math.cos(math.radians(max(min(latitude, 85.0), -85.0)))
+
+def _thin_points(points, cell_x, cell_y, max_points):
+    """Keeps one (lon, lat) point per cell_x by cell_y cell, growing the cells until at most max_points remain."""
+    while True:
+        cells_x = np.floor(points[:, 0] / cell_x).astype(np.int64)
+        cells_y = np.floor(points[:, 1] / cell_y).astype(np.int64)
+        cells_y -= cells_y.min() # One int64 key per cell: a 1-D unique is much faster than unique(axis=0)
+        _, first = np.unique((cells_x - cells_x.min()) * (cells_y.max() + 1) + cells_y, return_index=True)
+        if len(first) <= max_points: return points[np.sort(first)]
+        cell_x, cell_y = cell_x * 2, cell_y * 2
+
+def viewport_layer(index, rings, ids, viewport, zoom, max_polygons=MAX_VIEWPORT_POLYGONS, max_points=MAX_VIEWPORT_POINTS):
+    """
+    What the map should draw for one viewport: polygons big enough to see (largest first, up to
+    max_polygons) as [id, lat1, lon1, ..., latN, lonN] lists, and the rest as thinned [lat, lon] points.
+    rings are the indexed closed (n, k, 2) lon/lat rings, ids their record ids, viewport (west, south, east, north).
+    Returns (polygons, points), both JSON-ready lists.
+    """
+    west, south, east, north = viewport
+    visible = index.query(west, south, east, north)
+    if not len(visible): return [], []
+    deg_x, deg_y = degrees_per_pixel(zoom, (south + north) / 2)
+    bboxes = index.bboxes[visible]
+    pixel_size = np.maximum((bboxes[:, 2] - bboxes[:, 0]) / deg_x, (bboxes[:, 3] - bboxes[:, 1]) / deg_y)
+    big = pixel_size >= MIN_POLYGON_PIXELS
+    if big.sum() > max_polygons:
+        big[np.argsort(-pixel_size, kind="stable")[max_polygons:]] = False
+
+    # Round to half a pixel: more digits only make the message bigger
+    decimals = min(max(int(math.ceil(-math.log10(min(deg_x, deg_y) / 2))), 0), 7)
+    drawn = visible[big]
+    polygon_rings = np.round(rings[drawn][:, :-1, ::-1], decimals).reshape(len(drawn), (rings.shape[1] - 1) * 2) # (lat, lon) pairs without the closing point, flattened
+    polygons = [[record_id] + coords for record_id, coords in zip(np.asarray(ids)[drawn].tolist(), polygon_rings.tolist())]
+
+    small = ~big
+    points = []
+    if small.any():
+        centres = np.column_stack([(bboxes[small, 0] + bboxes[small, 2]) / 2, (bboxes[small, 1] + bboxes[small, 3]) / 2])
+        centres = _thin_points(centres, deg_x * POINT_CELL_PIXELS, deg_y * POINT_CELL_PIXELS, max_points)
+        points = np.round(centres[:, ::-1], decimals).tolist()
+    return polygons, points
+
+def lonlat_to_world_pixels(lonlat, zoom):
+    """Web Mercator pixel coordinates (x, y from the top-left of the world) of (n, 2) lon/lat points at a zoom level."""
+    lonlat = np.asarray(lonlat, dtype=float).reshape(-1, 2)
+    world_size = TILE_SIZE_PIXELS * 2 ** zoom
+    lat = np.radians(np.clip(lonlat[:, 1], -85.05112878, 85.05112878))
+    return np.column_stack([(lonlat[:, 0] + 180.0) / 360.0 * world_size,
+                            (1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * world_size])
+
+class DensityGrids:
+    """
+    Point counts per DENSITY_CELL_PIXELS screen cell at each zoom level, for drawing zoomed-out views as a
+    grid instead of tens of thousands of polygons. Grids are sparse (sorted cell keys + counts) and keyed by
+    record id: sync() histograms only the points that were added, removed or moved since the last call.
+    """
+    def __init__(self, zoom_levels=DENSITY_ZOOM_LEVELS, cell_pixels=DENSITY_CELL_PIXELS):
+        self.zoom_levels = list(zoom_levels)
+        self.cell_pixels = cell_pixels
+        self._ids = np.empty(0, dtype=np.int64)
+        self._points = np.empty((0, 2))
+        self._grids = {zoom: (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)) for zoom in self.zoom_levels}
+
+    def __len__(self): return len(self._ids)
+
+    def _cells_per_row(self, zoom):
+        return TILE_SIZE_PIXELS * 2 ** zoom // self.cell_pixels
+
+    def _cell_keys(self, points, zoom):
+        cells = (lonlat_to_world_pixels(points, zoom) // self.cell_pixels).astype(np.int64)
+        return cells[:, 1] * self._cells_per_row(zoom) + cells[:, 0]
+
+    def _add(self, points, weight):
+        if not len(points): return
+        for zoom, (keys, counts) in self._grids.items():
+            all_keys, cell_index = np.unique(np.concatenate([keys, self._cell_keys(points, zoom)]), return_inverse=True)
+            all_counts = np.bincount(cell_index, weights=np.concatenate([counts, np.full(len(points), weight)]), minlength=len(all_keys)).astype(np.int64)
+            occupied = all_counts > 0
+            self._grids[zoom] = (all_keys[occupied], all_counts[occupied])
+
+    def sync(self, ids, points):
+        """
+        Makes the grids count exactly these (lon, lat) points, one per record id. Only the differences from the
+        previous call are histogrammed. Returns the number of points added, removed or moved.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        order = np.argsort(ids, kind="stable")
+        ids, points = ids[order], points[order]
+        kept_old = np.isin(self._ids, ids, assume_unique=True)
+        kept_new = np.isin(ids, self._ids, assume_unique=True)
+        moved = np.zeros(len(ids), dtype=bool)
+        moved[kept_new] = (points[kept_new] != self._points[kept_old]).any(axis=1) # Both sides sorted by id, so kept rows line up
+        moved_old = np.zeros(len(self._ids), dtype=bool)
+        moved_old[kept_old] = moved[kept_new]
+        self._add(self._points[~kept_old | moved_old], -1)
+        self._add(points[~kept_new | moved], 1)
+        changed = int((~kept_old).sum() + (~kept_new).sum() + moved.sum())
+        self._ids, self._points = ids, points
+        return changed
+
+    def grid_zoom(self, zoom):
+        """The precomputed zoom level used for a map zoom level."""
+        return min(max(int(zoom), self.zoom_levels[0]), self.zoom_levels[-1])
+
+    def cells(self, viewport, zoom):
+        """
+        ([[cell_x, cell_y, count], ...] inside viewport (west, south, east, north), grid zoom level, largest count
+        in that zoom level's grid). A cell covers pixels cell_x * cell_pixels .. (cell_x + 1) * cell_pixels at the grid zoom.
+        """
+        grid_zoom = self.grid_zoom(zoom)
+        keys, counts = self._grids[grid_zoom]
+        if not len(keys): return [], grid_zoom, 0
+        west, south, east, north = viewport
+        (x0, y0), (x1, y1) = lonlat_to_world_pixels([(west, north), (east, south)], grid_zoom) // self.cell_pixels
+        cells_x, cells_y = keys % self._cells_per_row(grid_zoom), keys // self._cells_per_row(grid_zoom)
+        inside = (cells_x >= x0) & (cells_x <= x1) & (cells_y >= y0) & (cells_y <= y1)
+        return np.column_stack([cells_x[inside], cells_y[inside], counts[inside]]).tolist(), grid_zoom, int(counts.max())
@@ -0,0 +1,113 @@
+# File: DilasaKMLTool_v4/core/table_exporters.py
+# ----------------------------------------------------------------------
+# Purpose: Writers for the records displayed in the main table: CSV,
+#          XLSX (XlsxWriter constant_memory mode, falling back to openpyxl
+#          write-only mode) and Parquet (pyarrow).
+#          Input is column-oriented (one sequence per table column) plus
+#          the row indexes to write; rows are gathered chunk by chunk so
+#          the writers can run on a worker thread from a snapshot.
+# ----------------------------------------------------------------------
+import csv
+
+DEFAULT_TABLE_EXPORT_CHUNK_SIZE = 50000
+XLSX_MAX_DATA_ROWS = 1048575 # Excel sheet row limit minus the header row
+
+class TableExportCancelled(Exception):
+    pass
+
+def iter_column_chunks(columns, row_indexes, chunk_size=DEFAULT_TABLE_EXPORT_CHUNK_SIZE, progress_callback=None, cancel_check=None):
+    """Yields the selected rows as lists of column values, chunk_size rows at a time."""
+    written = 0
+    for start in range(0, len(row_indexes), chunk_size):
+        if cancel_check and cancel_check(): raise TableExportCancelled()
+        chunk_rows = row_indexes[start:start + chunk_size]
+        yield [list(map(column.__getitem__, chunk_rows)) for column in columns]
+        written += len(chunk_rows)
+        if progress_callback: progress_callback(written)
+
+def export_table_csv(headers, columns, row_indexes, output_path, chunk_size=DEFAULT_TABLE_EXPORT_CHUNK_SIZE,
+                     progress_callback=None, cancel_check=None):
+    """Writes a UTF-8 (with BOM, for Excel) CSV file. None values are written as empty cells. Returns the rows written."""
+    with open(output_path, "w", newline="", encoding="utf-8-sig") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(headers)
+        for chunk_columns in iter_column_chunks(columns, row_indexes, chunk_size, progress_callback, cancel_check):
+            writer.writerows(zip(*chunk_columns))
+    return len(row_indexes)
+
+def _iter_sheet_rows(headers, columns, row_indexes, chunk_size, progress_callback, cancel_check):
+    """Yields (sheet_number, row_number, values) with a header row at the top of every sheet, splitting at the Excel row limit."""
+    sheet_number, sheet_row = 0, XLSX_MAX_DATA_ROWS
+    for chunk_columns in iter_column_chunks(columns, row_indexes, chunk_size, progress_callback, cancel_check):
+        for values in zip(*chunk_columns):
+            if sheet_row == XLSX_MAX_DATA_ROWS:
+                sheet_number, sheet_row = sheet_number + 1, 0
+                yield sheet_number, 0, headers
+            sheet_row += 1
+            yield sheet_number, sheet_row, values
+
+def _sheet_title(title, sheet_number):
+    return title if sheet_number == 1 else f"{title} {sheet_number}"
+
+def export_table_xlsx(headers, columns, row_indexes, output_path, chunk_size=DEFAULT_TABLE_EXPORT_CHUNK_SIZE,
+                      progress_callback=None, cancel_check=None, sheet_title="Polygon Data"):
+    """
+    Writes an Excel workbook in streaming mode: XlsxWriter's constant_memory mode if installed, otherwise
+    openpyxl's write-only mode (several times slower without lxml). Rows are never held as cells, and
+    tables longer than the Excel row limit continue on additional sheets. Returns the rows written.
+    Requires the optional xlsxwriter or openpyxl package.
+    """
+    rows = _iter_sheet_rows(headers, columns, row_indexes, chunk_size, progress_callback, cancel_check)
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+    if xlsxwriter is not None:
+        with xlsxwriter.Workbook(output_path, {"constant_memory": True}) as workbook:
+            sheet, current_sheet = None, 0
+            for sheet_number, row_number, values in rows:
+                if sheet_number != current_sheet:
+                    sheet, current_sheet = workbook.add_worksheet(_sheet_title(sheet_title, sheet_number)), sheet_number
+                sheet.write_row(row_number, 0, values)
+            if sheet is None: workbook.add_worksheet(sheet_title).write_row(0, 0, headers)
+        return len(row_indexes)
+
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise RuntimeError(f"XLSX export needs the 'xlsxwriter' or 'openpyxl' package ({e}). Install one with: pip install xlsxwriter")
+    workbook = Workbook(write_only=True)
+    sheet, current_sheet = None, 0
+    for sheet_number, row_number, values in rows:
+        if sheet_number != current_sheet:
+            sheet, current_sheet = workbook.create_sheet(_sheet_title(sheet_title, sheet_number)), sheet_number
+        sheet.append(values)
+    if sheet is None: workbook.create_sheet(sheet_title).append(headers)
+    workbook.save(output_path)
+    return len(row_indexes)
+
+def export_table_parquet(headers, columns, row_indexes, output_path, chunk_size=DEFAULT_TABLE_EXPORT_CHUNK_SIZE,
+                         progress_callback=None, cancel_check=None, integer_columns=()):
+    """
+    Writes a Parquet file, one row group per chunk. Columns named in integer_columns are
+    written as int64, the others as strings. Returns the rows written.
+    Requires the optional pyarrow package.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError(f"Parquet export needs the 'pyarrow' package ({e}). Install it with: pip install pyarrow")
+
+    schema = pa.schema([pa.field(header, pa.int64() if header in integer_columns else pa.string()) for header in headers])
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for chunk_columns in iter_column_chunks(columns, row_indexes, chunk_size, progress_callback, cancel_check):
+            writer.write_table(pa.table([pa.array(values, type=field.type) for values, field in zip(chunk_columns, schema)], schema=schema))
+    return len(row_indexes)
+
+# Format key -> (display name, file extension, exporter)
+TABLE_EXPORT_FORMATS = {
+    "csv": ("CSV", ".csv", export_table_csv),
+    "xlsx": ("Excel Workbook", ".xlsx", export_table_xlsx),
+    "parquet": ("Parquet", ".parquet", export_table_parquet),
+}
@@ -0,0 +1,179 @@
+# File: DilasaKMLTool_v4/core/tile_cache.py
+# ----------------------------------------------------------------------
+# Purpose: On-disk map tile store for offline basemaps. Tiles live in a
+#          single SQLite file (MBTiles-style tiles table, plus a provider
+#          column so several basemaps share one store) with LRU eviction
+#          under a size quota, and can be pre-seeded for polygon bboxes.
+# ----------------------------------------------------------------------
+import math
+import time
+import sqlite3
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+TILE_CACHE_FILE_NAME = "tile_cache.mbtiles"
+DEFAULT_TILE_CACHE_MAX_BYTES = 1024 * 1024 * 1024 # 1 GB
+TILE_EVICTION_TARGET = 0.9 # Evict down to 90% of the quota so every insert does not trigger an eviction
+TILE_FETCH_TIMEOUT_SECONDS = 15
+TILE_FETCH_USER_AGENT = "DilasaKMLTool/4 (tile cache)"
+
+# Provider key -> (tile URL template, MIME type). Keys are what the map page asks the tile URL scheme for.
+TILE_PROVIDERS = {
+    "esri": ("https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}", "image/jpeg"),
+    "osm": ("https://tile.openstreetmap.org/{z}/{x}/{y}.png", "image/png"),
+    "carto": ("https://a.basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png", "image/png"),
+}
+# OpenStreetMap's tile usage policy does not allow bulk downloads, so only imagery is pre-seeded by default
+DEFAULT_SEED_PROVIDERS = ["esri"]
+MAX_SEED_ZOOM = 19
+MAX_SEED_TILES = 50000 # Hard cap per seeding run: about the default quota's worth of imagery, and a polite load on the tile server
+
+class TileLimitExceeded(ValueError): # More tiles asked for than the max_tiles cap
+    pass
+
+def lonlat_to_tile(lon, lat, zoom):
+    """Slippy-map tile (x, y) containing lon/lat at a zoom level, clamped to the tile grid."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tiles_for_bboxes(bboxes, zoom_min, zoom_max, max_tiles=None):
+    """
+    Distinct (z, x, y) tiles covering (min_lon, min_lat, max_lon, max_lat) bboxes at each zoom level,
+    in zoom order. Overlapping bboxes (neighbouring fields) share their tiles.
+    Raises TileLimitExceeded as soon as there are more than max_tiles, before building the whole list.
+    """
+    tiles = []
+    for zoom in range(zoom_min, zoom_max + 1):
+        zoom_tiles = set()
+        for min_lon, min_lat, max_lon, max_lat in bboxes:
+            x_min, y_min = lonlat_to_tile(min_lon, max_lat, zoom) # Tile y grows southwards
+            x_max, y_max = lonlat_to_tile(max_lon, min_lat, zoom)
+            if max_tiles is not None and (x_max - x_min + 1) * (y_max - y_min + 1) > max_tiles:
+                raise TileLimitExceeded(f"One polygon alone needs more than {max_tiles} tiles at zoom {zoom}.")
+            zoom_tiles.update(itertools.product(range(x_min, x_max + 1), range(y_min, y_max + 1)))
+            if max_tiles is not None and len(tiles) + len(zoom_tiles) > max_tiles:
+                raise TileLimitExceeded(f"More than {max_tiles} tiles are needed up to zoom {zoom}.")
+        tiles.extend((zoom, x, y) for x, y in sorted(zoom_tiles))
+    return tiles
+
+class TileCache:
+    """
+    SQLite tile store. get() refreshes a tile's last access time; put() evicts the least recently used
+    tiles once the stored bytes exceed max_bytes. One instance per thread (sqlite3 connections are not shared).
+    """
+    def __init__(self, db_path, max_bytes=DEFAULT_TILE_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS tiles (
+                                 provider TEXT NOT NULL, zoom_level INTEGER NOT NULL, tile_column INTEGER NOT NULL,
+                                 tile_row INTEGER NOT NULL, tile_data BLOB NOT NULL, size INTEGER NOT NULL,
+                                 last_access REAL NOT NULL,
+                                 PRIMARY KEY (provider, zoom_level, tile_column, tile_row))""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tiles_last_access ON tiles (last_access)")
+        self._stored_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+
+    def get(self, provider, z, x, y):
+        row = self.conn.execute("SELECT tile_data FROM tiles WHERE provider=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                                (provider, z, x, y)).fetchone()
+        if row is None: return None
+        self.conn.execute("UPDATE tiles SET last_access=? WHERE provider=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                          (time.time(), provider, z, x, y))
+        return row[0]
+
+    def contains(self, provider, z, x, y):
+        return self.conn.execute("SELECT 1 FROM tiles WHERE provider=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                                 (provider, z, x, y)).fetchone() is not None
+
+    def put(self, provider, z, x, y, data):
+        self.put_many([(provider, z, x, y, data)])
+
+    def put_many(self, tiles):
+        """Stores [(provider, z, x, y, data), ...] in one transaction, then evicts if over quota."""
+        now = time.time()
+        self.conn.execute("BEGIN")
+        try:
+            for provider, z, x, y, data in tiles:
+                old = self.conn.execute("SELECT size FROM tiles WHERE provider=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                                        (provider, z, x, y)).fetchone()
+                self.conn.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?, ?)", (provider, z, x, y, data, len(data), now))
+                self._stored_bytes += len(data) - (old[0] if old else 0)
+            self.conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK")
+            raise
+        if self._stored_bytes > self.max_bytes: self.evict()
+
+    def evict(self, target_bytes=None):
+        """Deletes least recently used tiles until the store is under target_bytes (default: 90% of the quota)."""
+        if target_bytes is None: target_bytes = int(self.max_bytes * TILE_EVICTION_TARGET)
+        self._stored_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0] # Other connections may have written
+        excess = self._stored_bytes - target_bytes
+        if excess <= 0: return 0
+        # Oldest tiles until their sizes cover the excess. Tiles stored by one put_many share a last_access,
+        # so ties are broken by rowid (insertion order) rather than deleting every tile with the cutoff time
+        deleted = self.conn.execute("""DELETE FROM tiles WHERE rowid IN (
+                                           SELECT rowid FROM (SELECT rowid, SUM(size) OVER (ORDER BY last_access, rowid) - size AS before
+                                                              FROM tiles) WHERE before < ?)""", (excess,)).rowcount
+        self._stored_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+        return deleted
+
+    def stats(self):
+        count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tiles").fetchone()
+        return {"tiles": count, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+def tile_url(provider, z, x, y):
+    return TILE_PROVIDERS[provider][0].format(z=z, x=x, y=y)
+
+def fetch_tile(provider, z, x, y, session=None, timeout=TILE_FETCH_TIMEOUT_SECONDS):
+    """Downloads one tile; returns its bytes, or None if the server has no tile there. Network errors are raised."""
+    import requests # Only needed for seeding, not for serving cached tiles
+    response = (session or requests).get(tile_url(provider, z, x, y), timeout=timeout, headers={"User-Agent": TILE_FETCH_USER_AGENT})
+    if response.status_code == 404: return None
+    response.raise_for_status()
+    return response.content
+
+def seed_tiles(cache, bboxes, zoom_min, zoom_max, providers=None, max_workers=4, batch_size=100,
+               progress_callback=None, cancel_check=None, max_tiles=MAX_SEED_TILES):
+    """
+    Downloads every tile covering the bboxes at zoom_min..zoom_max that is not cached yet.
+    Downloads run on a small thread pool; tiles are stored from the calling thread in batches.
+    Raises TileLimitExceeded, before downloading anything, if more than max_tiles tiles per provider are needed.
+    Returns (downloaded, already_cached, failed).
+    """
+    import requests
+    providers = providers or DEFAULT_SEED_PROVIDERS
+    wanted = [(provider, z, x, y) for provider in providers for z, x, y in tiles_for_bboxes(bboxes, zoom_min, zoom_max, max_tiles)]
+    missing = [tile for tile in wanted if not cache.contains(*tile)]
+    already_cached, downloaded, failed = len(wanted) - len(missing), 0, 0
+    if progress_callback: progress_callback(already_cached, len(wanted))
+
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers))
+
+    def download(tile):
+        try: return tile, fetch_tile(*tile, session=session)
+        except requests.RequestException: return tile, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for start in range(0, len(missing), batch_size):
+            if cancel_check and cancel_check(): break
+            batch = []
+            for tile, data in executor.map(download, missing[start:start + batch_size]):
+                if data: batch.append((*tile, data))
+                else: failed += 1
+            cache.put_many(batch)
+            downloaded += len(batch)
+            if progress_callback: progress_callback(already_cached + downloaded + failed, len(wanted))
+    session.close()
+    return downloaded, already_cached, failed
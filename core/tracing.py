@@ -0,0 +1,179 @@
+# File: DilasaKMLTool_v4/core/tracing.py
+# ----------------------------------------------------------------------
+# Purpose: Lightweight timing spans for the hot paths (row processing,
+#          duplicate checks, DB writes, UTM conversion, KML writing, table
+#          model refreshes). Off by default, where a span is one attribute
+#          check; when on, spans are aggregated per name (count, total,
+#          percentiles) and kept as events that export as a Chrome trace /
+#          Perfetto JSON file. A cProfile run of the calling thread can be
+#          started and dumped alongside.
+#          Enable with DILASA_TRACE=1 (or =path/to/trace.json to also write
+#          the trace at exit) and DILASA_PROFILE=path/to/file.prof, read by
+#          the app and command line entry points, or from Tools >
+#          Diagnostics in the app.
+# ----------------------------------------------------------------------
+import os
+import sys
+import json
+import atexit
+import random
+import cProfile
+import threading
+import functools
+from time import perf_counter_ns
+from collections import deque
+
+TRACE_ENV_VAR = "DILASA_TRACE"
+PROFILE_ENV_VAR = "DILASA_PROFILE"
+MAX_TRACE_EVENTS = 500000 # Most recent spans kept for the trace file; the aggregates cover every span
+PERCENTILE_SAMPLES = 10000 # Durations kept per span name (reservoir sample) for the percentiles
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc_value, traceback): return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start_ns")
+    def __init__(self, tracer, name, args):
+        self.tracer, self.name, self.args = tracer, name, args
+
+    def __enter__(self):
+        self.start_ns = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer._record(self.name, self.start_ns, perf_counter_ns() - self.start_ns, self.args)
+        return False
+
+class _SpanStats:
+    __slots__ = ("count", "total_ns", "max_ns", "samples")
+    def __init__(self): self.count, self.total_ns, self.max_ns, self.samples = 0, 0, 0, []
+
+class Tracer:
+    """Collects named spans from any thread. Use the module-level tracer, span() and traced()."""
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=MAX_TRACE_EVENTS)
+        self._stats = {}
+        self._thread_names = {}
+        self._sample_rng = random.Random(0)
+        self._epoch_ns = perf_counter_ns()
+        self._profiler = None
+
+    def enable(self): self.enabled = True
+    def disable(self): self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._events.clear(); self._stats.clear()
+            self._epoch_ns = perf_counter_ns()
+
+    def span(self, name, **args):
+        """Context manager timing the enclosed block as span name; args are shown on the trace event."""
+        if not self.enabled: return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def _record(self, name, start_ns, duration_ns, args):
+        thread_id = threading.get_ident()
+        with self._lock:
+            if thread_id not in self._thread_names: self._thread_names[thread_id] = threading.current_thread().name
+            self._events.append((name, start_ns, duration_ns, thread_id, args))
+            stats = self._stats.get(name)
+            if stats is None: stats = self._stats[name] = _SpanStats()
+            stats.count += 1; stats.total_ns += duration_ns
+            if duration_ns > stats.max_ns: stats.max_ns = duration_ns
+            if len(stats.samples) < PERCENTILE_SAMPLES: stats.samples.append(duration_ns)
+            else:
+                slot = self._sample_rng.randrange(stats.count)
+                if slot < PERCENTILE_SAMPLES: stats.samples[slot] = duration_ns
+
+    def summary(self):
+        """Per span name: count, total_ms, mean_ms, p50_ms, p90_ms, p99_ms, max_ms; slowest total first."""
+        with self._lock: stats_items = [(name, stats.count, stats.total_ns, stats.max_ns, sorted(stats.samples)) for name, stats in self._stats.items()]
+        rows = []
+        for name, count, total_ns, max_ns, samples in stats_items:
+            percentile = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] / 1e6
+            rows.append({"name": name, "count": count, "total_ms": total_ns / 1e6, "mean_ms": total_ns / count / 1e6,
+                         "p50_ms": percentile(0.50), "p90_ms": percentile(0.90), "p99_ms": percentile(0.99), "max_ms": max_ns / 1e6})
+        return sorted(rows, key=lambda row: -row["total_ms"])
+
+    def format_summary(self):
+        """The summary as a fixed-width text table."""
+        rows = self.summary()
+        if not rows: return "No spans recorded" + ("." if self.enabled else " (tracing is off).")
+        lines = [f"{'span':<28} {'count':>9} {'total ms':>10} {'mean ms':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for row in rows:
+            lines.append(f"{row['name']:<28} {row['count']:>9} {row['total_ms']:>10.1f} {row['mean_ms']:>9.3f} {row['p50_ms']:>9.3f} "
+                         f"{row['p90_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['max_ms']:>9.3f}")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, output_path):
+        """Writes the recorded spans as Chrome trace event JSON (opens in chrome://tracing and ui.perfetto.dev). Returns the event count."""
+        with self._lock: events, thread_names, epoch_ns = list(self._events), dict(self._thread_names), self._epoch_ns
+        pid = os.getpid()
+        trace_events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+                        for thread_id, thread_name in thread_names.items()]
+        for name, start_ns, duration_ns, thread_id, args in events:
+            if start_ns < epoch_ns: continue # Recorded before a reset
+            event = {"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": thread_id,
+                     "ts": (start_ns - epoch_ns) / 1000, "dur": duration_ns / 1000}
+            if args: event["args"] = args
+            trace_events.append(event)
+        with open(output_path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, trace_file, default=str)
+        return len(trace_events) - len(thread_names)
+
+    @property
+    def profiling(self): return self._profiler is not None
+
+    def start_profile(self):
+        """Starts cProfile on the calling thread (in the app, the GUI thread)."""
+        if self._profiler: return
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop_profile(self, output_path=None):
+        """Stops the cProfile run and, if output_path is given, dumps it there (readable with pstats or snakeviz)."""
+        profiler, self._profiler = self._profiler, None
+        if not profiler: return
+        profiler.disable()
+        if output_path: profiler.dump_stats(output_path)
+
+tracer = Tracer()
+span = tracer.span
+
+def traced(name):
+    """Decorator timing each call of a function as span name. Not for generator functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled: return func(*args, **kwargs)
+            with _Span(tracer, name, None): return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+_environment_applied = False
+
+def configure_from_environment(environ=os.environ):
+    """
+    Applies DILASA_TRACE / DILASA_PROFILE; files named by them are written when the process exits.
+    Called once by each entry point (main_app.py, python -m dilasa), never at import: KML export worker
+    processes started with spawn re-import this module, and must not start their own tracer and atexit
+    writers that overwrite the parent's trace and profile files.
+    """
+    global _environment_applied
+    if _environment_applied: return
+    _environment_applied = True
+    trace_setting = environ.get(TRACE_ENV_VAR, "").strip()
+    if trace_setting and trace_setting.lower() not in ("0", "false", "no", "off"):
+        tracer.enable()
+        if trace_setting.lower().endswith(".json"):
+            atexit.register(lambda: print(f"Trace: {tracer.export_chrome_trace(trace_setting)} span(s) written to {trace_setting}", file=sys.stderr))
+    profile_path = environ.get(PROFILE_ENV_VAR, "").strip()
+    if profile_path:
+        tracer.start_profile()
+        atexit.register(tracer.stop_profile, profile_path)
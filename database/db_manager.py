@@ -2,12 +2,44 @@ import sqlite3
 import os
 import datetime
 
+from core.tracing import span, traced
+
 # --- Database Configuration ---
 # These constants will be used by the main application to instantiate the DB manager
 # For modularity, the DB_FOLDER_NAME and DB_FILE_NAME could also be passed
 # to the DatabaseManager constructor if you prefer more flexibility later.
 DB_FOLDER_NAME_CONST = "DilasaKMLTool_v4" # AppData subfolder for this version
 DB_FILE_NAME_CONST = "app_data_v4.db"   # Specific DB file for this version
+ARCHIVE_DB_FILE_NAME_CONST = "archive_v4.db" # Cold storage for old, exported polygon records
+ARCHIVE_SCHEMA_NAME = "archive" # Schema name the archive DB is attached under
+
+# Polygon Data Table - Updated for v4 with KML export tracking.
+# Shared by the hot table (main) and the attached archive so both always have the same columns.
+POLYGON_DATA_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {schema}.polygon_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        uuid TEXT UNIQUE NOT NULL,
+        response_code TEXT UNIQUE NOT NULL,
+        farmer_name TEXT,
+        village_name TEXT,
+        block TEXT,
+        district TEXT,
+        proposed_area_acre TEXT,
+        p1_utm_str TEXT, p1_altitude REAL, p1_easting REAL, p1_northing REAL, p1_zone_num INTEGER, p1_zone_letter TEXT, p1_substituted BOOLEAN DEFAULT 0,
+        p2_utm_str TEXT, p2_altitude REAL, p2_easting REAL, p2_northing REAL, p2_zone_num INTEGER, p2_zone_letter TEXT, p2_substituted BOOLEAN DEFAULT 0,
+        p3_utm_str TEXT, p3_altitude REAL, p3_easting REAL, p3_northing REAL, p3_zone_num INTEGER, p3_zone_letter TEXT, p3_substituted BOOLEAN DEFAULT 0,
+        p4_utm_str TEXT, p4_altitude REAL, p4_easting REAL, p4_northing REAL, p4_zone_num INTEGER, p4_zone_letter TEXT, p4_substituted BOOLEAN DEFAULT 0,
+        status TEXT NOT NULL, -- e.g., 'valid_for_kml', 'error_missing_points', 'error_parsing'
+        error_messages TEXT,  -- Store as newline-separated string or JSON string
+        kml_export_count INTEGER DEFAULT 0,
+        last_kml_export_date TIMESTAMP,
+        date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP 
+    )
+'''
+
+# Columns shown in the main table view (order matters, PolygonTableModel relies on it)
+DISPLAY_COLUMNS_SQL = "id, status, uuid, farmer_name, village_name, date_added, kml_export_count, last_kml_export_date"
 
 class DatabaseManager:
     """
@@ -25,6 +57,24 @@ class DatabaseManager:
             db_file_name (str, optional): Name of the SQLite database file.
                                           Defaults to DB_FILE_NAME_CONST.
         """
+        self.db_folder_name, self.db_file_name = db_folder_name, db_file_name
+        self.db_path = self.resolve_db_path(db_folder_name, db_file_name)
+        self.archive_db_path = os.path.join(os.path.dirname(self.db_path), ARCHIVE_DB_FILE_NAME_CONST)
+
+        self.conn = None
+        self.cursor = None
+        self.archive_attached = False
+        self._connect()
+        self._create_tables()
+        self._attach_archive()
+        # print(f"Database initialized at: {self.db_path}") # For debugging
+
+    @staticmethod
+    def resolve_db_path(db_folder_name=None, db_file_name=None):
+        """
+        Returns the database file path (creating its AppData folder if needed) without opening it,
+        so callers can place files next to the DB before it has been opened.
+        """
         folder_name = db_folder_name or DB_FOLDER_NAME_CONST
         file_name = db_file_name or DB_FILE_NAME_CONST
         
@@ -33,15 +83,17 @@ class DatabaseManager:
             app_data_dir = os.path.expanduser("~")
             print(f"Warning: APPDATA environment variable not found. Using user home directory: {app_data_dir}")
 
-        self.db_path = os.path.join(app_data_dir, folder_name)
-        os.makedirs(self.db_path, exist_ok=True) # Ensure the directory exists
-        self.db_path = os.path.join(self.db_path, file_name)
+        db_folder = os.path.join(app_data_dir, folder_name)
+        os.makedirs(db_folder, exist_ok=True) # Ensure the directory exists
+        return os.path.join(db_folder, file_name)
 
-        self.conn = None
-        self.cursor = None
-        self._connect()
-        self._create_tables()
-        # print(f"Database initialized at: {self.db_path}") # For debugging
+    def open_for_worker_thread(self):
+        """
+        Opens another DatabaseManager on the same database files. sqlite3 connections can only be
+        used by the thread that created them, so a QThread worker reading records gets its own
+        (and closes it when done).
+        """
+        return DatabaseManager(self.db_folder_name, self.db_file_name)
 
     def _connect(self):
         """Establishes a connection to the SQLite database."""
@@ -66,33 +118,31 @@ class DatabaseManager:
                 )
             ''')
 
-            # Polygon Data Table - Updated for v4 with KML export tracking
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS polygon_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    uuid TEXT UNIQUE NOT NULL,
-                    response_code TEXT UNIQUE NOT NULL,
-                    farmer_name TEXT,
-                    village_name TEXT,
-                    block TEXT,
-                    district TEXT,
-                    proposed_area_acre TEXT,
-                    p1_utm_str TEXT, p1_altitude REAL, p1_easting REAL, p1_northing REAL, p1_zone_num INTEGER, p1_zone_letter TEXT, p1_substituted BOOLEAN DEFAULT 0,
-                    p2_utm_str TEXT, p2_altitude REAL, p2_easting REAL, p2_northing REAL, p2_zone_num INTEGER, p2_zone_letter TEXT, p2_substituted BOOLEAN DEFAULT 0,
-                    p3_utm_str TEXT, p3_altitude REAL, p3_easting REAL, p3_northing REAL, p3_zone_num INTEGER, p3_zone_letter TEXT, p3_substituted BOOLEAN DEFAULT 0,
-                    p4_utm_str TEXT, p4_altitude REAL, p4_easting REAL, p4_northing REAL, p4_zone_num INTEGER, p4_zone_letter TEXT, p4_substituted BOOLEAN DEFAULT 0,
-                    status TEXT NOT NULL, -- e.g., 'valid_for_kml', 'error_missing_points', 'error_parsing'
-                    error_messages TEXT,  -- Store as newline-separated string or JSON string
-                    kml_export_count INTEGER DEFAULT 0,
-                    last_kml_export_date TIMESTAMP,
-                    date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP 
-                )
-            ''')
+            self.cursor.execute(POLYGON_DATA_TABLE_SQL.format(schema="main"))
             self.conn.commit()
         except sqlite3.Error as e:
             print(f"Error creating tables: {e}")
 
+    def _attach_archive(self):
+        """
+        Attaches the archive DB (same folder as the main DB) and makes sure it has
+        a polygon_data table with the same schema as the hot table.
+        The app keeps working without it if attaching fails.
+        """
+        try:
+            self.cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA_NAME}", (self.archive_db_path,))
+            self.cursor.execute(POLYGON_DATA_TABLE_SQL.format(schema=ARCHIVE_SCHEMA_NAME))
+            self.conn.commit()
+            self.archive_attached = True
+        except sqlite3.Error as e:
+            print(f"DB: Could not attach archive database '{self.archive_db_path}': {e}")
+            self.archive_attached = False
+
+    def _polygon_data_columns(self):
+        """Returns the polygon_data column names in table order."""
+        self.cursor.execute("PRAGMA main.table_info(polygon_data)")
+        return [row[1] for row in self.cursor.fetchall()]
+
     # --- mWater API Sources Methods ---
     def add_mwater_source(self, title, url):
         try:
@@ -136,16 +186,41 @@ class DatabaseManager:
             return False
 
     # --- Polygon Data Methods ---
+    @traced("db.duplicate_check")
     def check_duplicate_response_code(self, response_code):
-        """Checks if a response_code already exists. Returns the record ID if found, else None."""
+        """
+        Checks if a response_code already exists, in the hot table or the archive.
+        Returns the record ID if found, else None.
+        """
         try:
-            self.cursor.execute("SELECT id FROM polygon_data WHERE response_code = ?", (response_code,))
+            self.cursor.execute("SELECT id FROM main.polygon_data WHERE response_code = ?", (response_code,))
             result = self.cursor.fetchone()
+            if not result and self.archive_attached:
+                self.cursor.execute(f"SELECT id FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE response_code = ?", (response_code,))
+                result = self.cursor.fetchone()
             return result[0] if result else None
         except sqlite3.Error as e:
             print(f"DB: Error checking duplicate response code: {e}")
             return None # Treat as not found on error to be safe
 
+    def check_duplicate_uuid(self, uuid_value):
+        """
+        Checks if a uuid already exists, in the hot table or the archive.
+        The UNIQUE constraint only covers one table, so this catches an archived record re-imported under another response code.
+        Returns the record ID if found, else None.
+        """
+        try:
+            self.cursor.execute("SELECT id FROM main.polygon_data WHERE uuid = ?", (uuid_value,))
+            result = self.cursor.fetchone()
+            if not result and self.archive_attached:
+                self.cursor.execute(f"SELECT id FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE uuid = ?", (uuid_value,))
+                result = self.cursor.fetchone()
+            return result[0] if result else None
+        except sqlite3.Error as e:
+            print(f"DB: Error checking duplicate UUID: {e}")
+            return None
+
+    @traced("db.add_or_update")
     def add_or_update_polygon_data(self, data_dict, overwrite=False):
         """
         Adds a new polygon record or updates an existing one based on response_code if overwrite is True.
@@ -169,8 +244,16 @@ class DatabaseManager:
         filtered_data = {k: v for k, v in data_dict.items() if k in valid_columns}
         filtered_data['last_modified'] = current_time_iso
 
+        uuid_owner_id = self.check_duplicate_uuid(filtered_data['uuid']) if filtered_data.get('uuid') else None
+        if uuid_owner_id and uuid_owner_id != existing_record_id and (overwrite or not existing_record_id):
+            print(f"DB Integrity Error saving polygon data for RC '{response_code_val}': UUID '{filtered_data['uuid']}' already belongs to record ID {uuid_owner_id}.")
+            return None
 
         if existing_record_id and overwrite:
+            # An archived record being overwritten becomes hot again
+            if self.is_archived(existing_record_id) and not self.restore_archived_polygon_data([existing_record_id]):
+                print(f"DB Error: Could not restore archived record for RC '{response_code_val}' before update.")
+                return None
             # UPDATE existing record
             set_clauses = []
             values_for_update = []
@@ -221,24 +304,168 @@ class DatabaseManager:
         else: # Record exists, but overwrite is False
             return existing_record_id # Return existing ID, indicating no action taken
 
-    def get_all_polygon_data_for_display(self):
-        """Fetches specific columns for display in the Treeview."""
+    @traced("db.bulk_add")
+    def bulk_add_polygon_data(self, data_dicts, batch_size=500):
+        """
+        Inserts many new polygon records in one transaction with executemany.
+        Records whose uuid or response_code already exists (hot table or archive) are skipped, never overwritten.
+        Returns (inserted_count, skipped_count).
+        """
+        if not data_dicts: return 0, 0
+        current_time_iso = datetime.datetime.now().isoformat()
+        columns = [column for column in self._polygon_data_columns() if column != 'id']
         try:
-            self.cursor.execute("""
-                SELECT id, status, uuid, farmer_name, village_name, date_added, kml_export_count, last_kml_export_date 
-                FROM polygon_data 
-                ORDER BY date_added DESC
-            """) 
+            if self.archive_attached:
+                archived_keys = set()
+                for start in range(0, len(data_dicts), batch_size):
+                    batch = data_dicts[start:start + batch_size]
+                    placeholders = ','.join(['?'] * len(batch))
+                    self.cursor.execute(f"""
+                        SELECT uuid, response_code FROM {ARCHIVE_SCHEMA_NAME}.polygon_data
+                        WHERE uuid IN ({placeholders}) OR response_code IN ({placeholders})
+                    """, [d.get('uuid') for d in batch] + [d.get('response_code') for d in batch])
+                    for archived_uuid, archived_rc in self.cursor.fetchall(): archived_keys.update((archived_uuid, archived_rc))
+                new_dicts = [d for d in data_dicts if d.get('uuid') not in archived_keys and d.get('response_code') not in archived_keys]
+            else:
+                new_dicts = data_dicts
+            rows = []
+            for data_dict in new_dicts:
+                row = dict(data_dict)
+                if isinstance(row.get('error_messages'), list):
+                    row['error_messages'] = "\n".join(row['error_messages']) if row['error_messages'] else None
+                row.setdefault('date_added', current_time_iso)
+                row.setdefault('last_modified', current_time_iso)
+                row.setdefault('kml_export_count', 0)
+                for i in range(1, 5): row.setdefault(f'p{i}_substituted', False)
+                rows.append([row.get(column) for column in columns])
+            changes_before = self.conn.total_changes
+            self.cursor.executemany(f"INSERT OR IGNORE INTO main.polygon_data ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})", rows)
+            self.conn.commit()
+            inserted_count = self.conn.total_changes - changes_before
+            return inserted_count, len(data_dicts) - inserted_count
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"DB: Error bulk adding polygon data: {e}")
+            return 0, len(data_dicts)
+
+    @traced("db.bulk_overwrite")
+    def bulk_overwrite_polygon_data(self, data_dicts, batch_size=500):
+        """
+        Updates existing polygon records from data_dicts (matched on response_code) in one transaction,
+        the bulk form of add_or_update_polygon_data(..., overwrite=True). Archived matches are restored first.
+        Returns the number of records updated.
+        """
+        if not data_dicts: return 0
+        current_time_iso = datetime.datetime.now().isoformat()
+        valid_columns = set(self._polygon_data_columns()) - {'id', 'response_code', 'date_added'}
+        data_dicts = self._without_foreign_uuids(data_dicts, batch_size)
+        response_codes = [d.get('response_code') for d in data_dicts]
+        if self.archive_attached:
+            archived_ids = []
+            for start in range(0, len(response_codes), batch_size):
+                batch = response_codes[start:start + batch_size]
+                self.cursor.execute(f"SELECT id FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE response_code IN ({','.join(['?'] * len(batch))})", batch)
+                archived_ids.extend(row[0] for row in self.cursor.fetchall())
+            if archived_ids and not self.restore_archived_polygon_data(archived_ids):
+                print(f"DB Error: Could not restore {len(archived_ids)} archived record(s) before bulk update.")
+        # Rows are grouped by their column set so each group is one executemany
+        groups = {}
+        for data_dict in data_dicts:
+            row = {k: v for k, v in data_dict.items() if k in valid_columns}
+            if isinstance(row.get('error_messages'), list):
+                row['error_messages'] = "\n".join(row['error_messages']) if row['error_messages'] else None
+            row['last_modified'] = row.get('last_modified') or current_time_iso
+            columns = tuple(sorted(row))
+            groups.setdefault(columns, []).append([row[column] for column in columns] + [data_dict.get('response_code')])
+        try:
+            changes_before = self.conn.total_changes
+            for columns, rows in groups.items():
+                self.cursor.executemany(f"UPDATE main.polygon_data SET {', '.join(f'{column} = ?' for column in columns)} WHERE response_code = ?", rows)
+            self.conn.commit()
+            return self.conn.total_changes - changes_before
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"DB: Error bulk updating polygon data: {e}")
+            return 0
+
+    def _without_foreign_uuids(self, data_dicts, batch_size=500):
+        """Drops dicts whose uuid belongs to a record with another response_code (hot table or archive)."""
+        schemas = ["main"] + ([ARCHIVE_SCHEMA_NAME] if self.archive_attached else [])
+        uuid_owners = {}
+        uuids = [d.get('uuid') for d in data_dicts if d.get('uuid')]
+        try:
+            for start in range(0, len(uuids), batch_size):
+                batch = uuids[start:start + batch_size]
+                for schema in schemas:
+                    self.cursor.execute(f"SELECT uuid, response_code FROM {schema}.polygon_data WHERE uuid IN ({','.join(['?'] * len(batch))})", batch)
+                    uuid_owners.update(self.cursor.fetchall())
+        except sqlite3.Error as e:
+            print(f"DB: Error checking UUIDs before bulk update: {e}")
+            return []
+        kept = []
+        for data_dict in data_dicts:
+            owner_rc = uuid_owners.get(data_dict.get('uuid'))
+            if owner_rc is not None and owner_rc != data_dict.get('response_code'):
+                print(f"DB Integrity Error: UUID '{data_dict.get('uuid')}' of RC '{data_dict.get('response_code')}' already belongs to RC '{owner_rc}', not updated.")
+            else: kept.append(data_dict)
+        return kept
+
+    def _display_query(self, include_archive=False):
+        if include_archive and self.archive_attached:
+            return f"""
+                SELECT {DISPLAY_COLUMNS_SQL} FROM main.polygon_data
+                UNION ALL
+                SELECT {DISPLAY_COLUMNS_SQL} FROM {ARCHIVE_SCHEMA_NAME}.polygon_data
+                ORDER BY date_added DESC, id DESC
+            """
+        return f"""
+            SELECT {DISPLAY_COLUMNS_SQL} 
+            FROM main.polygon_data 
+            ORDER BY date_added DESC, id DESC
+        """
+
+    @traced("db.load_display_rows")
+    def get_all_polygon_data_for_display(self, include_archive=False):
+        """
+        Fetches specific columns for display in the Treeview.
+        If include_archive is True, archived records are UNIONed in with the hot records.
+        """
+        try:
+            self.cursor.execute(self._display_query(include_archive))
             return self.cursor.fetchall()
         except sqlite3.Error as e:
             print(f"DB: Error fetching polygon data for display: {e}")
             return []
 
+    def iter_polygon_data_for_display(self, include_archive=False, first_page_size=1000, page_size=50000):
+        """
+        Yields the same rows as get_all_polygon_data_for_display, in the same order, as lists of rows:
+        a small first page so a table can show something right away, then page_size rows at a time.
+        Uses its own cursor, so other DB calls can be made while iterating.
+        A sqlite3.Error is re-raised, so a caller never mistakes a partial load for the whole table.
+        """
+        read_cursor = self.conn.cursor()
+        try:
+            with span("db.load_display_page"):
+                read_cursor.execute(self._display_query(include_archive))
+                page = read_cursor.fetchmany(first_page_size)
+            while page:
+                yield page
+                with span("db.load_display_page"): page = read_cursor.fetchmany(page_size)
+        except sqlite3.Error as e:
+            print(f"DB: Error streaming polygon data for display: {e}")
+            raise
+        finally:
+            read_cursor.close()
+
     def get_polygon_data_by_id(self, record_id):
-        """Fetches a full polygon record by its database ID."""
+        """Fetches a full polygon record by its database ID (falls back to the archive)."""
         try:
-            self.cursor.execute("SELECT * FROM polygon_data WHERE id = ?", (record_id,))
+            self.cursor.execute("SELECT * FROM main.polygon_data WHERE id = ?", (record_id,))
             row = self.cursor.fetchone()
+            if not row and self.archive_attached:
+                self.cursor.execute(f"SELECT * FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE id = ?", (record_id,))
+                row = self.cursor.fetchone()
             if row:
                 col_names = [desc[0] for desc in self.cursor.description]
                 return dict(zip(col_names, row))
@@ -247,38 +474,180 @@ class DatabaseManager:
             print(f"DB: Error fetching polygon data by ID '{record_id}': {e}")
             return None
 
+    def get_valid_for_kml_ids(self, record_id_list, batch_size=500):
+        """Returns the subset of record_id_list whose status is 'valid_for_kml' (hot or archived)."""
+        valid_ids = []
+        schemas = ["main"] + ([ARCHIVE_SCHEMA_NAME] if self.archive_attached else [])
+        try:
+            for start in range(0, len(record_id_list), batch_size):
+                batch = record_id_list[start:start + batch_size]
+                placeholders = ','.join(['?'] * len(batch))
+                for schema in schemas:
+                    self.cursor.execute(f"SELECT id FROM {schema}.polygon_data WHERE status = 'valid_for_kml' AND id IN ({placeholders})", batch)
+                    valid_ids.extend(row[0] for row in self.cursor.fetchall())
+            return valid_ids
+        except sqlite3.Error as e:
+            print(f"DB: Error fetching KML-valid record IDs: {e}")
+            return []
+
+    def get_all_valid_for_kml_ids(self, include_archive=False):
+        """Returns the IDs of every 'valid_for_kml' record, optionally including archived ones."""
+        schemas = ["main"] + ([ARCHIVE_SCHEMA_NAME] if include_archive and self.archive_attached else [])
+        try:
+            valid_ids = []
+            for schema in schemas:
+                self.cursor.execute(f"SELECT id FROM {schema}.polygon_data WHERE status = 'valid_for_kml' ORDER BY id")
+                valid_ids.extend(row[0] for row in self.cursor.fetchall())
+            return valid_ids
+        except sqlite3.Error as e:
+            print(f"DB: Error fetching KML-valid record IDs: {e}")
+            return []
+
+    def get_changed_since_export_ids(self):
+        """
+        Returns IDs of KML-valid records never exported, or modified after their last export.
+        Archived records are left out: only unmodified exported records are archived.
+        """
+        try:
+            self.cursor.execute("""
+                SELECT id FROM main.polygon_data
+                WHERE status = 'valid_for_kml'
+                  AND (last_kml_export_date IS NULL OR last_modified > last_kml_export_date)
+                ORDER BY id
+            """)
+            return [row[0] for row in self.cursor.fetchall()]
+        except sqlite3.Error as e:
+            print(f"DB: Error fetching records changed since last export: {e}")
+            return []
+
+    def get_region_groups_for_ids(self, record_id_list, batch_size=500):
+        """Returns (id, district, block, village_name) tuples for the given IDs, ordered by region."""
+        rows = []
+        schemas = ["main"] + ([ARCHIVE_SCHEMA_NAME] if self.archive_attached else [])
+        try:
+            for start in range(0, len(record_id_list), batch_size):
+                batch = record_id_list[start:start + batch_size]
+                placeholders = ','.join(['?'] * len(batch))
+                for schema in schemas:
+                    self.cursor.execute(f"SELECT id, district, block, village_name FROM {schema}.polygon_data WHERE id IN ({placeholders})", batch)
+                    rows.extend(self.cursor.fetchall())
+            rows.sort(key=lambda row: (row[1] or "", row[2] or "", row[3] or ""))
+            return rows
+        except sqlite3.Error as e:
+            print(f"DB: Error fetching region groups: {e}")
+            return []
+
+    def iter_polygon_data_by_ids(self, record_id_list, batch_size=500, columns=None):
+        """
+        Yields full polygon records (as dicts, like get_polygon_data_by_id) for the given IDs,
+        fetching batch_size records per query so callers can stream large selections.
+        columns limits the dicts to those polygon_data columns (e.g. only the UTM points).
+        Uses its own cursor, so other DB calls can be made while iterating.
+        A sqlite3.Error is re-raised: callers writing exports must not treat a partial read as a
+        complete one (and mark the records exported).
+        """
+        select_list = ", ".join(columns) if columns else "*"
+        read_cursor = self.conn.cursor()
+        schemas = ["main"] + ([ARCHIVE_SCHEMA_NAME] if self.archive_attached else [])
+        try:
+            for start in range(0, len(record_id_list), batch_size):
+                batch = record_id_list[start:start + batch_size]
+                placeholders = ','.join(['?'] * len(batch))
+                for schema in schemas:
+                    with span("db.fetch_records", count=len(batch)):
+                        read_cursor.execute(f"SELECT {select_list} FROM {schema}.polygon_data WHERE id IN ({placeholders})", batch)
+                        col_names = [desc[0] for desc in read_cursor.description]
+                        records = [dict(zip(col_names, row)) for row in read_cursor.fetchall()]
+                    yield from records
+        except sqlite3.Error as e:
+            print(f"DB: Error streaming polygon data by IDs: {e}")
+            raise
+        finally:
+            read_cursor.close()
+
     def update_kml_export_status(self, record_id):
         """Updates the KML export count and date for a given record ID."""
         try:
             current_time_iso = datetime.datetime.now().isoformat()
             self.cursor.execute("""
-                UPDATE polygon_data
+                UPDATE main.polygon_data
                 SET kml_export_count = kml_export_count + 1,
                     last_kml_export_date = ?,
                     last_modified = ? 
                 WHERE id = ?
             """, (current_time_iso, current_time_iso, record_id))
+            if self.cursor.rowcount == 0 and self.archive_attached: # Exported from the archive view
+                self.cursor.execute(f"""
+                    UPDATE {ARCHIVE_SCHEMA_NAME}.polygon_data
+                    SET kml_export_count = kml_export_count + 1,
+                        last_kml_export_date = ?,
+                        last_modified = ?
+                    WHERE id = ?
+                """, (current_time_iso, current_time_iso, record_id))
             self.conn.commit()
             return self.cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"DB: Error updating KML export status for ID '{record_id}': {e}")
             return False
 
+    @traced("db.mark_exported")
+    def update_kml_export_status_bulk(self, record_id_list, batch_size=500):
+        """
+        Same as update_kml_export_status for many records at once, in a single transaction.
+        Returns the number of records updated.
+        """
+        if not record_id_list: return 0
+        current_time_iso = datetime.datetime.now().isoformat()
+        updated_count = 0
+        try:
+            for start in range(0, len(record_id_list), batch_size):
+                batch = record_id_list[start:start + batch_size]
+                placeholders = ','.join(['?'] * len(batch))
+                self.cursor.execute(f"""
+                    UPDATE main.polygon_data
+                    SET kml_export_count = kml_export_count + 1,
+                        last_kml_export_date = ?,
+                        last_modified = ?
+                    WHERE id IN ({placeholders})
+                """, [current_time_iso, current_time_iso] + batch)
+                updated_count += self.cursor.rowcount
+                if self.archive_attached:
+                    self.cursor.execute(f"""
+                        UPDATE {ARCHIVE_SCHEMA_NAME}.polygon_data
+                        SET kml_export_count = kml_export_count + 1,
+                            last_kml_export_date = ?,
+                            last_modified = ?
+                        WHERE id IN ({placeholders})
+                    """, [current_time_iso, current_time_iso] + batch)
+                    updated_count += self.cursor.rowcount
+            self.conn.commit()
+            return updated_count
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"DB: Error bulk updating KML export status: {e}")
+            return 0
+
     def delete_polygon_data(self, record_id_list):
         if not isinstance(record_id_list, list): record_id_list = [record_id_list]
         if not record_id_list: return False # No IDs to delete
         try:
             placeholders = ','.join(['?'] * len(record_id_list))
-            self.cursor.execute(f"DELETE FROM polygon_data WHERE id IN ({placeholders})", record_id_list)
+            self.cursor.execute(f"DELETE FROM main.polygon_data WHERE id IN ({placeholders})", record_id_list)
+            deleted_count = self.cursor.rowcount
+            if self.archive_attached: # Archived rows are shown in the table too, so they can be deleted from it
+                self.cursor.execute(f"DELETE FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE id IN ({placeholders})", record_id_list)
+                deleted_count += self.cursor.rowcount
             self.conn.commit()
-            return self.cursor.rowcount > 0
+            return deleted_count > 0
         except sqlite3.Error as e:
             print(f"DB: Error deleting polygon data: {e}")
             return False
 
     def delete_all_polygon_data(self):
         try:
-            self.cursor.execute("DELETE FROM polygon_data")
+            self.cursor.execute("DELETE FROM main.polygon_data")
+            if self.archive_attached:
+                self.cursor.execute(f"DELETE FROM {ARCHIVE_SCHEMA_NAME}.polygon_data")
             # Optionally, reset the autoincrement sequence if desired (usually not necessary)
             # self.cursor.execute("DELETE FROM sqlite_sequence WHERE name='polygon_data';")
             self.conn.commit()
@@ -287,6 +656,93 @@ class DatabaseManager:
             print(f"DB: Error deleting all polygon data: {e}")
             return False
 
+    # --- Archive (Hot/Cold Partitioning) Methods ---
+    def archive_polygon_data(self, older_than_months=12, exported_only=True):
+        """
+        Moves records that have not been modified for older_than_months into the archive DB.
+        With exported_only, only records that were exported to KML and not modified since
+        their last export are moved. The copy and the delete run in one transaction.
+
+        Returns:
+            int: Number of records archived, or None on error.
+        """
+        if not self.archive_attached:
+            print("DB: Archive database is not attached, cannot archive records.")
+            return None
+        cutoff_iso = (datetime.datetime.now() - datetime.timedelta(days=30 * older_than_months)).isoformat()
+        where_clause = "last_modified < ?"
+        if exported_only:
+            where_clause += " AND kml_export_count > 0 AND last_kml_export_date IS NOT NULL AND last_modified <= last_kml_export_date"
+        try:
+            columns_sql = ", ".join(self._polygon_data_columns())
+            self.cursor.execute(f"""
+                INSERT OR REPLACE INTO {ARCHIVE_SCHEMA_NAME}.polygon_data ({columns_sql})
+                SELECT {columns_sql} FROM main.polygon_data WHERE {where_clause}
+            """, (cutoff_iso,))
+            self.cursor.execute(f"DELETE FROM main.polygon_data WHERE {where_clause}", (cutoff_iso,))
+            archived_count = self.cursor.rowcount
+            self.conn.commit()
+            return archived_count
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"DB: Error archiving polygon data: {e}")
+            return None
+
+    def restore_archived_polygon_data(self, record_id_list):
+        """Moves the given records from the archive back into the hot table. Returns True on success."""
+        if not isinstance(record_id_list, list): record_id_list = [record_id_list]
+        if not record_id_list or not self.archive_attached: return False
+        try:
+            placeholders = ','.join(['?'] * len(record_id_list))
+            columns_sql = ", ".join(self._polygon_data_columns())
+            self.cursor.execute(f"""
+                INSERT INTO main.polygon_data ({columns_sql})
+                SELECT {columns_sql} FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE id IN ({placeholders})
+            """, record_id_list)
+            self.cursor.execute(f"DELETE FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE id IN ({placeholders})", record_id_list)
+            self.conn.commit()
+            return self.cursor.rowcount > 0
+        except sqlite3.IntegrityError as e: # UUID/RC re-imported into the hot table after archiving
+            self.conn.rollback()
+            print(f"DB: Cannot restore archived records, conflicting hot records exist: {e}")
+            return False
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"DB: Error restoring archived polygon data: {e}")
+            return False
+
+    def is_archived(self, record_id):
+        """Returns True if the record ID lives in the archive DB."""
+        if not self.archive_attached: return False
+        try:
+            self.cursor.execute(f"SELECT 1 FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE id = ?", (record_id,))
+            return self.cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            print(f"DB: Error checking archive for ID '{record_id}': {e}")
+            return False
+
+    def get_archived_record_count(self):
+        if not self.archive_attached: return 0
+        try:
+            self.cursor.execute(f"SELECT COUNT(*) FROM {ARCHIVE_SCHEMA_NAME}.polygon_data")
+            return self.cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"DB: Error counting archived records: {e}")
+            return 0
+
+    def get_status_counts(self, include_archive=False):
+        """Returns {status: record_count} for the hot table, plus the archive if include_archive is True."""
+        schemas = ["main"] + ([ARCHIVE_SCHEMA_NAME] if include_archive and self.archive_attached else [])
+        counts = {}
+        try:
+            for schema in schemas:
+                self.cursor.execute(f"SELECT status, COUNT(*) FROM {schema}.polygon_data GROUP BY status")
+                for status, count in self.cursor.fetchall(): counts[status] = counts.get(status, 0) + count
+            return counts
+        except sqlite3.Error as e:
+            print(f"DB: Error counting records by status: {e}")
+            return {}
+
     def close(self):
         """Closes the database connection."""
         if self.conn:
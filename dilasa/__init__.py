@@ -0,0 +1,5 @@
+# File: DilasaKMLTool_v4/dilasa/__init__.py
+# ----------------------------------------------------------------------
+# Purpose: Headless command line for scripted imports, API syncs and KML
+#          exports; run it with "python -m dilasa --help".
+# ----------------------------------------------------------------------
@@ -0,0 +1,128 @@
+# File: DilasaKMLTool_v4/dilasa/__main__.py
+# ----------------------------------------------------------------------
+# Purpose: Command line entry point that runs the import, API sync and KML
+#          export flows without Qt, for nightly jobs on a server. Each
+#          command prints one JSON object (counts and per-stage timings in
+#          seconds) on stdout; messages from the core modules go to stderr.
+# Usage:   python -m dilasa import-csv survey.csv
+#          python -m dilasa sync-api --source "Village Survey"
+#          python -m dilasa export-kml D:\KML --changed --mode single
+#          python -m dilasa stats
+# ----------------------------------------------------------------------
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+from database.db_manager import DatabaseManager
+from core.tracing import configure_from_environment
+from core.batch_jobs import DUPLICATE_ACTIONS, IMPORT_BATCH_SIZE, IMPORT_COUNT_KEYS, KML_OUTPUT_MODES, import_rows, iter_csv_rows, export_kml
+
+def _sum_results(results):
+    """Adds up the counts and stage seconds of several import_rows results."""
+    total = dict(dict.fromkeys(IMPORT_COUNT_KEYS, 0), seconds={})
+    for result in results:
+        for key in IMPORT_COUNT_KEYS: total[key] += result[key]
+        for stage, seconds in result["seconds"].items(): total["seconds"][stage] = total["seconds"].get(stage, 0.0) + seconds
+    return total
+
+def cmd_import_csv(db_manager, args):
+    files = []
+    for csv_path in args.csv_files:
+        files.append(dict(import_rows(db_manager, iter_csv_rows(csv_path), args.on_duplicate, args.batch_size), path=csv_path))
+    return dict(_sum_results(files), files=files)
+
+def cmd_sync_api(db_manager, args):
+    from core.api_handler import fetch_data_from_mwater_api
+    sources = [(title, url) for _, title, url in db_manager.get_mwater_sources()]
+    if args.url: sources = [(args.url, args.url)]
+    elif args.source:
+        unknown = set(args.source) - {title for title, _ in sources}
+        if unknown: raise ValueError(f"Unknown API source(s): {', '.join(sorted(unknown))}")
+        sources = [(title, url) for title, url in sources if title in args.source]
+    if not sources: raise ValueError("No API sources configured; add one in the app or pass --url.")
+    results = []
+    for title, url in sources:
+        fetch_start = time.perf_counter()
+        rows, error_msg = fetch_data_from_mwater_api(url, title)
+        fetch_seconds = time.perf_counter() - fetch_start
+        if error_msg or rows is None:
+            results.append(dict(dict.fromkeys(IMPORT_COUNT_KEYS, 0), source=title, error=error_msg or "No data returned.",
+                                seconds={"fetch": fetch_seconds}))
+            continue
+        result = import_rows(db_manager, rows, args.on_duplicate, args.batch_size)
+        result["seconds"] = dict(result["seconds"], fetch=fetch_seconds)
+        results.append(dict(result, source=title))
+    failed = [result["source"] for result in results if "error" in result]
+    return dict(_sum_results(results), sources=results, ok=not failed)
+
+def cmd_export_kml(db_manager, args):
+    if args.ids: record_ids = [int(record_id) for record_id in args.ids.split(",") if record_id.strip()]
+    elif args.changed: record_ids = db_manager.get_changed_since_export_ids()
+    else: record_ids = db_manager.get_all_valid_for_kml_ids(args.include_archive)
+    return export_kml(db_manager, record_ids, args.output_folder, args.mode, args.kmz, args.precision, not args.no_mark)
+
+def cmd_stats(db_manager, args):
+    counts = db_manager.get_status_counts(args.include_archive)
+    return {"records": sum(counts.values()), "by_status": counts, "archived": db_manager.get_archived_record_count(),
+            "changed_since_export": len(db_manager.get_changed_since_export_ids())}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m dilasa", description="Dilasa KML Tool without the GUI. Prints one JSON result per run.")
+    parser.add_argument("--db-folder", help="AppData subfolder of the database (default: the app's own)")
+    parser.add_argument("--db-file", help="Database file name inside that folder (default: the app's own)")
+    parser.add_argument("--indent", type=int, default=None, help="Pretty-print the JSON result with this indent")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import-csv", help="Import mWater CSV exports")
+    import_parser.add_argument("csv_files", nargs="+", metavar="CSV")
+    sync_parser = subparsers.add_parser("sync-api", help="Fetch and import from the configured mWater API sources")
+    sync_parser.add_argument("--source", action="append", help="Title of a configured source (repeatable; default: all)")
+    sync_parser.add_argument("--url", help="Fetch this API URL instead of the configured sources")
+    for import_like_parser in (import_parser, sync_parser):
+        import_like_parser.add_argument("--on-duplicate", choices=DUPLICATE_ACTIONS, default="skip", help="What to do with Response Codes already in the database")
+        import_like_parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Rows per bulk insert")
+
+    export_parser = subparsers.add_parser("export-kml", help="Generate KML/KMZ for valid records")
+    export_parser.add_argument("output_folder")
+    export_parser.add_argument("--mode", choices=KML_OUTPUT_MODES, default="single")
+    export_parser.add_argument("--kmz", action="store_true", help="Write compressed .kmz files")
+    export_parser.add_argument("--precision", type=int, default=None, help="Decimal places kept for lon/lat")
+    selection = export_parser.add_mutually_exclusive_group()
+    selection.add_argument("--ids", help="Comma-separated record IDs (default: all valid records)")
+    selection.add_argument("--changed", action="store_true", help="Only records new or modified since their last export")
+    export_parser.add_argument("--include-archive", action="store_true", help="With neither --ids nor --changed, also export archived records")
+    export_parser.add_argument("--no-mark", action="store_true", help="Do not update the export count and date of exported records")
+
+    stats_parser = subparsers.add_parser("stats", help="Record counts by status")
+    stats_parser.add_argument("--include-archive", action="store_true")
+    return parser
+
+COMMANDS = {"import-csv": cmd_import_csv, "sync-api": cmd_sync_api, "export-kml": cmd_export_kml, "stats": cmd_stats}
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_from_environment()
+    start = time.perf_counter()
+    output = {"command": args.command}
+    db_manager = None
+    # Core modules report through print(); keep stdout for the JSON result
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            db_manager = DatabaseManager(args.db_folder, args.db_file)
+            output["db_path"] = db_manager.db_path
+            open_seconds = time.perf_counter() - start
+            output.update(COMMANDS[args.command](db_manager, args))
+            output.setdefault("ok", True)
+            output["seconds"] = dict(output.get("seconds", {}), open_db=open_seconds)
+        except Exception as e:
+            output.update(ok=False, error=f"{type(e).__name__}: {e}")
+        finally:
+            if db_manager: db_manager.close()
+    output["seconds"] = dict(output.get("seconds", {}), wall=time.perf_counter() - start)
+    print(json.dumps(output, indent=args.indent, default=str))
+    return 0 if output["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
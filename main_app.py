@@ -1,18 +1,21 @@
 # File: DilasaKMLTool_v4/main_app.py
 # ----------------------------------------------------------------------
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication, QSplashScreen 
 from PySide6.QtGui import QPixmap, QFont, QPainter, QColor 
-from PySide6.QtCore import QTimer, Qt                 
+from PySide6.QtCore import QTimer, Qt, QElapsedTimer
 
-from ui.main_window import MainWindow   
+from ui.widgets.map_view_widget import register_tile_url_scheme
 from core.utils import resource_path  
+from core.tracing import configure_from_environment
 
 APP_NAME_MAIN = "Dilasa Advance KML Tool"
 APP_VERSION_MAIN = "Beta.v4.001.Dv-A.Das"
 ORGANIZATION_TAGLINE_MAIN = "Developed by Dilasa Janvikash Pratishthan to support community upliftment"
 LOGO_FILE_NAME_MAIN = "dilasa_logo.jpg" 
 INFO_COLOR_CONST_MAIN = "#0078D7" 
+SPLASH_MIN_DURATION_MS = 1500 # The splash stays up at least this long, or until the main window is built if that takes longer
 
 class CustomSplashScreen(QSplashScreen): 
     def __init__(self, app_name, app_version, tagline, logo_path):
@@ -56,12 +59,15 @@ class CustomSplashScreen(QSplashScreen):
 
 
 def main():
+    multiprocessing.freeze_support() # Needed for the KML export worker processes in the PyInstaller build
+    configure_from_environment() # DILASA_TRACE / DILASA_PROFILE; here rather than at import, so spawned workers skip it
+    register_tile_url_scheme() # Custom URL schemes must be registered before the application object exists
     app = QApplication(sys.argv)
     app.setApplicationName(APP_NAME_MAIN)
     app.setApplicationVersion(APP_VERSION_MAIN)
 
+    startup_timer = QElapsedTimer(); startup_timer.start()
     logo_full_path = resource_path(LOGO_FILE_NAME_MAIN)
-    main_window = MainWindow() 
     splash = CustomSplashScreen(APP_NAME_MAIN, APP_VERSION_MAIN, ORGANIZATION_TAGLINE_MAIN, logo_full_path)
     splash.show()
     
@@ -69,6 +75,10 @@ def main():
         screen_geo = splash.screen().geometry()
         splash.move((screen_geo.width() - splash.width()) // 2,
                     (screen_geo.height() - splash.height()) // 2)
+    app.processEvents() # Paint the splash before the main window modules are imported
+
+    from ui.main_window import MainWindow
+    main_window = MainWindow() 
 
     def show_main_window_after_splash():
         splash.close()
@@ -76,7 +86,7 @@ def main():
         main_window.activateWindow() 
         main_window.raise_()         
 
-    QTimer.singleShot(4000, show_main_window_after_splash) 
+    QTimer.singleShot(max(0, SPLASH_MIN_DURATION_MS - startup_timer.elapsed()), show_main_window_after_splash) 
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+# File: DilasaKMLTool_v4/tests/conftest.py
+# ----------------------------------------------------------------------
+# Purpose: Fixtures shared by the test modules.
+# ----------------------------------------------------------------------
+import pytest
+
+RECORD_CORNER_OFFSETS = [(0, 0), (40, 0), (40, 40), (0, 40)] # metres; each record is a 40 m square, stacked northwards by index
+
+def _make_record(index, **overrides):
+    """A valid_for_kml record shaped like a polygon_data row; a 40 m square in zone 43Q."""
+    record = {"id": index, "uuid": f"U{index}", "response_code": f"RC{index}", "farmer_name": f"Farmer {index}",
+              "village_name": "Village", "block": "Block", "district": "District", "proposed_area_acre": "1.5",
+              "status": "valid_for_kml"}
+    for point, (d_east, d_north) in enumerate(RECORD_CORNER_OFFSETS, start=1):
+        record.update({f"p{point}_easting": 471895.31 + d_east, f"p{point}_northing": 2135690.93 + d_north + index * 100,
+                       f"p{point}_altitude": 0.0, f"p{point}_zone_num": 43, f"p{point}_zone_letter": "Q"})
+    record.update(overrides)
+    return record
+
+@pytest.fixture
+def make_record():
+    """make_record(index, **overrides) -> record dict with id index, uuid U<index> and response code RC<index>."""
+    return _make_record
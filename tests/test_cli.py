@@ -0,0 +1,66 @@
+# File: DilasaKMLTool_v4/tests/test_cli.py
+# ----------------------------------------------------------------------
+# Purpose: The dilasa command line (python -m dilasa) on a database in a
+#          temporary AppData folder: CSV import counts, stats and KML export.
+# ----------------------------------------------------------------------
+import os
+import csv
+import json
+
+import pytest
+
+from dilasa.__main__ import main
+from benchmarks.synthetic import make_csv_rows
+from core.data_processor import CSV_HEADERS
+
+@pytest.fixture(autouse=True)
+def app_data(tmp_path, monkeypatch):
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+
+def run(capsys, *argv):
+    exit_code = main(["--db-folder", "db", *argv])
+    return exit_code, json.loads(capsys.readouterr().out)
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+def test_import_then_skip_existing(tmp_path, capsys):
+    csv_path = write_csv(tmp_path / "survey.csv", list(make_csv_rows(5)))
+    exit_code, output = run(capsys, "import-csv", csv_path)
+    assert exit_code == 0 and output["ok"]
+    assert {key: output[key] for key in ("rows", "imported", "skipped", "duplicates", "errors")} == {"rows": 5, "imported": 5, "skipped": 0, "duplicates": 0, "errors": 0}
+    _, output = run(capsys, "import-csv", csv_path)
+    assert (output["imported"], output["skipped"]) == (0, 5)
+    _, output = run(capsys, "stats")
+    assert output["records"] == 5 and output["by_status"] == {"valid_for_kml": 5}
+
+@pytest.mark.parametrize("batch_size", ["1", "100"])
+def test_overwrite_counts_each_record_once(tmp_path, capsys, batch_size):
+    rows = list(make_csv_rows(3))
+    repeated = dict(rows[0], **{CSV_HEADERS["farmer_name"]: "Latest Name"})
+    csv_path = write_csv(tmp_path / "survey.csv", rows + [repeated]) # Response code of rows[0] twice, the later row wins
+    _, output = run(capsys, "import-csv", csv_path, "--on-duplicate", "overwrite", "--batch-size", batch_size)
+    assert (output["rows"], output["imported"], output["overwritten"], output["duplicates"]) == (4, 3, 0, 1)
+    _, output = run(capsys, "import-csv", csv_path, "--on-duplicate", "overwrite", "--batch-size", batch_size)
+    assert (output["rows"], output["imported"], output["overwritten"], output["duplicates"], output["errors"]) == (4, 0, 3, 1, 0)
+    from database.db_manager import DatabaseManager
+    db_manager = DatabaseManager("db")
+    try: assert "Latest Name" in [row[3] for row in db_manager.get_all_polygon_data_for_display()]
+    finally: db_manager.close()
+
+def test_export_kml_writes_and_marks_records(tmp_path, capsys):
+    run(capsys, "import-csv", write_csv(tmp_path / "survey.csv", list(make_csv_rows(4))))
+    output_folder = str(tmp_path / "out")
+    exit_code, output = run(capsys, "export-kml", output_folder, "--mode", "single")
+    assert exit_code == 0 and (output["records"], output["exported"], output["files"]) == (4, 4, 1)
+    assert os.path.isfile(output["output"])
+    _, output = run(capsys, "stats")
+    assert output["changed_since_export"] == 0
+
+def test_errors_are_reported_in_the_json(capsys):
+    exit_code, output = run(capsys, "sync-api", "--source", "No Such Source")
+    assert exit_code == 1 and not output["ok"] and "No Such Source" in output["error"]
@@ -0,0 +1,84 @@
+# File: DilasaKMLTool_v4/tests/test_db_archive.py
+# ----------------------------------------------------------------------
+# Purpose: Archive/restore round trip of polygon records between the hot
+#          table and the attached archive DB, and duplicate detection
+#          across both.
+# ----------------------------------------------------------------------
+import pytest
+
+from database.db_manager import DatabaseManager, ARCHIVE_SCHEMA_NAME
+
+@pytest.fixture
+def db_manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    manager = DatabaseManager(db_folder_name="db")
+    yield manager
+    manager.close()
+
+def age_records(db_manager, days=800):
+    """Makes every hot record look exported and untouched for days."""
+    db_manager.cursor.execute(f"UPDATE main.polygon_data SET last_modified = datetime('now', '-{days} days'), "
+                              f"last_kml_export_date = datetime('now', '-{days} days'), kml_export_count = 1")
+    db_manager.conn.commit()
+
+def test_archive_and_restore_round_trip(db_manager, make_record):
+    record_ids = [db_manager.add_or_update_polygon_data(make_record(i)) for i in range(1, 4)]
+    age_records(db_manager)
+    before = {record_id: db_manager.get_polygon_data_by_id(record_id) for record_id in record_ids}
+
+    assert db_manager.archive_polygon_data(older_than_months=12) == 3
+    assert db_manager.get_all_polygon_data_for_display() == []
+    assert db_manager.get_archived_record_count() == 3
+    assert all(db_manager.is_archived(record_id) for record_id in record_ids)
+    assert len(db_manager.get_all_polygon_data_for_display(include_archive=True)) == 3
+
+    assert db_manager.restore_archived_polygon_data(record_ids)
+    assert db_manager.get_archived_record_count() == 0
+    assert {record_id: db_manager.get_polygon_data_by_id(record_id) for record_id in record_ids} == before
+
+def test_recent_or_unexported_records_are_not_archived(db_manager, make_record):
+    db_manager.add_or_update_polygon_data(make_record(1))
+    assert db_manager.archive_polygon_data(older_than_months=12) == 0
+    assert db_manager.get_archived_record_count() == 0
+
+def test_archived_response_code_counts_as_duplicate(db_manager, make_record):
+    record_id = db_manager.add_or_update_polygon_data(make_record(1))
+    age_records(db_manager)
+    db_manager.archive_polygon_data()
+    assert db_manager.check_duplicate_response_code("RC1") == record_id
+    assert db_manager.add_or_update_polygon_data(make_record(1)) == record_id
+    assert db_manager.get_all_polygon_data_for_display() == []
+
+def test_overwriting_an_archived_record_restores_it(db_manager, make_record):
+    record_id = db_manager.add_or_update_polygon_data(make_record(1))
+    age_records(db_manager)
+    db_manager.archive_polygon_data()
+    assert db_manager.add_or_update_polygon_data(make_record(1, farmer_name="Updated"), overwrite=True) == record_id
+    assert not db_manager.is_archived(record_id)
+    assert db_manager.get_polygon_data_by_id(record_id)["farmer_name"] == "Updated"
+
+def test_archived_uuid_under_new_response_code_is_rejected(db_manager, make_record):
+    record_id = db_manager.add_or_update_polygon_data(make_record(1))
+    age_records(db_manager)
+    db_manager.archive_polygon_data()
+    assert db_manager.check_duplicate_uuid("U1") == record_id
+    assert db_manager.add_or_update_polygon_data(make_record(2, uuid="U1")) is None
+    assert db_manager.bulk_add_polygon_data([make_record(3, uuid="U1")]) == (0, 1)
+    assert db_manager.get_all_polygon_data_for_display() == []
+
+def test_bulk_overwrite_skips_uuid_owned_by_another_record(db_manager, make_record):
+    db_manager.add_or_update_polygon_data(make_record(1))
+    db_manager.add_or_update_polygon_data(make_record(2))
+    assert db_manager.bulk_overwrite_polygon_data([make_record(2, uuid="U1"), make_record(1, farmer_name="Updated")]) == 1
+    assert db_manager.check_duplicate_uuid("U2") is not None
+
+def test_exporting_archived_records_updates_last_modified(db_manager, make_record):
+    record_id = db_manager.add_or_update_polygon_data(make_record(1))
+    age_records(db_manager)
+    db_manager.archive_polygon_data()
+    db_manager.update_kml_export_status(record_id)
+    db_manager.update_kml_export_status_bulk([record_id])
+    db_manager.cursor.execute(f"SELECT kml_export_count, last_kml_export_date, last_modified FROM {ARCHIVE_SCHEMA_NAME}.polygon_data WHERE id = ?", (record_id,))
+    export_count, last_export, last_modified = db_manager.cursor.fetchone()
+    assert export_count == 3
+    assert last_modified == last_export
@@ -0,0 +1,101 @@
+# File: DilasaKMLTool_v4/tests/test_geo_exporters.py
+# ----------------------------------------------------------------------
+# Purpose: GIS exporters (GeoJSON Lines, the sqlite3-built GeoPackage and
+#          FlatGeobuf), read back with json, sqlite3 and GDAL (pyogrio).
+# ----------------------------------------------------------------------
+import json
+import struct
+import sqlite3
+
+import pytest
+import utm
+
+from core.geo_exporters import (export_geojsonseq, export_geopackage, export_flatgeobuf, GISExportCancelled,
+                                EXPORT_PROPERTY_FIELDS, WGS84_SRS_ID)
+
+PRECISION = 7
+
+@pytest.fixture
+def records(make_record):
+    records = [make_record(index, kml_export_count=index, date_added="2024-05-05T10:00:00") for index in range(1, 5)]
+    records.insert(2, make_record(9, p3_easting=None)) # Invalid: one corner missing, skipped by every exporter
+    records[0]["farmer_name"] = "पाटील & \"Sons\""
+    return records
+
+def expected_ring(record):
+    ring = [utm.to_latlon(record[f"p{point}_easting"], record[f"p{point}_northing"], 43, "Q")[::-1] for point in range(1, 5)]
+    return [[round(lon, PRECISION), round(lat, PRECISION)] for lon, lat in ring + ring[:1]]
+
+def valid_records(records):
+    return [record for record in records if record["p3_easting"] is not None]
+
+def parse_wkb_polygon(wkb):
+    byte_order, geometry_type, ring_count, point_count = struct.unpack_from("<BIII", wkb)
+    assert (byte_order, geometry_type, ring_count, point_count) == (1, 3, 1, 5)
+    values = struct.unpack_from("<10d", wkb, 13)
+    return [list(values[i:i + 2]) for i in range(0, 10, 2)]
+
+def test_geojsonseq_features_read_back(tmp_path, records):
+    output_path = tmp_path / "export.geojsonl"
+    progress = []
+    assert export_geojsonseq(records, str(output_path), chunk_size=2, progress_callback=progress.append) == 4
+    assert progress == [2, 3, 4] # The invalid record is dropped from the second chunk
+
+    with open(output_path, encoding="utf-8") as geojson_file: features = [json.loads(line) for line in geojson_file]
+    assert len(features) == 4
+    for feature, record in zip(features, valid_records(records)):
+        assert feature["type"] == "Feature" and feature["geometry"]["type"] == "Polygon"
+        assert feature["properties"] == {field: record.get(field) for field in EXPORT_PROPERTY_FIELDS}
+        assert feature["geometry"]["coordinates"] == [expected_ring(record)]
+
+def test_geopackage_tables_read_back_with_sqlite(tmp_path, records):
+    output_path = str(tmp_path / "export.gpkg")
+    assert export_geopackage(records, output_path, chunk_size=2) == 4
+
+    conn = sqlite3.connect(output_path)
+    try:
+        assert conn.execute("PRAGMA application_id").fetchone()[0] == 0x47504B47 # 'GPKG'
+        assert conn.execute("SELECT organization, organization_coordsys_id FROM gpkg_spatial_ref_sys WHERE srs_id = ?",
+                            (WGS84_SRS_ID,)).fetchone() == ("EPSG", WGS84_SRS_ID)
+        assert conn.execute("SELECT table_name, column_name, geometry_type_name, srs_id FROM gpkg_geometry_columns").fetchall() == \
+            [("polygon_data", "geom", "POLYGON", WGS84_SRS_ID)]
+        table_name, data_type, *bounds = conn.execute("SELECT table_name, data_type, min_x, min_y, max_x, max_y FROM gpkg_contents").fetchone()
+        rings = [expected_ring(record) for record in valid_records(records)]
+        lons, lats = [lon for ring in rings for lon, _ in ring], [lat for ring in rings for _, lat in ring]
+        assert (table_name, data_type) == ("polygon_data", "features")
+        assert bounds == pytest.approx([min(lons), min(lats), max(lons), max(lats)])
+
+        columns = ", ".join(f'"{field}"' for field in EXPORT_PROPERTY_FIELDS)
+        rows = conn.execute(f"SELECT geom, {columns} FROM polygon_data ORDER BY fid").fetchall()
+    finally:
+        conn.close()
+    assert len(rows) == 4
+    for (geometry, *properties), record in zip(rows, valid_records(records)):
+        magic, version, flags, srs_id = struct.unpack_from("<2sBBi", geometry)
+        assert (magic, version, flags, srs_id) == (b"GP", 0, 0b00000011, WGS84_SRS_ID)
+        ring = parse_wkb_polygon(geometry[40:]) # 8-byte header plus the 32-byte envelope
+        assert ring == expected_ring(record)
+        min_x, max_x, min_y, max_y = struct.unpack_from("<4d", geometry, 8)
+        assert (min_x, max_x, min_y, max_y) == (min(p[0] for p in ring), max(p[0] for p in ring), min(p[1] for p in ring), max(p[1] for p in ring))
+        assert properties == [record.get(field) for field in EXPORT_PROPERTY_FIELDS]
+
+@pytest.mark.parametrize("exporter, file_name", [(export_geopackage, "export.gpkg"), (export_flatgeobuf, "export.fgb")])
+def test_gdal_reads_the_exported_files(tmp_path, records, exporter, file_name):
+    pyogrio_raw = pytest.importorskip("pyogrio.raw")
+    if exporter is export_flatgeobuf: pytest.importorskip("pyarrow")
+    output_path = str(tmp_path / file_name)
+    assert exporter(records, output_path, chunk_size=2) == 4
+
+    meta, _, geometries, field_data = pyogrio_raw.read(output_path)
+    assert meta["geometry_type"] == "Polygon" and meta["crs"] == f"EPSG:{WGS84_SRS_ID}"
+    assert list(meta["fields"]) == EXPORT_PROPERTY_FIELDS
+    expected = valid_records(records)
+    assert [parse_wkb_polygon(bytes(geometry)) for geometry in geometries] == [expected_ring(record) for record in expected]
+    for field, values in zip(meta["fields"], field_data):
+        assert list(values) == [record.get(field) for record in expected]
+
+def test_cancel_stops_before_the_next_chunk(tmp_path, records):
+    checks = []
+    with pytest.raises(GISExportCancelled):
+        export_geojsonseq(records, str(tmp_path / "export.geojsonl"), chunk_size=2, cancel_check=lambda: checks.append(1) or len(checks) > 1)
+    with open(tmp_path / "export.geojsonl", encoding="utf-8") as geojson_file: assert len(geojson_file.readlines()) == 2
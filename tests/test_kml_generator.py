@@ -0,0 +1,87 @@
+# File: DilasaKMLTool_v4/tests/test_kml_generator.py
+# ----------------------------------------------------------------------
+# Purpose: KML output of the generator: the streaming writer against the
+#          simplekml documents it replaces, and the District > Block >
+#          Village region hierarchy.
+# ----------------------------------------------------------------------
+import io
+import os
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from core.kml_generator import (StreamingKMLWriter, add_polygon_to_kml_object, create_shared_polygon_style,
+                                write_region_hierarchy_kml)
+
+KML_NS = {"kml": "http://www.opengis.net/kml/2.2"}
+STYLE_ELEMENTS = ("LineStyle/color", "LineStyle/width", "PolyStyle/fill", "PolyStyle/outline")
+
+def parsed_placemarks(kml_text):
+    """Placemarks as comparable tuples: name, description fields, coordinates and the resolved style; ids are ignored."""
+    root = ET.fromstring(kml_text)
+    styles = {style.get("id"): style for style in root.iter(f"{{{KML_NS['kml']}}}Style")}
+    placemarks = []
+    for placemark in root.iter(f"{{{KML_NS['kml']}}}Placemark"):
+        description = placemark.find("kml:description", KML_NS).text
+        fields = dict(line.split(": ", 1) for line in description.split("\n"))
+        coordinates = [tuple(float(value) for value in point.split(","))
+                       for point in placemark.find(".//kml:coordinates", KML_NS).text.split()]
+        style = styles[placemark.find("kml:styleUrl", KML_NS).text.lstrip("#")]
+        style_values = tuple(style.find("/".join(f"kml:{part}" for part in path.split("/")), KML_NS).text for path in STYLE_ELEMENTS)
+        placemarks.append((placemark.find("kml:name", KML_NS).text, fields, coordinates, style_values))
+    return placemarks
+
+@pytest.mark.parametrize("precision", [None, 7, 3])
+def test_streamed_placemarks_match_simplekml(make_record, precision):
+    import simplekml
+    records = [make_record(1), make_record(2, farmer_name="Patil & Sons <B>", proposed_area_acre=""),
+               make_record(3, p2_zone_letter="?"), # Not convertible: skipped by both writers
+               make_record(4, village_name="गाव", p3_altitude=12.5)]
+    kml_document, shared_style = simplekml.Kml(name="Doc"), create_shared_polygon_style()
+    simplekml_added = [add_polygon_to_kml_object(kml_document, record, shared_style, precision) for record in records]
+    kml_buffer = io.BytesIO()
+    with StreamingKMLWriter(kml_buffer, "Doc", precision) as writer:
+        streamed_added = [writer.add_polygon(record) for record in records]
+
+    assert streamed_added == simplekml_added == [True, True, False, True]
+    streamed, expected = parsed_placemarks(kml_buffer.getvalue()), parsed_placemarks(kml_document.kml().encode("utf-8"))
+    assert [placemark[0] for placemark in streamed] == ["U1", "U2", "U4"]
+    assert streamed == expected
+    assert streamed[1][1]["Farmer name"] == "Patil & Sons <B>" and streamed[1][1]["Proposed Area (acre)"] == "N/A"
+    if precision is not None:
+        assert all(round(value, precision) == value for placemark in streamed for point in placemark[2] for value in point[:2])
+
+def read_kml_root(path, kmz):
+    if not kmz: return ET.parse(path).getroot()
+    with zipfile.ZipFile(path) as kmz_archive: return ET.fromstring(kmz_archive.read("doc.kml"))
+
+def resolve_link(linking_path, href, kmz):
+    """Resolves href the way a viewer does: inside a KMZ, relative to the archive's doc.kml."""
+    base = posixpath.join(linking_path.replace(os.sep, "/"), "doc.kml") if kmz else linking_path.replace(os.sep, "/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), href))
+
+@pytest.mark.parametrize("kmz", [False, True])
+def test_region_links_resolve_to_the_sibling_files(tmp_path, make_record, kmz):
+    records = {index: make_record(index, village_name=f"Village {index % 2}") for index in range(1, 5)}
+    region_rows = [(record["id"], record["district"], record["block"], record["village_name"]) for record in records.values()]
+    root_path, exported_ids, file_count = write_region_hierarchy_kml(
+        region_rows, lambda record_ids: [records[record_id] for record_id in record_ids], str(tmp_path), "Regions", 7, kmz)
+    assert sorted(exported_ids) == sorted(records) and file_count == 5 # index, district, block and two villages
+
+    # Follow the links from the entry file down to the village files
+    pending, placemark_names, visited = [root_path], [], []
+    while pending:
+        path = pending.pop()
+        visited.append(os.path.basename(path))
+        root = read_kml_root(path, kmz)
+        placemark_names += [placemark.find("kml:name", KML_NS).text for placemark in root.iter(f"{{{KML_NS['kml']}}}Placemark")
+                            if placemark.find("kml:Polygon", KML_NS) is not None]
+        for href in root.iter(f"{{{KML_NS['kml']}}}href"):
+            assert href.text.startswith("../") == kmz
+            target = resolve_link(path, href.text, kmz)
+            assert os.path.isfile(target)
+            pending.append(target)
+    assert len(visited) == file_count
+    assert sorted(placemark_names) == sorted(record["uuid"] for record in records.values())
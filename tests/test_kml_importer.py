@@ -0,0 +1,52 @@
+# File: DilasaKMLTool_v4/tests/test_kml_importer.py
+# ----------------------------------------------------------------------
+# Purpose: KML/KMZ import (iter_kml_polygon_records) as the reverse of the
+#          streaming KML writer.
+# ----------------------------------------------------------------------
+import pytest
+
+from core.kml_generator import open_kml_output, StreamingKMLWriter
+from core.kml_importer import iter_kml_polygon_records, KML_IMPORT_RESPONSE_CODE_PREFIX
+
+def write_streamed_kml(path, records, kmz, precision):
+    with open_kml_output(path, kmz) as kml_file, StreamingKMLWriter(kml_file, "Export", precision) as writer:
+        for record in records: writer.add_polygon(record)
+
+@pytest.mark.parametrize("kmz", [False, True])
+@pytest.mark.parametrize("precision, tolerance_m", [(None, 0.001), (7, 0.02)])
+def test_streamed_kml_round_trips_to_records(tmp_path, make_record, kmz, precision, tolerance_m):
+    records = [make_record(index, p2_altitude=float(index)) for index in range(7)]
+    records[2].update(farmer_name="Patil & Sons", village_name="गाव", proposed_area_acre="")
+    kml_path = str(tmp_path / ("export.kmz" if kmz else "export.kml"))
+    write_streamed_kml(kml_path, records, kmz, precision)
+
+    batches = list(iter_kml_polygon_records(kml_path, batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    imported = [record for batch in batches for record in batch]
+    for source, record in zip(records, imported):
+        assert record["uuid"] == source["uuid"] and record["response_code"] == f"{KML_IMPORT_RESPONSE_CODE_PREFIX}{source['uuid']}"
+        assert record["status"] == "valid_for_kml" and record["error_messages"] is None
+        for field in ("farmer_name", "village_name", "block", "district"):
+            assert record[field] == source[field]
+        assert record["proposed_area_acre"] == (source["proposed_area_acre"] or "") # "N/A" comes back empty
+        for point in range(1, 5):
+            assert (record[f"p{point}_zone_num"], record[f"p{point}_zone_letter"]) == (43, "Q")
+            assert record[f"p{point}_easting"] == pytest.approx(source[f"p{point}_easting"], abs=tolerance_m)
+            assert record[f"p{point}_northing"] == pytest.approx(source[f"p{point}_northing"], abs=tolerance_m)
+            assert record[f"p{point}_altitude"] == source[f"p{point}_altitude"]
+            assert record[f"p{point}_utm_str"] == f"43Q {record[f'p{point}_easting']:.2f} {record[f'p{point}_northing']:.2f}"
+
+def test_placemark_without_four_corners_is_kept_as_an_error(tmp_path, make_record):
+    kml_path = str(tmp_path / "export.kml")
+    write_streamed_kml(kml_path, [make_record(1), make_record(2)], False, 7)
+    with open(kml_path, encoding="utf-8") as kml_file: text = kml_file.read()
+    # Drop the fourth corner of U2: a closed triangle
+    start = text.index("<coordinates>", text.index("<name>U2</name>")) + len("<coordinates>")
+    end = text.index("</coordinates>", start)
+    points = text[start:end].split()
+    with open(kml_path, "w", encoding="utf-8") as kml_file: kml_file.write(text[:start] + " ".join(points[:3] + points[4:]) + text[end:])
+
+    first, second = next(iter_kml_polygon_records(kml_path))
+    assert first["status"] == "valid_for_kml"
+    assert second["status"] == "error_parsing" and "3 corner(s)" in second["error_messages"]
+    assert second["farmer_name"] == "Farmer 2"
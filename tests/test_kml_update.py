@@ -0,0 +1,62 @@
+# File: DilasaKMLTool_v4/tests/test_kml_update.py
+# ----------------------------------------------------------------------
+# Purpose: In-place updates of a streamed consolidated KML through its
+#          placemark index (update_consolidated_kml).
+# ----------------------------------------------------------------------
+import os
+import re
+import json
+
+import pytest
+
+from core.kml_generator import open_kml_output, StreamingKMLWriter, save_placemark_index, update_consolidated_kml, KML_INDEX_SUFFIX
+
+@pytest.fixture
+def consolidated_kml(tmp_path, make_record):
+    kml_path = str(tmp_path / "consolidated.kml")
+    with open_kml_output(kml_path) as kml_file, StreamingKMLWriter(kml_file, "Consolidated", 7) as writer:
+        for index in range(5): writer.add_polygon(make_record(index))
+    save_placemark_index(kml_path, writer)
+    return kml_path
+
+def placemark_names(kml_path):
+    with open(kml_path, encoding="utf-8") as kml_file: return re.findall(r"<name>(U\d+)</name>", kml_file.read())
+
+def test_changed_placemark_is_replaced_in_place(consolidated_kml, make_record):
+    written_ids, updated, added = update_consolidated_kml(consolidated_kml, [make_record(2, farmer_name="Changed Farmer")])
+    assert (written_ids, updated, added) == ([2], 1, 0)
+    assert placemark_names(consolidated_kml) == ["U0", "U1", "U2", "U3", "U4"]
+    with open(consolidated_kml, encoding="utf-8") as kml_file: text = kml_file.read()
+    assert text.count("Changed Farmer") == 1 and text.rstrip().endswith("</kml>")
+
+def test_new_records_are_only_appended_when_asked(consolidated_kml, make_record):
+    assert update_consolidated_kml(consolidated_kml, [make_record(7)]) == ([], 0, 0)
+    assert placemark_names(consolidated_kml) == ["U0", "U1", "U2", "U3", "U4"]
+    assert update_consolidated_kml(consolidated_kml, [make_record(7)], append_new_records=True) == ([7], 0, 1)
+    assert placemark_names(consolidated_kml) == ["U0", "U1", "U2", "U3", "U4", "U7"]
+
+def test_repeated_updates_keep_the_index_usable(consolidated_kml, make_record):
+    for round_number in range(3):
+        update_consolidated_kml(consolidated_kml, [make_record(1, farmer_name="x" * (round_number * 40))])
+    assert placemark_names(consolidated_kml) == ["U0", "U1", "U2", "U3", "U4"]
+
+def test_modified_file_is_refused(consolidated_kml, make_record):
+    with open(consolidated_kml, "a", encoding="utf-8") as kml_file: kml_file.write("<!-- edited -->\n")
+    with open(consolidated_kml, "rb") as kml_file: before = kml_file.read()
+    with pytest.raises(ValueError):
+        update_consolidated_kml(consolidated_kml, [make_record(1, farmer_name="Changed")])
+    with open(consolidated_kml, "rb") as kml_file: assert kml_file.read() == before
+
+def test_index_not_matching_placemarks_is_refused(consolidated_kml, make_record):
+    with open(consolidated_kml + KML_INDEX_SUFFIX, encoding="utf-8") as index_file: index_data = json.load(index_file)
+    index_data["placemarks"]["U3"][0] += 40
+    with open(consolidated_kml + KML_INDEX_SUFFIX, "w", encoding="utf-8") as index_file: json.dump(index_data, index_file)
+    with pytest.raises(ValueError):
+        update_consolidated_kml(consolidated_kml, [make_record(1, farmer_name="Changed")])
+    assert [name for name in os.listdir(os.path.dirname(consolidated_kml)) if name.startswith("kml_update_")] == []
+
+def test_missing_index_is_refused(tmp_path, make_record):
+    kml_path = str(tmp_path / "other.kml")
+    with open(kml_path, "w", encoding="utf-8") as kml_file: kml_file.write("<kml/>")
+    with pytest.raises(ValueError):
+        update_consolidated_kml(kml_path, [make_record(1)])
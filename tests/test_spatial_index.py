@@ -0,0 +1,64 @@
+# File: DilasaKMLTool_v4/tests/test_spatial_index.py
+# ----------------------------------------------------------------------
+# Purpose: Incremental density grids for the zoomed-out map records layer
+#          (DensityGrids.sync) against grids built from scratch.
+# ----------------------------------------------------------------------
+import numpy as np
+import pytest
+
+from core.spatial_index import DensityGrids
+
+def random_points(rng, count):
+    return np.column_stack([rng.uniform(73.0, 80.0, count), rng.uniform(16.0, 22.0, count)])
+
+def grids_of(density_grids):
+    return {zoom: (keys.tolist(), counts.tolist()) for zoom, (keys, counts) in density_grids._grids.items()}
+
+def fresh_grids(ids, points):
+    density_grids = DensityGrids()
+    density_grids.sync(ids, points)
+    return grids_of(density_grids)
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(5)
+
+def test_incremental_sync_matches_a_fresh_build(rng):
+    ids, points = np.arange(2000), random_points(rng, 2000)
+    density_grids = DensityGrids()
+    assert density_grids.sync(ids, points) == 2000
+    # Drop 300 records, move 100, add 250 new ones, and pass them in a different order
+    kept = np.setdiff1d(ids, rng.choice(ids, 300, replace=False))
+    kept_points = points[kept].copy()
+    moved = rng.choice(len(kept), 100, replace=False)
+    kept_points[moved] = random_points(rng, 100)
+    new_ids, new_points = np.concatenate([kept, np.arange(5000, 5250)]), np.concatenate([kept_points, random_points(rng, 250)])
+    shuffle = rng.permutation(len(new_ids))
+    assert density_grids.sync(new_ids[shuffle], new_points[shuffle]) == 300 + 100 + 250
+    assert grids_of(density_grids) == fresh_grids(new_ids, new_points)
+    assert len(density_grids) == len(new_ids)
+
+def test_unchanged_sync_touches_nothing(rng):
+    ids, points = np.arange(500), random_points(rng, 500)
+    density_grids = DensityGrids()
+    density_grids.sync(ids, points)
+    before = grids_of(density_grids)
+    assert density_grids.sync(ids[::-1], points[::-1]) == 0
+    assert grids_of(density_grids) == before
+
+def test_emptied_grids_have_no_cells(rng):
+    density_grids = DensityGrids()
+    density_grids.sync(np.arange(100), random_points(rng, 100))
+    density_grids.sync([], np.empty((0, 2)))
+    assert all(not keys for keys, _ in grids_of(density_grids).values())
+    assert density_grids.cells((70.0, 10.0, 85.0, 25.0), 6) == ([], 6, 0)
+
+def test_cells_count_every_point_in_the_viewport(rng):
+    ids, points = np.arange(1000), random_points(rng, 1000)
+    density_grids = DensityGrids()
+    density_grids.sync(ids, points)
+    for zoom in (3, 7, 11):
+        cells, grid_zoom, max_count = density_grids.cells((72.0, 15.0, 81.0, 23.0), zoom) # Covers every point
+        assert grid_zoom == zoom and sum(count for _, _, count in cells) == 1000
+        assert max_count == max(count for _, _, count in cells)
+    assert density_grids.cells((0.0, -10.0, 1.0, -9.0), 8)[0] == [] # Far away from all points
@@ -0,0 +1,18 @@
+# File: DilasaKMLTool_v4/tests/test_survey_csv.py
+# ----------------------------------------------------------------------
+# Purpose: The synthetic survey generator injects what its stats say:
+#          every malformed UTM point really fails to parse.
+# ----------------------------------------------------------------------
+import random
+
+import pytest
+
+from core.data_processor import parse_utm_string
+from benchmarks.survey_csv import _malformed_utm
+
+@pytest.mark.parametrize("easting", [471895.31, 533039.0, 511111.4]) # The last one has no zero to mistype
+def test_every_malformed_variant_fails_to_parse(easting):
+    rng = random.Random(1)
+    variants = {_malformed_utm(43, "Q", easting, 2135691.0, rng) for _ in range(200)}
+    assert len(variants) >= 6
+    assert [variant for variant in variants if parse_utm_string(variant) is not None] == []
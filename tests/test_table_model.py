@@ -0,0 +1,143 @@
+# File: DilasaKMLTool_v4/tests/test_table_model.py
+# ----------------------------------------------------------------------
+# Purpose: The records table model (keyed diff, typed sort) and the
+#          mask-mapped filter proxy in front of it.
+# ----------------------------------------------------------------------
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PySide6.QtWebEngineCore", exc_type=ImportError) # ui.main_window pulls in the map widget
+from PySide6.QtCore import Qt, QPersistentModelIndex
+from PySide6.QtWidgets import QApplication
+from PySide6.QtTest import QAbstractItemModelTester
+
+from ui.main_window import PolygonTableModel, PolygonFilterProxyModel
+from benchmarks.synthetic import make_display_rows
+
+@pytest.fixture(scope="module", autouse=True)
+def qt_app():
+    return QApplication.instance() or QApplication(sys.argv)
+
+@pytest.fixture
+def rows():
+    return make_display_rows(300, seed=7)
+
+def make_proxy(rows):
+    model = PolygonTableModel(rows)
+    proxy = PolygonFilterProxyModel()
+    proxy.setSourceModel(model)
+    QAbstractItemModelTester(proxy, QAbstractItemModelTester.FailureReportingMode.Fatal, proxy) # Checks every signal the proxy emits
+    return model, proxy
+
+def visible_ids(proxy):
+    return [proxy.data(proxy.index(row, PolygonTableModel.ID_COL)) for row in range(proxy.rowCount())]
+
+def expected_ids(rows, uuid_text="", exported=None):
+    # rows are in the model's (DB) order, so the visible ids come out in the same order
+    return [str(row[0]) for row in rows if uuid_text in row[2] and (exported is None or (row[6] > 0) == exported)]
+
+def set_filters(proxy, uuid_text="", export_status="All"):
+    proxy.set_filters(uuid_text, None, None, export_status, "All")
+
+def test_filter_maps_rows_through_the_mask(rows):
+    model, proxy = make_proxy(rows)
+    set_filters(proxy, "3", "Exported")
+    assert visible_ids(proxy) == expected_ids(rows, "3", exported=True)
+    assert proxy.accepted_source_mask().sum() == proxy.rowCount()
+    for proxy_row in range(proxy.rowCount()):
+        source_index = proxy.mapToSource(proxy.index(proxy_row, PolygonTableModel.UUID_COL))
+        assert proxy.mapFromSource(source_index).row() == proxy_row
+    set_filters(proxy)
+    assert proxy.rowCount() == model.rowCount() == len(rows)
+
+def test_tightened_uuid_filter_matches_a_full_rebuild(rows):
+    _, proxy = make_proxy(rows)
+    set_filters(proxy, "a")
+    set_filters(proxy, "a1")
+    assert visible_ids(proxy) == expected_ids(rows, "a1")
+    set_filters(proxy, "1") # Not a narrowing of "a1": recomputed from all rows
+    assert visible_ids(proxy) == expected_ids(rows, "1")
+
+def test_selection_follows_its_record_across_a_filter_change(rows):
+    _, proxy = make_proxy(rows)
+    target = next(i for i, row in enumerate(rows) if "3" in row[2] and i > 50)
+    persistent = QPersistentModelIndex(proxy.index(target, PolygonTableModel.UUID_COL))
+    set_filters(proxy, "3")
+    assert persistent.isValid() and proxy.data(proxy.index(persistent.row(), PolygonTableModel.UUID_COL)) == rows[target][2]
+    hidden = QPersistentModelIndex(proxy.index(0, PolygonTableModel.UUID_COL))
+    set_filters(proxy, rows[target][2])
+    assert proxy.rowCount() == 1 and persistent.row() == 0
+    assert not hidden.isValid() or hidden.row() == 0
+
+def test_incremental_reload_moves_rows_in_and_out_of_the_filter(rows):
+    model, proxy = make_proxy(rows)
+    set_filters(proxy, export_status="Not Exported")
+    reloaded = [row[:6] + ((row[6] or 0) + 1, "2025-02-01T10:00:00") if i % 7 == 0 else row for i, row in enumerate(rows)]
+    reloaded = [row for i, row in enumerate(reloaded) if i % 11 != 5]
+    reloaded[40:40] = [(1000 + i, "valid_for_kml", f"new-{i}", "Farmer", "Village", "2024-05-05T10:00:00", 0, None) for i in range(3)]
+    model.update_data(reloaded)
+    assert visible_ids(proxy) == expected_ids(reloaded, exported=False)
+    assert proxy.accepted_source_mask().tolist() == [row[6] == 0 for row in reloaded]
+
+def test_check_states_pass_through_without_refiltering(rows):
+    model, proxy = make_proxy(rows)
+    set_filters(proxy, "3")
+    proxy.setData(proxy.index(0, PolygonTableModel.CHECKBOX_COL), Qt.CheckState.Checked.value, Qt.ItemDataRole.CheckStateRole)
+    assert model.get_checked_item_db_ids() == [int(visible_ids(proxy)[0])]
+    model.set_rows_checked(proxy.accepted_source_mask())
+    assert model.checked_count() == proxy.rowCount()
+    assert proxy.data(proxy.index(proxy.rowCount() - 1, PolygonTableModel.CHECKBOX_COL), Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+
+def test_sorting_the_source_keeps_the_filter(rows):
+    model, proxy = make_proxy(rows)
+    set_filters(proxy, "3")
+    proxy.sort(PolygonTableModel.UUID_COL, Qt.SortOrder.DescendingOrder)
+    uuids = [proxy.data(proxy.index(row, PolygonTableModel.UUID_COL)) for row in range(proxy.rowCount())]
+    assert uuids == sorted((row[2] for row in rows if "3" in row[2]), reverse=True)
+
+def model_ids(model):
+    return [model.data(model.index(row, PolygonTableModel.ID_COL)) for row in range(model.rowCount())]
+
+def test_reload_is_applied_as_a_keyed_diff(rows):
+    model = PolygonTableModel(rows)
+    QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal, model)
+    resets, inserted, removed = [], [], []
+    model.modelReset.connect(lambda: resets.append(1))
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: removed.append((first, last)))
+    model.setData(model.index(20, PolygonTableModel.CHECKBOX_COL), Qt.CheckState.Checked.value, Qt.ItemDataRole.CheckStateRole)
+    reloaded = rows[:10] + rows[13:] # Three rows deleted
+    reloaded[30] = reloaded[30][:6] + (99, "2025-03-01T10:00:00")
+    reloaded[50:50] = [(5000, "valid_for_kml", "new-uuid", "Farmer", "Village", "2024-01-01T00:00:00", 0, None)]
+    model.update_data(reloaded)
+    assert not resets and removed == [(10, 12)] and inserted == [(50, 50)]
+    assert model_ids(model) == [str(row[0]) for row in reloaded]
+    assert model.data(model.index(30, PolygonTableModel.EXPORT_COUNT_COL)) == "99"
+    assert model.get_checked_item_db_ids() == [rows[20][0]]
+
+def test_reordered_reload_falls_back_to_a_reset(rows):
+    model = PolygonTableModel(rows)
+    resets = []
+    model.modelReset.connect(lambda: resets.append(1))
+    model.setData(model.index(5, PolygonTableModel.CHECKBOX_COL), Qt.CheckState.Checked.value, Qt.ItemDataRole.CheckStateRole)
+    model.update_data(rows[::-1])
+    assert resets and model_ids(model) == [str(row[0]) for row in rows[::-1]]
+    assert model.get_checked_item_db_ids() == [rows[5][0]] # Check states survive the reset by id
+
+def test_sort_uses_typed_keys_and_breaks_ties_by_id(rows):
+    model = PolygonTableModel(rows)
+    persistent = QPersistentModelIndex(model.index(0, PolygonTableModel.UUID_COL))
+    model.sort(PolygonTableModel.EXPORT_COUNT_COL, Qt.SortOrder.AscendingOrder)
+    assert model_ids(model) == [str(row[0]) for row in sorted(rows, key=lambda row: (row[6], row[0]))] # 2 before 10, not as text
+    assert model.data(model.index(persistent.row(), PolygonTableModel.UUID_COL)) == rows[0][2]
+
+def test_reload_keeps_the_current_sort(rows):
+    model = PolygonTableModel(rows)
+    model.sort(PolygonTableModel.UUID_COL, Qt.SortOrder.DescendingOrder)
+    reloaded = rows + [(5000, "valid_for_kml", "zzz-new", "Farmer", "Village", "2024-01-01T00:00:00", 0, None)]
+    model.update_data(reloaded)
+    assert model.data(model.index(0, PolygonTableModel.UUID_COL)) == "zzz-new"
+    assert model_ids(model) == [str(row[0]) for row in sorted(reloaded, key=lambda row: row[2].lower(), reverse=True)]
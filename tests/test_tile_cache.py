@@ -0,0 +1,33 @@
+# File: DilasaKMLTool_v4/tests/test_tile_cache.py
+# ----------------------------------------------------------------------
+# Purpose: LRU eviction of the on-disk tile store and the seeding tile cap.
+# ----------------------------------------------------------------------
+import pytest
+
+from core.tile_cache import TileCache, TileLimitExceeded, tiles_for_bboxes
+
+@pytest.fixture
+def cache(tmp_path):
+    tile_cache = TileCache(str(tmp_path / "tiles.mbtiles"), max_bytes=10_000)
+    yield tile_cache
+    tile_cache.close()
+
+def test_eviction_removes_only_enough_tiles_from_a_batch(cache):
+    cache.put_many([("esri", 10, x, 0, b"x" * 1000) for x in range(10)]) # One batch, one last_access, exactly at the quota
+    cache.put("esri", 10, 99, 0, b"y" * 1000) # 1000 bytes over: evict down to 9000
+    assert cache.stats()["bytes"] == 9000
+    assert not cache.contains("esri", 10, 0, 0) and not cache.contains("esri", 10, 1, 0) # Oldest first
+    assert cache.contains("esri", 10, 2, 0) and cache.contains("esri", 10, 99, 0)
+
+def test_recently_read_tiles_survive_eviction(cache):
+    cache.put_many([("esri", 10, x, 0, b"x" * 1000) for x in range(10)])
+    cache.get("esri", 10, 0, 0)
+    cache.put("esri", 10, 99, 0, b"y" * 1000)
+    assert cache.contains("esri", 10, 0, 0) and not cache.contains("esri", 10, 1, 0)
+
+def test_tile_list_is_capped():
+    bbox = (73.80, 18.50, 73.81, 18.51)
+    tiles = tiles_for_bboxes([bbox], 14, 16)
+    assert tiles_for_bboxes([bbox], 14, 16, max_tiles=len(tiles)) == tiles
+    with pytest.raises(TileLimitExceeded): tiles_for_bboxes([bbox], 14, 16, max_tiles=len(tiles) - 1)
+    with pytest.raises(TileLimitExceeded): tiles_for_bboxes([(60.0, 5.0, 90.0, 35.0)], 19, 19, max_tiles=1000) # Never enumerated
@@ -0,0 +1,40 @@
+# File: DilasaKMLTool_v4/ui/dialogs/diagnostics_dialog.py
+# ----------------------------------------------------------------------
+# Purpose: Read-only diagnostics reports (UI stalls, performance trace
+#          summary) in monospace tabs that can be refreshed while the app
+#          keeps running.
+# ----------------------------------------------------------------------
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QPlainTextEdit, QTabWidget
+from PySide6.QtGui import QFontDatabase
+from .api_sources_dialog import center_dialog
+
+class DiagnosticsDialog(QDialog):
+    """One tab per report; each report is a (title, text_provider) pair re-read on Refresh."""
+    def __init__(self, parent_main_window, reports, current_index=0):
+        super().__init__(parent_main_window)
+        self.setWindowTitle("Diagnostics")
+        self.resize(900, 480)
+        self.reports = reports
+
+        layout = QVBoxLayout(self); layout.setContentsMargins(10,10,10,10)
+        self.tabs = QTabWidget()
+        self.text_views = []
+        for title, _ in reports:
+            text_view = QPlainTextEdit(); text_view.setReadOnly(True)
+            text_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+            text_view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+            self.tabs.addTab(text_view, title); self.text_views.append(text_view)
+        self.tabs.setCurrentIndex(current_index)
+        layout.addWidget(self.tabs)
+
+        button_layout = QHBoxLayout(); button_layout.addStretch()
+        refresh_button = QPushButton("Refresh"); refresh_button.clicked.connect(self.refresh)
+        close_button = QPushButton("Close"); close_button.clicked.connect(self.accept)
+        button_layout.addWidget(refresh_button); button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+        center_dialog(self, parent_main_window)
+
+    def refresh(self):
+        for text_view, (_, text_provider) in zip(self.text_views, self.reports): text_view.setPlainText(text_provider())
@@ -1,8 +1,18 @@
 # File: DilasaKMLTool_v4/ui/dialogs/output_mode_dialog.py
 # ----------------------------------------------------------------------
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QRadioButton, QButtonGroup, QDialogButtonBox, QFrame
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QRadioButton, QButtonGroup, QDialogButtonBox, QFrame, QCheckBox, QComboBox, QGroupBox
 from PySide6.QtCore import Qt
 from .api_sources_dialog import center_dialog # Re-use centering utility
+from core.kml_generator import DEFAULT_KML_COORDINATE_PRECISION
+
+# (label, decimal places kept for lon/lat; None = full precision)
+COORDINATE_PRECISION_CHOICES = [
+    ("Full precision", None),
+    ("8 decimals (~1 mm)", 8),
+    ("7 decimals (~1 cm)", 7),
+    ("6 decimals (~10 cm)", 6),
+    ("5 decimals (~1 m)", 5),
+]
 
 class OutputModeDialog(QDialog):
     def __init__(self, parent):
@@ -10,6 +20,8 @@ class OutputModeDialog(QDialog):
         self.setWindowTitle("Select KML Output Mode")
         self.setModal(True)
         self.selected_mode = "single"  # Default mode
+        self.kmz_output = False
+        self.coordinate_precision = DEFAULT_KML_COORDINATE_PRECISION
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -37,6 +49,31 @@ class OutputModeDialog(QDialog):
         hint_multiple = QLabel("  (Each selected valid polygon will be saved as a separate .kml file, named by its UUID)")
         hint_multiple.setStyleSheet("font-style: italic; color: grey; padding-left: 15px;")
         layout.addWidget(hint_multiple)
+
+        layout.addSpacing(10)
+
+        # Region hierarchy Option (for very large selections)
+        self.rb_regions = QRadioButton("Region Hierarchy (District / Block / Village)")
+        self.button_group.addButton(self.rb_regions)
+        layout.addWidget(self.rb_regions)
+        hint_regions = QLabel("  (Linked files per district, block and village; Google Earth only loads polygons\n   visible at the current zoom and shows village centroids when zoomed out. Open index file.)")
+        hint_regions.setStyleSheet("font-style: italic; color: grey; padding-left: 15px;")
+        layout.addWidget(hint_regions)
+
+        # File size options
+        size_options_group = QGroupBox("File Size Options")
+        size_options_layout = QVBoxLayout(size_options_group)
+        precision_layout = QHBoxLayout()
+        precision_layout.addWidget(QLabel("Coordinate precision:"))
+        self.precision_combo = QComboBox()
+        for label, decimals in COORDINATE_PRECISION_CHOICES:
+            self.precision_combo.addItem(label, userData=decimals)
+        self.precision_combo.setCurrentIndex(self.precision_combo.findData(DEFAULT_KML_COORDINATE_PRECISION))
+        precision_layout.addWidget(self.precision_combo, 1)
+        size_options_layout.addLayout(precision_layout)
+        self.kmz_checkbox = QCheckBox("Compress as KMZ (smaller files, opens directly in Google Earth)")
+        size_options_layout.addWidget(self.kmz_checkbox)
+        layout.addWidget(size_options_group)
         
         layout.addStretch()
 
@@ -52,8 +89,12 @@ class OutputModeDialog(QDialog):
     def accept_choice(self):
         if self.rb_single.isChecked():
             self.selected_mode = "single"
+        elif self.rb_regions.isChecked():
+            self.selected_mode = "regions"
         else:
             self.selected_mode = "multiple"
+        self.kmz_output = self.kmz_checkbox.isChecked()
+        self.coordinate_precision = self.precision_combo.currentData()
         self.accept()
 
     def get_selected_mode(self):
@@ -1,33 +1,43 @@
 # DilasaKMLTool_v4/ui/main_window.py (Significant Updates)
 # ----------------------------------------------------------------------
 import os 
-import sys 
 import csv
+import itertools
 import utm 
+import numpy as np
+from operator import itemgetter
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableView, 
                                QSplitter, QFrame, QStatusBar, QMenuBar, QMenu, QToolBar, QPushButton,
                                QAbstractItemView, QHeaderView, QMessageBox, QFileDialog, QComboBox,
-                               QSizePolicy, QTextEdit, QInputDialog, QLineEdit, QDateEdit, QGridLayout,
-                               QCheckBox, QGroupBox) 
+                               QSizePolicy, QInputDialog, QLineEdit, QDateEdit, QGridLayout,
+                               QCheckBox, QGroupBox, QProgressDialog, QApplication) 
 from PySide6.QtGui import QPixmap, QIcon, QAction, QStandardItemModel, QStandardItem, QFont, QColor 
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, QSize, QSortFilterProxyModel, QDate 
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, QSize, QAbstractProxyModel, QPersistentModelIndex, QDate, QThread, Signal, QElapsedTimer 
 
 from database.db_manager import DatabaseManager 
 from core.utils import resource_path
 from core.data_processor import process_csv_row_data, CSV_HEADERS 
-from core.api_handler import fetch_data_from_mwater_api
-from core.kml_generator import add_polygon_to_kml_object 
-import simplekml 
+from core.kml_generator import (open_kml_output, StreamingKMLWriter, write_region_hierarchy_kml, save_placemark_index,
+                                update_consolidated_kml, DEFAULT_KML_COORDINATE_PRECISION)
+from core.kml_export_engine import export_kml_files_parallel
+from core.geo_exporters import GIS_EXPORT_FORMATS, GISExportCancelled, records_to_lonlat_rings
+from core.tile_cache import TileCache, TILE_CACHE_FILE_NAME, MAX_SEED_ZOOM, MAX_SEED_TILES, TileLimitExceeded, tiles_for_bboxes, seed_tiles
+from core.table_exporters import TABLE_EXPORT_FORMATS, TableExportCancelled
+from core.kml_importer import iter_kml_polygon_records
+from core.tracing import tracer, span, traced
 import datetime 
-# Add this import at the top of main_window.py
-from .dialogs.historical_map_builder_dialog import HistoricalMapBuilderDialog
+# Heavy, feature-specific modules (requests via core.api_handler; geopandas/ee via the historical map
+# builder dialog; folium and QtWebEngineWidgets via MapViewWidget) are imported where first used, not here
 
 
 # Assuming dialogs are in their own files and correctly imported
 from .dialogs.api_sources_dialog import APISourcesDialog 
 from .dialogs.duplicate_dialog import DuplicateDialog
 from .dialogs.output_mode_dialog import OutputModeDialog 
+from .dialogs.diagnostics_dialog import DiagnosticsDialog
 from .widgets.map_view_widget import MapViewWidget
+from .widgets.log_panel import LogPanel
+from .stall_watchdog import StallWatchdog, STALL_LOG_FILE_NAME, stall_threshold_from_environment
 
 
 # Constants 
@@ -38,72 +48,120 @@ APP_ICON_FILE_NAME_MW = "app_icon.ico"
 INFO_COLOR_MW = "#0078D7"
 ERROR_COLOR_MW = "#D32F2F"     
 SUCCESS_COLOR_MW = "#388E3C"   
-FG_COLOR_MW = "#333333"        
+FG_COLOR_MW = "#333333"
+LOG_FILE_NAME_MW = "dilasa_kml_tool.log"        
+
+FILTER_DEBOUNCE_MS = 250 # Quiet time after the last filter edit before the table re-filters
+MAP_SELECTION_DEBOUNCE_MS = 60 # Rapid arrow-key navigation only updates the map for the row it settles on
+MAP_LAYER_DEBOUNCE_MS = 300 # Quiet time after a filter/check change before the map's records layer is rebuilt
+MAP_LAYER_MODES = ["Selected Record", "Checked Records", "Filtered Records"]
+MAP_LAYER_CHUNK_SIZE = 5000 # Records read and converted per step, so a cancel is noticed quickly
+MAP_LAYER_POINT_COLUMNS = ["id"] + [f"p{i}_{field}" for i in range(1, 5) for field in ("easting", "northing", "zone_num", "zone_letter")]
+EMPTY_RING_CACHE = (np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty((0, 5, 2)))
+INITIAL_LOAD_FIRST_PAGE_ROWS = 1000  # Rows in the first page streamed into the table at startup, so it fills right away
+INITIAL_LOAD_PAGE_ROWS = 50000       # Rows per page after that
 
 ORGANIZATION_TAGLINE_MW = "Developed by Dilasa Janvikash Pratishthan to support community upliftment"
 
 # --- Table Model with Checkbox Support ---
+# Above this many separate removed/added/changed row ranges a reload resets the model instead of diffing
+MAX_INCREMENTAL_UPDATE_RANGES = 2000
+
+def _contiguous_ranges(sorted_rows):
+    """[2, 3, 4, 8, 9] -> [(2, 4), (8, 9)]"""
+    ranges = []
+    for row in sorted_rows:
+        if ranges and ranges[-1][1] == row - 1: ranges[-1][1] = row
+        else: ranges.append([row, row])
+    return [tuple(r) for r in ranges]
+
+# Item roles looked up once: data() runs for every visible cell and role on each repaint
+_DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole
+_FONT_ROLE = Qt.ItemDataRole.FontRole
+_FOREGROUND_ROLE = Qt.ItemDataRole.ForegroundRole
+_ALIGNMENT_ROLE = Qt.ItemDataRole.TextAlignmentRole
+_CHECK_STATE_ROLE = Qt.ItemDataRole.CheckStateRole
+_CHECKED = Qt.CheckState.Checked
+_UNCHECKED = Qt.CheckState.Unchecked
+
 class PolygonTableModel(QAbstractTableModel):
     CHECKBOX_COL = 0; ID_COL = 1; STATUS_COL = 2; UUID_COL = 3; FARMER_COL = 4
     VILLAGE_COL = 5; DATE_ADDED_COL = 6; EXPORT_COUNT_COL = 7; LAST_EXPORTED_COL = 8
+    _ALIGN_LEFT = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+    _ALIGN_CENTER = Qt.AlignmentFlag.AlignCenter
+    # Emitted around a bulk check-state dataChanged; check states never affect filtering or sorting
+    checkStatesAboutToChange = Signal()
+    checkStatesChanged = Signal()
 
     def __init__(self, data_list=None, parent=None):
         super().__init__(parent)
-        self._data = [] 
-        self._check_states = {} 
+        # Column-oriented storage: one list per DB column (same order as DISPLAY_COLUMNS_SQL, view column - 1).
+        # Display strings and error flags are computed once per load, so data() is only list lookups.
+        self._columns = [[] for _ in range(self.LAST_EXPORTED_COL)]
+        self._ids = self._columns[self.ID_COL - 1] # Same list, as after every _set_storage
+        self._display_columns = [[] for _ in range(self.LAST_EXPORTED_COL)]
+        self._error_flags = []
+        # Typed per-row keys for filtering and sorting, kept in step with the columns above
+        self._date_ordinals = []  # date_added day as date.toordinal(), -1 if missing/invalid
+        self._uuid_keys = []      # lowercased uuid
+        self._export_counts = []  # kml_export_count as int (None -> 0)
+        self._sort_column, self._sort_order = None, Qt.SortOrder.AscendingOrder
+        self.data_version = 0     # Bumped whenever rows change, so the proxy knows when its filter mask is stale
+        self._checked = bytearray() # One byte per row, 1 = checked; kept in step with the row storage
         self._headers = ["", "ID", "Status", "UUID", "Farmer Name", "Village", 
                          "Date Added", "Export Count", "Last Exported"]
+        # Shared instances handed out for every cell instead of constructing new ones per data() call
+        self._cell_font = QFont("Segoe UI", 9)
+        self._header_font = QFont("Segoe UI", 9, QFont.Weight.Bold)
+        self._error_color = QColor("red")
         if data_list: self.update_data(data_list)
 
-    def rowCount(self, parent=QModelIndex()): return len(self._data)
-    def columnCount(self, parent=QModelIndex()): return len(self._headers)
-
-    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
-        if not index.isValid(): return None
-        row, col = index.row(), index.column()
-        if row >= len(self._data): return None
-        record = self._data[row] 
-        if len(record) <= (self.ID_COL -1) : return None # Ensure record has ID column
-        db_id = record[self.ID_COL -1] # ID is at index 0 of the DB tuple, maps to col 1 in view
-
-        if role == Qt.ItemDataRole.CheckStateRole and col == self.CHECKBOX_COL:
-            return self._check_states.get(db_id, Qt.CheckState.Unchecked)
-        
-        if role == Qt.ItemDataRole.DisplayRole:
-            if col == self.CHECKBOX_COL: return None
-            data_col_idx = col -1 
-            if data_col_idx >= len(record): return None 
-            try:
-                value = record[data_col_idx]
-                if data_col_idx == (self.EXPORT_COUNT_COL -1) and value is None: return "0" 
-                if data_col_idx == (self.LAST_EXPORTED_COL -1) and value is None: return ""  
-                if isinstance(value, (datetime.datetime, datetime.date)): 
-                    return value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime.datetime) else value.strftime("%Y-%m-%d")
-                return str(value) if value is not None else "" 
-            except IndexError: return None
-        elif role == Qt.ItemDataRole.TextAlignmentRole:
-            return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter if col != self.CHECKBOX_COL else Qt.AlignmentFlag.AlignCenter
-        elif role == Qt.ItemDataRole.ForegroundRole: 
-            if col == self.STATUS_COL and len(record) > (self.STATUS_COL-1) and record[self.STATUS_COL-1] and "error" in str(record[self.STATUS_COL-1]).lower():
-                return QColor("red")
-        elif role == Qt.ItemDataRole.FontRole and col != self.CHECKBOX_COL: 
-             return QFont("Segoe UI", 9)
+    def rowCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self._ids)
+    def columnCount(self, parent=QModelIndex()): return 0 if parent.isValid() else len(self._headers)
+
+    @staticmethod
+    def _display_strings(data_col_idx, values):
+        empty = "0" if data_col_idx == (PolygonTableModel.EXPORT_COUNT_COL - 1) else ""
+        def to_display(value):
+            if value is None: return empty
+            if isinstance(value, datetime.datetime): return value.strftime("%Y-%m-%d %H:%M:%S")
+            if isinstance(value, datetime.date): return value.strftime("%Y-%m-%d")
+            return str(value)
+        # Fast paths for what SQLite actually returns (str, int); everything else goes through to_display
+        return [value if value.__class__ is str else str(value) if value.__class__ is int else to_display(value) for value in values]
+
+    def data(self, index, role=_DISPLAY_ROLE):
+        return self.cell_data(index.row(), index.column(), role)
+
+    def cell_data(self, row, col, role=_DISPLAY_ROLE):
+        """data() by row and column, so the filter proxy can look cells up without building a source index."""
+        if row < 0 or row >= len(self._ids): return None # row is -1 for an invalid index
+        if role == _DISPLAY_ROLE:
+            return self._display_columns[col - 1][row] if col != self.CHECKBOX_COL else None
+        elif role == _FONT_ROLE:
+            if col != self.CHECKBOX_COL: return self._cell_font
+        elif role == _FOREGROUND_ROLE: 
+            if col == self.STATUS_COL and self._error_flags[row]: return self._error_color
+        elif role == _ALIGNMENT_ROLE:
+            return self._ALIGN_LEFT if col != self.CHECKBOX_COL else self._ALIGN_CENTER
+        elif role == _CHECK_STATE_ROLE:
+            if col == self.CHECKBOX_COL: return _CHECKED if self._checked[row] else _UNCHECKED
         return None
 
     def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
         if not index.isValid(): return False
         row, col = index.row(), index.column()
-        if row >= len(self._data) or len(self._data[row]) <= (self.ID_COL -1) : return False
+        if row >= len(self._ids): return False
 
         if role == Qt.ItemDataRole.CheckStateRole and col == self.CHECKBOX_COL:
-            db_id = self._data[row][self.ID_COL-1] 
-            self._check_states[db_id] = Qt.CheckState(value) 
+            self._checked[row] = Qt.CheckState(value) == _CHECKED
             self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
             return True
         return False
 
     def flags(self, index):
         flags = super().flags(index)
+        if not index.isValid(): return flags
         if index.column() == self.CHECKBOX_COL:
             flags |= Qt.ItemFlag.ItemIsUserCheckable
         else:
@@ -115,91 +173,737 @@ class PolygonTableModel(QAbstractTableModel):
         if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
             return self._headers[section]
         if role == Qt.ItemDataRole.FontRole and orientation == Qt.Orientation.Horizontal: 
-            return QFont("Segoe UI", 9, QFont.Weight.Bold)
+            return self._header_font
         return None
 
+    @staticmethod
+    def _day_ordinal(day):
+        try: return datetime.date.fromisoformat(day).toordinal()
+        except ValueError: return -1
+
+    def _build_storage(self, rows):
+        """Column storage for rows: raw columns, display columns, error flags and filter keys, in _storage_lists order."""
+        columns = [list(map(itemgetter(i), rows)) for i in range(self.LAST_EXPORTED_COL)]
+        display_columns = [self._display_strings(i, column) for i, column in enumerate(columns)]
+        statuses = columns[self.STATUS_COL - 1]
+        error_by_status = {status: "error" in str(status).lower() for status in set(statuses)} # Only a handful of distinct statuses
+        days = [value[:10] if value.__class__ is str else "" for value in columns[self.DATE_ADDED_COL - 1]]
+        ordinal_by_day = {day: self._day_ordinal(day) for day in set(days)}
+        return columns + display_columns + [
+            [error_by_status[status] for status in statuses],
+            [ordinal_by_day[day] for day in days],
+            [uuid_value.lower() for uuid_value in display_columns[self.UUID_COL - 1]],
+            [count or 0 for count in columns[self.EXPORT_COUNT_COL - 1]],
+        ]
+
+    def _storage_lists(self):
+        return self._columns + self._display_columns + [self._error_flags, self._date_ordinals, self._uuid_keys, self._export_counts]
+
+    def _set_storage(self, storage):
+        column_count = self.LAST_EXPORTED_COL
+        self._columns = storage[:column_count]
+        self._display_columns = storage[column_count:2 * column_count]
+        self._error_flags, self._date_ordinals, self._uuid_keys, self._export_counts = storage[2 * column_count:]
+        self._ids = self._columns[self.ID_COL - 1]
+
+    def _row_sort_keys(self, column, rows):
+        """Typed sort keys for raw DB rows, the same values the storage holds for _sort_keys."""
+        values = map(itemgetter(column - 1), rows)
+        if column == self.ID_COL: return list(values)
+        if column == self.EXPORT_COUNT_COL: return [count or 0 for count in values]
+        if column == self.UUID_COL: return ["" if value is None else str(value).lower() for value in values]
+        return ["" if value is None else str(value) for value in values] # Dates are ISO strings, so they sort as text
+
+    def _sort_permutation(self, ids, keys, order):
+        """Row order by key, ties broken by id so every sort has one well-defined order."""
+        permutation = np.lexsort((np.array(ids), np.array(keys)))
+        if order == Qt.SortOrder.DescendingOrder: permutation = permutation[::-1]
+        return permutation.tolist()
+
+    def _sort_keys(self, column):
+        """Per-row typed sort keys from the storage."""
+        if column == self.ID_COL: return self._ids
+        if column == self.EXPORT_COUNT_COL: return self._export_counts
+        if column == self.UUID_COL: return self._uuid_keys
+        return self._display_columns[column - 1]
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """
+        Reorders the rows on typed keys (ints for ID/Export Count, ISO text for dates) with one NumPy lexsort,
+        instead of the proxy comparing display strings through data() for every pair.
+        """
+        if column == self.CHECKBOX_COL or column >= self.columnCount(): return
+        self._sort_column, self._sort_order = column, order
+        if not self._ids: return
+        permutation = self._sort_permutation(self._ids, self._sort_keys(column), order)
+        if permutation == list(range(len(permutation))): return
+        self.layoutAboutToBeChanged.emit()
+        new_row_of = [0] * len(permutation)
+        for new_row, old_row in enumerate(permutation): new_row_of[old_row] = new_row
+        self._set_storage([list(map(values.__getitem__, permutation)) for values in self._storage_lists()])
+        self._checked = bytearray(map(self._checked.__getitem__, permutation))
+        old_persistent = self.persistentIndexList()
+        self.changePersistentIndexList(old_persistent, [self.index(new_row_of[index.row()], index.column()) for index in old_persistent])
+        self.data_version += 1
+        self.layoutChanged.emit()
+
+    @traced("ui.model_update")
     def update_data(self, new_data_list):
-        self.beginResetModel()
-        self._data = new_data_list if new_data_list is not None else []
-        current_ids = {row[0] for row in self._data if row} 
-        self._check_states = {db_id: state for db_id, state in self._check_states.items() if db_id in current_ids}
-        self.endResetModel()
+        """
+        Applies freshly loaded rows as a keyed diff by DB id: removed and added rows go through
+        beginRemoveRows/beginInsertRows and changed rows get a dataChanged for their range only,
+        so selection, scroll position and the proxy's sort/filter mapping survive a reload.
+        Falls back to a full model reset on first load, when the row order changed or when the diff is too scattered.
+        """
+        rows = new_data_list or []
+        if self._sort_column is not None: # Keep the user's sort: bring DB-ordered rows into the current order first
+            ids = [row[self.ID_COL - 1] for row in rows]
+            rows = list(map(rows.__getitem__, self._sort_permutation(ids, self._row_sort_keys(self._sort_column, rows), self._sort_order)))
+        if not self._ids or not rows or not self._apply_diff(rows):
+            checked_ids = set(self.get_checked_item_db_ids())
+            self.beginResetModel()
+            self._set_storage(self._build_storage(rows))
+            self._checked = bytearray(db_id in checked_ids for db_id in self._ids) if checked_ids else bytearray(len(self._ids))
+            self.data_version += 1
+            self.endResetModel()
+
+    @traced("ui.model_append")
+    def append_rows(self, rows):
+        """
+        Appends a page of rows streamed in DB order (date added, newest first). The default sort is that
+        order, so pages simply go at the end; under any other sort the rows are re-sorted after each page.
+        """
+        if not rows: return
+        first = len(self._ids)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for values, new_values in zip(self._storage_lists(), self._build_storage(rows)): values.extend(new_values)
+        self._checked.extend(bytes(len(rows)))
+        self.data_version += 1
+        self.endInsertRows()
+        if self._sort_column is not None and (self._sort_column, self._sort_order) != (self.DATE_ADDED_COL, Qt.SortOrder.DescendingOrder):
+            self.sort(self._sort_column, self._sort_order)
+
+    def _apply_diff(self, rows):
+        """Returns False, without touching the model, if the rows cannot be applied incrementally."""
+        new_ids = [row[self.ID_COL - 1] for row in rows]
+        old_row_by_id = {db_id: i for i, db_id in enumerate(self._ids)}
+        new_id_set = set(new_ids)
+        if len(new_id_set) != len(new_ids): return False
+        # Rows kept on both sides must be in the same relative order, otherwise this is a reorder, not a diff
+        if [db_id for db_id in self._ids if db_id in new_id_set] != [db_id for db_id in new_ids if db_id in old_row_by_id]: return False
+        removed_ranges = _contiguous_ranges([i for i, db_id in enumerate(self._ids) if db_id not in new_id_set])
+        inserted_ranges = _contiguous_ranges([j for j, db_id in enumerate(new_ids) if db_id not in old_row_by_id])
+        old_rows = list(zip(*self._columns))
+        changed_ranges = _contiguous_ranges([j for j, (db_id, row) in enumerate(zip(new_ids, rows))
+                                             if db_id in old_row_by_id and old_rows[old_row_by_id[db_id]] != tuple(row)])
+        if len(removed_ranges) + len(inserted_ranges) + len(changed_ranges) > MAX_INCREMENTAL_UPDATE_RANGES: return False
+
+        storage = self._storage_lists()
+        self.data_version += 1
+        for first, last in reversed(removed_ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for values in storage: del values[first:last + 1]
+            del self._checked[first:last + 1]
+            self.endRemoveRows()
+        for first, last in inserted_ranges:
+            self.beginInsertRows(QModelIndex(), first, last)
+            for values, new_values in zip(storage, self._build_storage(rows[first:last + 1])): values[first:first] = new_values
+            self._checked[first:first] = bytes(last - first + 1)
+            self.endInsertRows()
+        for first, last in changed_ranges:
+            for values, new_values in zip(storage, self._build_storage(rows[first:last + 1])): values[first:last + 1] = new_values
+            self.dataChanged.emit(self.index(first, self.ID_COL), self.index(last, self.LAST_EXPORTED_COL))
+        return True
+
+    def record_ids(self, row_mask=None):
+        """DB ids of all rows, or of the rows selected by a bool mask, in row order."""
+        if row_mask is None: return list(self._ids)
+        return list(itertools.compress(self._ids, np.asarray(row_mask, dtype=bool).tolist()))
 
     def get_checked_item_db_ids(self):
-        return [db_id for db_id, state in self._check_states.items() if state == Qt.CheckState.Checked]
+        return list(itertools.compress(self._ids, self._checked))
+
+    def checked_count(self): return len(self._checked) - self._checked.count(0)
+
+    def _check_mask(self):
+        """Writable NumPy bool view of the check states. Only keep it for the duration of one operation:
+        the bytearray cannot be resized while a view exists."""
+        return np.frombuffer(self._checked, dtype=np.bool_)
+
+    def _emit_check_states_changed(self):
+        # One signal for the checkbox column only; the other columns and the row order are untouched
+        if not self._ids: return
+        self.checkStatesAboutToChange.emit()
+        self.dataChanged.emit(self.index(0, self.CHECKBOX_COL), self.index(len(self._ids) - 1, self.CHECKBOX_COL), [_CHECK_STATE_ROLE])
+        self.checkStatesChanged.emit()
 
     def set_all_checkboxes(self, state=Qt.CheckState.Checked):
-        self.beginResetModel() 
-        for row_data in self._data:
-            if row_data and len(row_data) > 0: 
-                 db_id = row_data[0] 
-                 self._check_states[db_id] = state
-        self.endResetModel()
+        self._check_mask()[:] = Qt.CheckState(state) == _CHECKED
+        self._emit_check_states_changed()
+
+    def set_rows_checked(self, row_mask, state=Qt.CheckState.Checked):
+        """Checks (or unchecks) the source rows selected by a bool mask, leaving the other rows as they are."""
+        self._check_mask()[np.asarray(row_mask, dtype=bool)] = Qt.CheckState(state) == _CHECKED
+        self._emit_check_states_changed()
+
+    def invert_checkboxes(self, row_mask=None):
+        """Inverts the check state of all rows, or only of the rows selected by a bool mask."""
+        check_mask = self._check_mask()
+        if row_mask is None: np.logical_not(check_mask, out=check_mask)
+        else:
+            row_mask = np.asarray(row_mask, dtype=bool)
+            check_mask[row_mask] = ~check_mask[row_mask]
+        del check_mask
+        self._emit_check_states_changed()
+
+    def table_snapshot(self):
+        """
+        Headers and shallow copies of the displayed columns (raw DB values, export counts as ints),
+        safe to read from a worker thread while the model keeps changing.
+        """
+        columns = [list(column) for column in self._columns]
+        columns[self.EXPORT_COUNT_COL - 1] = list(self._export_counts)
+        return self._headers[1:], columns
+
+    def statuses(self):
+        return sorted({str(status) for status in self._columns[self.STATUS_COL - 1] if status is not None})
+
+    def rows_matching(self, exported=None, errors=None, status=None):
+        """Bool mask of the rows matching every criterion given (None = any), built from the precomputed keys."""
+        row_count = len(self._ids)
+        mask = np.ones(row_count, dtype=bool)
+        if exported is not None:
+            mask &= (np.fromiter(self._export_counts, dtype=np.int64, count=row_count) > 0) == exported
+        if errors is not None:
+            mask &= np.fromiter(self._error_flags, dtype=bool, count=row_count) == errors
+        if status is not None:
+            mask &= np.fromiter((value == status for value in self._display_columns[self.STATUS_COL - 1]), dtype=bool, count=row_count)
+        return mask
 
 # --- Filter Proxy Model ---
-class PolygonFilterProxyModel(QSortFilterProxyModel):
+class PolygonFilterProxyModel(QAbstractProxyModel):
+    """
+    Filters on the source model's precomputed keys and keeps source order (sorting is delegated to the
+    source model's typed sort). A filter change computes an accept mask for all rows at once with NumPy
+    (date ranges through a sorted date index) and remaps the visible rows in a single layout change, so Qt
+    never calls back into Python once per source row; rows touched by an incremental update are checked one by one.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
         self.filter_uuid_text = ""
-        self.filter_after_date_added = None 
-        self.filter_before_date_added = None 
-        self.filter_export_status = "All" 
-        self.filter_error_status = "All"  
+        self.filter_after_date_added = None
+        self.filter_before_date_added = None
+        self.filter_export_status = "All"
+        self.filter_error_status = "All"
+        self._source_model = None
+        self._filters_active = False
+        self._accepted_mask = np.zeros(0, dtype=bool) # Accept mask over the source rows, kept in step with them
+        self._visible_rows = None  # Proxy row -> source row (ascending); None while no filter is active (identity mapping)
+        self._mask_filters = None  # Filter values _accepted_mask was computed for, so a tightened uuid filter only rechecks accepted rows
+        self._date_index = None    # (data_version, row order by date, sorted ordinals)
+        self._pending_layout = None # Proxy persistent indexes and their source indexes, held across a source layout change
+        self._removing_rows = False
+
+    def setSourceModel(self, source_model):
+        self.beginResetModel()
+        if self._source_model is not None:
+            for signal, slot in self._source_connections(self._source_model): signal.disconnect(slot)
+        self._source_model = source_model # Kept as a Python reference: sourceModel() is a wrapper call per cell
+        super().setSourceModel(source_model)
+        if source_model is not None:
+            for signal, slot in self._source_connections(source_model): signal.connect(slot)
+        self._remap_all()
+        self.endResetModel()
+
+    def _source_connections(self, source_model):
+        return [(source_model.modelAboutToBeReset, self.beginResetModel), (source_model.modelReset, self._on_source_reset),
+                (source_model.layoutAboutToBeChanged, self._on_source_layout_about_to_change),
+                (source_model.layoutChanged, self._on_source_layout_changed),
+                (source_model.rowsAboutToBeRemoved, self._on_source_rows_about_to_be_removed),
+                (source_model.rowsRemoved, self._on_source_rows_removed), (source_model.rowsInserted, self._on_source_rows_inserted),
+                (source_model.dataChanged, self._on_source_data_changed)]
 
     def set_uuid_filter(self, text):
         self.filter_uuid_text = text.lower()
-        self.invalidateFilter()
+        self._invalidate_filter_mask()
 
-    def set_date_added_filter(self, after_date, before_date): 
+    def set_date_added_filter(self, after_date, before_date):
         self.filter_after_date_added = after_date if after_date and after_date.isValid() else None
         self.filter_before_date_added = before_date if before_date and before_date.isValid() else None
-        self.invalidateFilter()
-        
-    def set_export_status_filter(self, status): 
+        self._invalidate_filter_mask()
+
+    def set_export_status_filter(self, status):
         self.filter_export_status = status
-        self.invalidateFilter()
+        self._invalidate_filter_mask()
 
-    def set_error_status_filter(self, status): 
+    def set_error_status_filter(self, status):
         self.filter_error_status = status
-        self.invalidateFilter()
-
-    def filterAcceptsRow(self, source_row, source_parent):
-        source_model = self.sourceModel()
-        if not source_model or source_row >= len(source_model._data): return False
-        record = source_model._data[source_row]
-        # Ensure record has enough elements for all checks.
-        # The record tuple from DB is (id, status, uuid, farmer, village, date_added, export_count, last_exported)
-        # These map to source_model columns 1-8 (0-7 in tuple)
-        if not record or len(record) < 8: # Check based on number of fields expected from DB
-            return False 
-
-        # UUID Filter (maps to record[2])
-        if self.filter_uuid_text:
-            uuid_val = str(record[2]).lower() 
-            if self.filter_uuid_text not in uuid_val: return False
-        
-        # Date Added Filter (maps to record[5])
-        date_added_str = record[5]
-        if date_added_str:
-            try:
-                row_date_added = QDate.fromString(date_added_str.split(" ")[0], "yyyy-MM-dd")
-                if row_date_added.isValid():
-                    if self.filter_after_date_added and row_date_added < self.filter_after_date_added: return False
-                    if self.filter_before_date_added and row_date_added > self.filter_before_date_added: return False
-            except Exception: pass 
-
-        # Export Status Filter (maps to record[6])
-        export_count = record[6] if record[6] is not None else 0
+        self._invalidate_filter_mask()
+
+    def set_filters(self, uuid_text, after_date, before_date, export_status, error_status):
+        """Sets every filter at once with a single re-filter pass."""
+        self.filter_uuid_text = uuid_text.lower()
+        self.filter_after_date_added = after_date if after_date and after_date.isValid() else None
+        self.filter_before_date_added = before_date if before_date and before_date.isValid() else None
+        self.filter_export_status, self.filter_error_status = export_status, error_status
+        self._invalidate_filter_mask()
+
+
+    def _date_range(self):
+        after = self.filter_after_date_added.toPython().toordinal() if self.filter_after_date_added else None
+        before = self.filter_before_date_added.toPython().toordinal() if self.filter_before_date_added else None
+        return after, before
+
+    def _current_filters(self):
+        return (self.filter_uuid_text, *self._date_range(), self.filter_export_status, self.filter_error_status)
+
+    def _invalidate_filter_mask(self):
+        self._filters_active = bool(self.filter_uuid_text or self.filter_after_date_added or self.filter_before_date_added
+                                    or self.filter_export_status != "All" or self.filter_error_status != "All")
+        if self._source_model is None: return
+        # One layout change for the whole re-filter: the persistent indexes (selection, current row) follow their source rows
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        source_rows = [self._source_row(index.row()) for index in old_persistent]
+        self._accepted_mask = self._filter_mask(self._source_model, narrow=True)
+        self._update_visible_rows()
+        self.changePersistentIndexList(old_persistent, [self._proxy_index(self._proxy_row(source_row), index.column())
+                                                        for source_row, index in zip(source_rows, old_persistent)])
+        self.layoutChanged.emit()
+
+    def _remap_all(self):
+        self._accepted_mask = self._filter_mask(self._source_model) if self._source_model is not None else np.zeros(0, dtype=bool)
+        self._update_visible_rows()
+
+    def _update_visible_rows(self):
+        self._visible_rows = np.flatnonzero(self._accepted_mask) if self._filters_active else None
+
+    @traced("ui.filter_mask")
+    def _filter_mask(self, source_model, narrow=False):
+        row_count = source_model.rowCount()
+        filters = self._current_filters()
+        previous, self._mask_filters = self._mask_filters, filters
+        if not self._filters_active: return np.ones(row_count, dtype=bool)
+        text = self.filter_uuid_text
+        if (narrow and previous is not None and previous[1:] == filters[1:] and previous[0] in text
+                and len(self._accepted_mask) == row_count):
+            # The uuid text only got longer (or is unchanged): only rows accepted so far can still match
+            candidates = np.flatnonzero(self._accepted_mask)
+            accepted = np.zeros(row_count, dtype=bool)
+            uuid_keys = source_model._uuid_keys
+            accepted[candidates] = np.fromiter((text in uuid_keys[row] for row in candidates.tolist()), dtype=bool, count=len(candidates))
+            return accepted
+        accepted = np.ones(row_count, dtype=bool)
+        if text:
+            accepted &= np.fromiter((text in uuid_key for uuid_key in source_model._uuid_keys), dtype=bool, count=row_count)
+        after, before = self._date_range()
+        if after is not None or before is not None:
+            if self._date_index is None or self._date_index[0] != source_model.data_version:
+                ordinals = np.fromiter(source_model._date_ordinals, dtype=np.int64, count=row_count)
+                order = np.argsort(ordinals, kind="stable")
+                self._date_index = (source_model.data_version, order, ordinals[order])
+            _, order, sorted_ordinals = self._date_index
+            first = np.searchsorted(sorted_ordinals, after if after is not None else 0, side="left") # -1 (no date) sorts first and is kept
+            last = np.searchsorted(sorted_ordinals, before, side="right") if before is not None else row_count
+            in_range = np.zeros(row_count, dtype=bool)
+            in_range[order[first:last]] = True
+            in_range[order[:np.searchsorted(sorted_ordinals, 0)]] = True # Rows without a valid date are not date-filtered
+            accepted &= in_range
+        if self.filter_export_status != "All":
+            exported = np.fromiter(source_model._export_counts, dtype=np.int64, count=row_count) > 0
+            accepted &= exported if self.filter_export_status == "Exported" else ~exported
+        if self.filter_error_status != "All":
+            errors = np.fromiter(source_model._error_flags, dtype=bool, count=row_count)
+            accepted &= errors if self.filter_error_status == "Error Records" else ~errors
+        return accepted
+
+    def accepted_source_mask(self):
+        """Bool mask over the source rows that pass the current filters (the proxy's own array: do not modify it)."""
+        return self._accepted_mask
+
+    def _row_passes(self, source_model, source_row):
+        if self.filter_uuid_text and self.filter_uuid_text not in source_model._uuid_keys[source_row]: return False
+        ordinal = source_model._date_ordinals[source_row]
+        if ordinal >= 0:
+            after, before = self._date_range()
+            if after is not None and ordinal < after: return False
+            if before is not None and ordinal > before: return False
+        export_count = source_model._export_counts[source_row]
         if self.filter_export_status == "Exported" and export_count == 0: return False
         if self.filter_export_status == "Not Exported" and export_count > 0: return False
-
-        # Error Status Filter (maps to record[1])
-        status_val = str(record[1]).lower()
-        if self.filter_error_status == "Error Records" and "error" not in status_val: return False
-        if self.filter_error_status == "Valid Records" and "error" in status_val: return False
-            
+        is_error = source_model._error_flags[source_row]
+        if self.filter_error_status == "Error Records" and not is_error: return False
+        if self.filter_error_status == "Valid Records" and is_error: return False
         return True
 
+    def _rows_pass(self, first, last):
+        if not self._filters_active: return np.ones(last - first + 1, dtype=bool)
+        return np.fromiter((self._row_passes(self._source_model, row) for row in range(first, last + 1)), dtype=bool, count=last - first + 1)
+
+    # Row mapping. Everything is answered from the proxy's own arrays, which only catch up with the source in
+    # the handlers below, so between a source begin/end pair the proxy still describes the old rows.
+    def _source_row(self, proxy_row):
+        return proxy_row if self._visible_rows is None else int(self._visible_rows[proxy_row])
+
+    def _proxy_position(self, source_row):
+        """Number of visible rows before source_row, i.e. the proxy row it has or would have."""
+        return source_row if self._visible_rows is None else int(np.searchsorted(self._visible_rows, source_row))
+
+    def _proxy_row(self, source_row):
+        """Proxy row of source_row, -1 if it is filtered out."""
+        if source_row < 0 or source_row >= len(self._accepted_mask) or not self._accepted_mask[source_row]: return -1
+        return self._proxy_position(source_row)
+
+    def _proxy_index(self, proxy_row, column):
+        return self.createIndex(proxy_row, column) if proxy_row >= 0 else QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid(): return 0
+        return len(self._accepted_mask) if self._visible_rows is None else len(self._visible_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return self._source_model.columnCount() if self._source_model is not None and not parent.isValid() else 0
+
+    def hasChildren(self, parent=QModelIndex()): return not parent.isValid() and self.rowCount() > 0
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < self.rowCount() or not 0 <= column < self.columnCount(): return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, child=None):
+        if child is None: return super().parent() # QObject.parent()
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self._source_model is None: return QModelIndex()
+        return self._source_model.index(self._source_row(proxy_index.row()), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid(): return QModelIndex()
+        return self._proxy_index(self._proxy_row(source_index.row()), source_index.column())
+
+    def data(self, index, role=_DISPLAY_ROLE):
+        row = index.row()
+        if row < 0 or row >= self.rowCount(): return None
+        return self._source_model.cell_data(self._source_row(row), index.column(), role)
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid(): return False
+        return self._source_model.setData(self.mapToSource(index), value, role)
+
+    def flags(self, index):
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        return self._source_model.flags(self.mapToSource(index))
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        return self._source_model.headerData(section, orientation, role) if self._source_model is not None else None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if self._source_model is not None: self._source_model.sort(column, order)
+
+    # Source model signals
+    def _on_source_reset(self):
+        self._remap_all()
+        self.endResetModel()
+
+    def _on_source_layout_about_to_change(self, *args):
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        self._pending_layout = (old_persistent, [QPersistentModelIndex(self.mapToSource(index)) for index in old_persistent])
+
+    def _on_source_layout_changed(self, *args):
+        self._remap_all()
+        old_persistent, source_indexes = self._pending_layout
+        self._pending_layout = None
+        self.changePersistentIndexList(old_persistent, [self._proxy_index(self._proxy_row(index.row()) if index.isValid() else -1, index.column())
+                                                        for index in source_indexes])
+        self.layoutChanged.emit()
+
+    def _on_source_rows_about_to_be_removed(self, parent, first, last):
+        proxy_first, proxy_last = self._proxy_position(first), self._proxy_position(last + 1) - 1
+        self._removing_rows = proxy_first <= proxy_last
+        if self._removing_rows: self.beginRemoveRows(QModelIndex(), proxy_first, proxy_last)
+
+    def _on_source_rows_removed(self, parent, first, last):
+        self._accepted_mask = np.delete(self._accepted_mask, np.s_[first:last + 1])
+        self._update_visible_rows()
+        if self._removing_rows: self.endRemoveRows()
+        self._removing_rows = False
+
+    def _on_source_rows_inserted(self, parent, first, last):
+        # The source has already inserted the rows, so they can be checked now and inserted in one block
+        accepted = self._rows_pass(first, last)
+        proxy_first, accepted_count = self._proxy_position(first), int(accepted.sum())
+        if accepted_count: self.beginInsertRows(QModelIndex(), proxy_first, proxy_first + accepted_count - 1)
+        self._accepted_mask = np.insert(self._accepted_mask, first, accepted)
+        self._update_visible_rows()
+        if accepted_count: self.endInsertRows()
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=()):
+        first, last = top_left.row(), bottom_right.row()
+        if self._filters_active and list(roles) != [_CHECK_STATE_ROLE]: # Check states never affect filtering
+            accepted = self._rows_pass(first, last)
+            was_accepted = self._accepted_mask[first:last + 1].copy()
+            for hidden_first, hidden_last in reversed(_contiguous_ranges((first + np.flatnonzero(was_accepted & ~accepted)).tolist())):
+                proxy_first = self._proxy_position(hidden_first)
+                self.beginRemoveRows(QModelIndex(), proxy_first, proxy_first + hidden_last - hidden_first)
+                self._accepted_mask[hidden_first:hidden_last + 1] = False
+                self._update_visible_rows()
+                self.endRemoveRows()
+            for shown_first, shown_last in _contiguous_ranges((first + np.flatnonzero(~was_accepted & accepted)).tolist()):
+                proxy_first = self._proxy_position(shown_first)
+                self.beginInsertRows(QModelIndex(), proxy_first, proxy_first + shown_last - shown_first)
+                self._accepted_mask[shown_first:shown_last + 1] = True
+                self._update_visible_rows()
+                self.endInsertRows()
+        proxy_first, proxy_last = self._proxy_position(first), self._proxy_position(last + 1) - 1
+        if proxy_first <= proxy_last:
+            self.dataChanged.emit(self.index(proxy_first, top_left.column()), self.index(proxy_last, bottom_right.column()), roles)
+
+
+# --- Background Startup Load ---
+class DatabaseLoadThread(QThread):
+    """
+    Opens the database (creating and attaching its tables) and streams the table rows in pages, so the
+    window can paint before a large database has been read. Uses its own connection, closed when done.
+    """
+    database_ready = Signal()
+    page_loaded = Signal(list)
+    load_finished = Signal(int, str) # rows loaded, error message ("" on success)
+
+    def __init__(self, include_archive=False, parent=None):
+        super().__init__(parent)
+        self.include_archive = include_archive
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        loaded, error = 0, ""
+        try:
+            db_manager = DatabaseManager()
+            try:
+                self.database_ready.emit()
+                for page in db_manager.iter_polygon_data_for_display(self.include_archive, INITIAL_LOAD_FIRST_PAGE_ROWS, INITIAL_LOAD_PAGE_ROWS):
+                    if self._cancelled: break
+                    self.page_loaded.emit(page)
+                    loaded += len(page)
+            finally:
+                db_manager.close()
+        except Exception as e:
+            error = str(e)
+        self.load_finished.emit(loaded, error)
+
+# --- Background KML Import ---
+class KMLImportThread(QThread):
+    """Streams a KML/KMZ file into polygon_data in batches off the GUI thread, on its own DB connection."""
+    progress = Signal(int) # placemarks read so far
+    import_finished = Signal(int, int, int, bool, str) # imported, skipped (already in DB), with errors, cancelled, error message ("" on success)
+
+    def __init__(self, db_manager, kml_path, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager # Only used to open the thread's own connection
+        self.kml_path = kml_path
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        new, skip, err, error = 0, 0, 0, ""
+        try:
+            db_manager = self.db_manager.open_for_worker_thread()
+            try:
+                # Streamed in batches: placemarks are parsed, converted to UTM and bulk inserted without loading the whole file
+                for records in iter_kml_polygon_records(self.kml_path):
+                    if self._is_cancelled: break
+                    err += sum(1 for r in records if r["status"] != "valid_for_kml")
+                    inserted, skipped = db_manager.bulk_add_polygon_data(records); new += inserted; skip += skipped
+                    self.progress.emit(new + skip)
+            finally:
+                db_manager.close()
+        except Exception as e:
+            error = str(e)
+        self.import_finished.emit(new, skip, err, self._is_cancelled, error)
+
+# --- Background KML Export ---
+class KMLExportThread(QThread):
+    """Fetches the records and runs the process-pool "multiple files" KML export off the GUI thread."""
+    progress = Signal(int, int) # done, total
+    export_finished = Signal(list, bool) # [(record_id, output_path, error_message), ...], cancelled
+
+    def __init__(self, db_manager, record_ids, output_folder, kmz, coordinate_precision, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager # Only used to open the thread's own connection
+        self.record_ids = record_ids
+        self.output_folder = output_folder
+        self.kmz = kmz
+        self.coordinate_precision = coordinate_precision
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        try:
+            db_manager = self.db_manager.open_for_worker_thread()
+            try: records = list(db_manager.iter_polygon_data_by_ids(self.record_ids))
+            finally: db_manager.close()
+            # The engine keeps the results of files already written even if its process pool fails
+            results, cancelled = export_kml_files_parallel(
+                records, self.output_folder, self.kmz, self.coordinate_precision,
+                progress_callback=self.progress.emit, cancel_check=lambda: self._is_cancelled)
+        except Exception as e: # Reading the records failed, so nothing was written
+            results, cancelled = [(record_id, None, f"Export engine error: {e}") for record_id in self.record_ids], False
+        self.export_finished.emit(results, cancelled)
+
+class TableExportThread(QThread):
+    """Writes a snapshot of the displayed table with one of the TABLE_EXPORT_FORMATS exporters off the GUI thread."""
+    progress = Signal(int, int) # done, total
+    export_finished = Signal(int, str, bool) # rows written, error message ("" on success), cancelled
+
+    def __init__(self, exporter, headers, columns, row_indexes, output_path, exporter_options=None, parent=None):
+        super().__init__(parent)
+        self.exporter = exporter
+        self.headers = headers
+        self.columns = columns
+        self.row_indexes = row_indexes
+        self.output_path = output_path
+        self.exporter_options = exporter_options or {}
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        total = len(self.row_indexes)
+        try:
+            written = self.exporter(self.headers, self.columns, self.row_indexes, self.output_path,
+                                    progress_callback=lambda done: self.progress.emit(done, total),
+                                    cancel_check=lambda: self._is_cancelled, **self.exporter_options)
+            self.export_finished.emit(written, "", False)
+        except TableExportCancelled:
+            if os.path.exists(self.output_path): os.remove(self.output_path)
+            self.export_finished.emit(0, "", True)
+        except Exception as e:
+            self.export_finished.emit(0, str(e), False)
+
+class GISExportThread(QThread):
+    """Streams records from the DB into one of the GIS_EXPORT_FORMATS exporters off the GUI thread, on its own DB connection."""
+    progress = Signal(int, int) # done, total
+    export_finished = Signal(int, str, bool) # features written, error message ("" on success), cancelled
+
+    def __init__(self, db_manager, exporter, record_ids, output_path, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager # Only used to open the thread's own connection
+        self.exporter = exporter
+        self.record_ids = record_ids
+        self.output_path = output_path
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        total = len(self.record_ids)
+        try:
+            db_manager = self.db_manager.open_for_worker_thread()
+            try:
+                written = self.exporter(db_manager.iter_polygon_data_by_ids(self.record_ids), self.output_path,
+                                        progress_callback=lambda done: self.progress.emit(done, total),
+                                        cancel_check=lambda: self._is_cancelled)
+            finally:
+                db_manager.close()
+            self.export_finished.emit(written, "", False)
+        except Exception as e:
+            if os.path.exists(self.output_path): os.remove(self.output_path) # Never leave a partial file behind
+            if isinstance(e, GISExportCancelled) or self._is_cancelled: self.export_finished.emit(0, "", True)
+            else: self.export_finished.emit(0, str(e), False)
+
+class MapLayerThread(QThread):
+    """
+    Reads and converts the lon/lat rings for the map's records layer off the GUI thread, on its own DB connection.
+    Rings are cached per record id together with the record's last_modified stamp, so after a reload only
+    records whose points may have changed are read and converted again.
+    """
+    layer_finished = Signal(object, object, object, str) # ids with a valid polygon, their rings, the updated ring cache (None: cancelled or failed), error
+
+    def __init__(self, db_manager, ids, ring_cache, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager # Only used to open the thread's own connection
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.ring_cache = ring_cache # (sorted ids, last_modified stamps, rings); only read here, never modified
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        try:
+            db_manager = self.db_manager.open_for_worker_thread()
+            try: result = self._load_rings(db_manager)
+            finally: db_manager.close()
+        except Exception as e:
+            self.layer_finished.emit(None, None, None, str(e)); return
+        if result is None: self.layer_finished.emit(None, None, None, ""); return
+        self.layer_finished.emit(*result, "")
+
+    def _load_rings(self, db_manager):
+        unique_ids = np.unique(self.ids)
+        stamp_by_id = {}
+        for record in db_manager.iter_polygon_data_by_ids(unique_ids.tolist(), columns=["id", "last_modified"]):
+            if self._is_cancelled: return None
+            stamp_by_id[record["id"]] = record["last_modified"] or ""
+        stamps = np.array([stamp_by_id.get(db_id, "") for db_id in unique_ids.tolist()], dtype=object)
+        cached_ids, cached_stamps, cached_rings = self.ring_cache
+        positions = np.minimum(np.searchsorted(cached_ids, unique_ids), max(len(cached_ids) - 1, 0))
+        fresh = (cached_ids[positions] == unique_ids) & (cached_stamps[positions] == stamps) if len(cached_ids) else np.zeros(len(unique_ids), dtype=bool)
+        stale = unique_ids[~fresh]
+        stale_rings = np.full((len(stale), 5, 2), np.nan)
+        for start in range(0, len(stale), MAP_LAYER_CHUNK_SIZE):
+            if self._is_cancelled: return None
+            records = list(db_manager.iter_polygon_data_by_ids(stale[start:start + MAP_LAYER_CHUNK_SIZE].tolist(), columns=MAP_LAYER_POINT_COLUMNS))
+            if not records: continue
+            rings, valid = records_to_lonlat_rings(records)
+            record_positions = np.searchsorted(stale, [record["id"] for record in records])
+            stale_rings[record_positions[valid]] = rings[valid]
+        # Replace the stale entries (including older versions of the same ids) and keep the cache sorted by id
+        keep = ~np.isin(cached_ids, stale)
+        all_ids = np.concatenate([cached_ids[keep], stale])
+        order = np.argsort(all_ids, kind="stable")
+        ring_cache = (all_ids[order], np.concatenate([cached_stamps[keep], stamps[~fresh]])[order], np.concatenate([cached_rings[keep], stale_rings])[order])
+        rings = ring_cache[2][np.searchsorted(ring_cache[0], self.ids)]
+        has_polygon = ~np.isnan(rings[:, 0, 0])
+        return self.ids[has_polygon], rings[has_polygon], ring_cache
+
+class TileSeedThread(QThread):
+    """Downloads basemap tiles for a set of bboxes into the tile cache off the GUI thread."""
+    progress = Signal(int, int) # done, total
+    seed_finished = Signal(int, int, int, bool, str) # downloaded, already cached, failed, cancelled, error message
+
+    def __init__(self, cache_path, bboxes, zoom_min, zoom_max, parent=None):
+        super().__init__(parent)
+        self.cache_path = cache_path
+        self.bboxes = bboxes
+        self.zoom_min, self.zoom_max = zoom_min, zoom_max
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def run(self):
+        cache = None
+        try:
+            cache = TileCache(self.cache_path) # Own connection: sqlite3 connections stay on the thread that opened them
+            downloaded, cached, failed = seed_tiles(cache, self.bboxes, self.zoom_min, self.zoom_max,
+                                                    progress_callback=self.progress.emit, cancel_check=lambda: self._is_cancelled)
+            self.seed_finished.emit(downloaded, cached, failed, self._is_cancelled, "")
+        except Exception as e:
+            self.seed_finished.emit(0, 0, 0, False, str(e))
+        finally:
+            if cache: cache.close()
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -208,9 +912,12 @@ class MainWindow(QMainWindow):
         self.app_icon_path = resource_path(APP_ICON_FILE_NAME_MW) 
         if os.path.exists(self.app_icon_path): self.setWindowIcon(QIcon(self.app_icon_path))
         else: print(f"Warning: Main window icon '{self.app_icon_path}' not found.")
-        try: self.db_manager = DatabaseManager()
-        except Exception as e: QMessageBox.critical(self, "DB Error", f"DB init failed: {e}\nExiting."); sys.exit(1) 
+        self.startup_timer = QElapsedTimer(); self.startup_timer.start()
+        # The DB is opened and read by DatabaseLoadThread once the window is up; until then db_manager is None
+        self.db_manager = None
+        self.db_path = DatabaseManager.resolve_db_path()
         
+        self.tile_cache_path = os.path.join(os.path.dirname(self.db_path), TILE_CACHE_FILE_NAME)
         self.resize(1200, 800); self._center_window() 
         self._create_main_layout()
         self._create_header() 
@@ -221,9 +928,59 @@ class MainWindow(QMainWindow):
         self.session_duplicate_choice = "skip" 
 
         self._setup_main_content_area() 
-        self.load_data_into_table() 
         
-        self.log_message(f"{APP_NAME_MW} {APP_VERSION_MW} started. DB at: {self.db_manager.db_path}", "info")
+        self.log_message(f"{APP_NAME_MW} {APP_VERSION_MW} started. DB at: {self.db_path}", "info")
+        self._set_loading_state(True)
+        QTimer.singleShot(0, self.start_initial_load) # After the first paint
+        self.stall_watchdog = StallWatchdog(stall_threshold_from_environment(), os.path.join(os.path.dirname(self.db_path), "logs", STALL_LOG_FILE_NAME), self)
+        self.stall_watchdog.stall_detected.connect(self._on_ui_stall)
+        QTimer.singleShot(0, self.stall_watchdog.start) # Once the event loop runs
+
+
+    def _set_loading_state(self, loading):
+        """While the database loads, everything that needs it is disabled; the table and filters stay usable."""
+        self.menuBar().setEnabled(not loading); self.toolbar.setEnabled(not loading)
+        self.include_archive_checkbox.setEnabled(not loading)
+        self.table_loading_label.setVisible(loading)
+        if loading: self._set_database_widgets_enabled(False) # Re-enabled by _on_database_ready, while the rows are still streaming in
+
+    def _set_database_widgets_enabled(self, enabled):
+        """Table widgets that read from the database: row selection (the map preview), the map layer and Check by Query."""
+        self.table_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection if enabled else QAbstractItemView.SelectionMode.NoSelection)
+        self.map_layer_combo.setEnabled(enabled); self.check_by_query_button.setEnabled(enabled)
+
+    def start_initial_load(self):
+        self.statusBar.showMessage("Opening database...")
+        self.initial_load_thread = DatabaseLoadThread(self.include_archive_checkbox.isChecked(), self)
+        self.initial_load_thread.database_ready.connect(self._on_database_ready)
+        self.initial_load_thread.page_loaded.connect(self._on_initial_page_loaded)
+        self.initial_load_thread.load_finished.connect(self._on_initial_load_finished)
+        self.initial_load_thread.start()
+
+    def _on_database_ready(self):
+        # Tables exist now, so opening the GUI thread's own connection is quick
+        try: self.db_manager = DatabaseManager()
+        except Exception as e:
+            self.initial_load_thread.cancel()
+            QMessageBox.critical(self, "DB Error", f"DB init failed: {e}\nExiting."); QApplication.exit(1); return
+        self.refresh_api_source_dropdown()
+        self._set_database_widgets_enabled(True)
+        self.log_message(f"Database opened in {self.startup_timer.elapsed()} ms.", "info", detail=True)
+
+    def _on_initial_page_loaded(self, rows):
+        first_page = not self.source_model.rowCount()
+        self.source_model.append_rows(rows)
+        self.table_loading_label.setText(f"Loading records... {self.source_model.rowCount()} loaded")
+        if first_page: self.log_message(f"First {len(rows)} record(s) shown {self.startup_timer.elapsed()} ms after start.", "info", detail=True)
+
+    def _on_initial_load_finished(self, loaded, error):
+        if self.db_manager is None:
+            QMessageBox.critical(self, "DB Error", f"DB init failed: {error}\nExiting."); QApplication.exit(1); return
+        self._set_loading_state(False)
+        if error: # The database opened but reading the rows failed part way: the table is incomplete
+            self.log_message(f"Loading records stopped after {loaded} record(s): {error}. The table is incomplete.", "error")
+            QMessageBox.warning(self, "DB Error", f"Loading records stopped after {loaded} record(s):\n{error}\n\nThe table is incomplete."); return
+        self.log_message(f"Loaded {loaded} record(s); ready {self.startup_timer.elapsed()} ms after start (time to interactive).", "info")
 
 
     def _center_window(self):
@@ -264,9 +1021,12 @@ class MainWindow(QMainWindow):
     def _create_menus_and_toolbar(self): 
         menubar = self.menuBar()
         file_menu = menubar.addMenu("&File")
-        self.export_data_action = QAction(QIcon.fromTheme("document-save-as", QIcon(self.app_icon_path)), "Export Displayed Data as &CSV...", self)
-        self.export_data_action.triggered.connect(self.handle_export_displayed_data_csv)
+        self.export_data_action = QAction(QIcon.fromTheme("document-save-as", QIcon(self.app_icon_path)), "Export &Displayed Data...", self)
+        self.export_data_action.triggered.connect(self.handle_export_displayed_data)
         file_menu.addAction(self.export_data_action)
+        self.export_gis_action = QAction(QIcon.fromTheme("document-save-as"), "Export Checked Rows as &GIS Data...", self)
+        self.export_gis_action.triggered.connect(self.handle_export_gis_data)
+        file_menu.addAction(self.export_gis_action)
         file_menu.addSeparator()
         exit_action = QAction(QIcon.fromTheme("application-exit"), "E&xit", self) 
         exit_action.setShortcut("Ctrl+Q"); exit_action.setStatusTip("Exit application")
@@ -276,6 +1036,9 @@ class MainWindow(QMainWindow):
         self.import_csv_action = QAction(QIcon.fromTheme("document-open"),"Import &CSV...", self)
         self.import_csv_action.triggered.connect(self.handle_import_csv)
         data_menu.addAction(self.import_csv_action)
+        self.import_kml_action = QAction(QIcon.fromTheme("document-open"),"Import &KML/KMZ...", self)
+        self.import_kml_action.triggered.connect(self.handle_import_kml)
+        data_menu.addAction(self.import_kml_action)
         
         self.fetch_api_action = QAction(QIcon.fromTheme("network-transmit-receive"), "&Fetch from API...", self) 
         self.fetch_api_action.triggered.connect(self.handle_fetch_from_api)
@@ -291,11 +1054,18 @@ class MainWindow(QMainWindow):
         self.clear_all_data_action = QAction(QIcon.fromTheme("edit-clear-all"),"Clear All Polygon Data...", self)
         self.clear_all_data_action.triggered.connect(self.handle_clear_all_data) 
         data_menu.addAction(self.clear_all_data_action)
+        data_menu.addSeparator()
+        self.archive_records_action = QAction(QIcon.fromTheme("folder"),"&Archive Old Exported Records...", self)
+        self.archive_records_action.triggered.connect(self.handle_archive_records)
+        data_menu.addAction(self.archive_records_action)
 
         kml_menu = menubar.addMenu("&KML")
         self.generate_kml_action = QAction(QIcon.fromTheme("document-export"),"&Generate KML for Checked Rows...", self) 
         self.generate_kml_action.triggered.connect(self.handle_generate_kml) 
         kml_menu.addAction(self.generate_kml_action)
+        self.export_changes_kml_action = QAction(QIcon.fromTheme("view-refresh"),"Export &Changes Since Last Export...", self)
+        self.export_changes_kml_action.triggered.connect(self.handle_export_changed_kml)
+        kml_menu.addAction(self.export_changes_kml_action)
 
         help_menu = menubar.addMenu("&Help"); 
         self.about_action = QAction(QIcon.fromTheme("help-about"),"&About", self)
@@ -303,6 +1073,37 @@ class MainWindow(QMainWindow):
         help_menu.addAction(self.about_action)
 
         tools_menu = self.menuBar().addMenu("&Tools")
+        self.seed_tiles_action = QAction(QIcon.fromTheme("folder-download"), "Pre-seed &Map Tiles for Checked Rows...", self)
+        self.seed_tiles_action.setStatusTip("Download basemap tiles around the checked polygons so the map works offline")
+        self.seed_tiles_action.triggered.connect(self.handle_seed_map_tiles)
+        tools_menu.addAction(self.seed_tiles_action)
+        tools_menu.addSeparator()
+        diagnostics_menu = tools_menu.addMenu("&Diagnostics")
+        self.tracing_action = QAction("Record Performance &Trace", self, checkable=True)
+        self.tracing_action.setStatusTip("Time import, database, KML and table stages (also enabled by the DILASA_TRACE environment variable)")
+        self.tracing_action.setChecked(tracer.enabled)
+        self.tracing_action.toggled.connect(self.handle_toggle_tracing)
+        diagnostics_menu.addAction(self.tracing_action)
+        stalls_action = QAction("Show &UI Stalls...", self)
+        stalls_action.setStatusTip("Times the window stopped responding, and what it was doing")
+        stalls_action.triggered.connect(lambda: self.handle_show_diagnostics(0))
+        diagnostics_menu.addAction(stalls_action)
+        diagnostics_menu.addSeparator()
+        trace_summary_action = QAction("Show Trace &Summary...", self)
+        trace_summary_action.triggered.connect(self.handle_show_trace_summary)
+        diagnostics_menu.addAction(trace_summary_action)
+        export_trace_action = QAction("&Export Trace (Chrome/Perfetto JSON)...", self)
+        export_trace_action.triggered.connect(self.handle_export_trace)
+        diagnostics_menu.addAction(export_trace_action)
+        reset_trace_action = QAction("&Reset Trace", self)
+        reset_trace_action.triggered.connect(lambda: (tracer.reset(), self.log_message("Performance trace cleared.", "info")))
+        diagnostics_menu.addAction(reset_trace_action)
+        diagnostics_menu.addSeparator()
+        self.profile_action = QAction("&Profile GUI Thread (cProfile)", self, checkable=True)
+        self.profile_action.setStatusTip("Profile everything the GUI thread runs until unchecked, then save the .prof file")
+        self.profile_action.setChecked(tracer.profiling)
+        self.profile_action.toggled.connect(self.handle_toggle_profiling)
+        diagnostics_menu.addAction(self.profile_action)
         #self.build_historical_maps_action = QAction(QIcon.fromTheme("document-import"), "Build Historical Imagery Cache...", self)
         #self.build_historical_maps_action.triggered.connect(self.handle_build_historical_maps)
         #tools_menu.addAction(self.build_historical_maps_action)
@@ -343,6 +1144,10 @@ class MainWindow(QMainWindow):
         self.filter_groupbox.setCheckable(True)
         self.filter_groupbox.setChecked(False) 
 
+        # Filter input is debounced: typing restarts the timer and the table re-filters once input pauses
+        self.filter_debounce_timer = QTimer(self); self.filter_debounce_timer.setSingleShot(True)
+        self.filter_debounce_timer.setInterval(FILTER_DEBOUNCE_MS); self.filter_debounce_timer.timeout.connect(self.apply_filters)
+
         self.filter_widgets_container = QWidget() 
         filter_layout = QGridLayout(self.filter_widgets_container)
         filter_layout.setContentsMargins(5,5,5,5) 
@@ -350,31 +1155,36 @@ class MainWindow(QMainWindow):
         
         filter_layout.addWidget(QLabel("Filter UUID:"), 0, 0)
         self.uuid_filter_edit = QLineEdit(); self.uuid_filter_edit.setPlaceholderText("Contains...")
-        self.uuid_filter_edit.textChanged.connect(self.apply_filters)
+        self.uuid_filter_edit.textChanged.connect(self.schedule_filter_update)
         filter_layout.addWidget(self.uuid_filter_edit, 0, 1, 1, 3) 
 
         filter_layout.addWidget(QLabel("Date Added After:"), 1, 0)
         self.date_added_after_edit = QDateEdit(); self.date_added_after_edit.setCalendarPopup(True)
         self.date_added_after_edit.setDisplayFormat("yyyy-MM-dd"); self.date_added_after_edit.clear() 
-        self.date_added_after_edit.setSpecialValueText(" "); self.date_added_after_edit.dateChanged.connect(self.apply_filters)
+        self.date_added_after_edit.setSpecialValueText(" "); self.date_added_after_edit.dateChanged.connect(self.schedule_filter_update)
         filter_layout.addWidget(self.date_added_after_edit, 1, 1)
 
         filter_layout.addWidget(QLabel("Before:"), 1, 2)
         self.date_added_before_edit = QDateEdit(); self.date_added_before_edit.setCalendarPopup(True)
         self.date_added_before_edit.setDisplayFormat("yyyy-MM-dd"); self.date_added_before_edit.clear()
-        self.date_added_before_edit.setSpecialValueText(" "); self.date_added_before_edit.dateChanged.connect(self.apply_filters)
+        self.date_added_before_edit.setSpecialValueText(" "); self.date_added_before_edit.dateChanged.connect(self.schedule_filter_update)
         filter_layout.addWidget(self.date_added_before_edit, 1, 3)
 
         filter_layout.addWidget(QLabel("Export Status:"), 2, 0)
         self.export_status_combo = QComboBox(); self.export_status_combo.addItems(["All", "Exported", "Not Exported"])
-        self.export_status_combo.currentIndexChanged.connect(self.apply_filters)
+        self.export_status_combo.currentIndexChanged.connect(self.schedule_filter_update)
         filter_layout.addWidget(self.export_status_combo, 2, 1)
 
         filter_layout.addWidget(QLabel("Record Status:"), 2, 2)
         self.error_status_combo = QComboBox(); self.error_status_combo.addItems(["All", "Valid Records", "Error Records"])
-        self.error_status_combo.currentIndexChanged.connect(self.apply_filters)
+        self.error_status_combo.currentIndexChanged.connect(self.schedule_filter_update)
         filter_layout.addWidget(self.error_status_combo, 2, 3)
 
+        self.include_archive_checkbox = QCheckBox("Include Archived Records")
+        self.include_archive_checkbox.setToolTip("Also show records moved to the archive database (slower on large archives)")
+        self.include_archive_checkbox.toggled.connect(self.load_data_into_table)
+        filter_layout.addWidget(self.include_archive_checkbox, 3, 0, 1, 2)
+
         clear_filters_button = QPushButton("Clear Filters")
         clear_filters_button.clicked.connect(self.clear_filters)
         filter_layout.addWidget(clear_filters_button, 0, 4, Qt.AlignmentFlag.AlignRight) 
@@ -391,16 +1201,15 @@ class MainWindow(QMainWindow):
         return self.filter_groupbox
 
 
+    def schedule_filter_update(self, *args):
+        self.filter_debounce_timer.start()
+
     def apply_filters(self):
         if not hasattr(self, 'filter_proxy_model'): return
-        self.filter_proxy_model.set_uuid_filter(self.uuid_filter_edit.text())
-        
         after_date = self.date_added_after_edit.date() if self.date_added_after_edit.text().strip() and self.date_added_after_edit.date().isValid() else None
         before_date = self.date_added_before_edit.date() if self.date_added_before_edit.text().strip() and self.date_added_before_edit.date().isValid() else None
-        self.filter_proxy_model.set_date_added_filter(after_date, before_date)
-        
-        self.filter_proxy_model.set_export_status_filter(self.export_status_combo.currentText())
-        self.filter_proxy_model.set_error_status_filter(self.error_status_combo.currentText())
+        self.filter_proxy_model.set_filters(self.uuid_filter_edit.text(), after_date, before_date,
+                                            self.export_status_combo.currentText(), self.error_status_combo.currentText())
 
 
     def clear_filters(self):
@@ -409,11 +1218,11 @@ class MainWindow(QMainWindow):
         self.date_added_before_edit.clear(); self.date_added_before_edit.setSpecialValueText(" ")      
         self.export_status_combo.setCurrentIndex(0) 
         self.error_status_combo.setCurrentIndex(0)  
-        # apply_filters will be called by the signals from setDate/setCurrentIndex/clear
+        # apply_filters will be called (debounced) by the signals from setDate/setCurrentIndex/clear
 
     def _setup_main_content_area(self):
         self.main_splitter = QSplitter(Qt.Orientation.Horizontal) 
-        self.map_view_widget = MapViewWidget(self) 
+        self.map_view_widget = MapViewWidget(self, tile_cache_path=self.tile_cache_path) 
         self.map_view_widget.setMinimumWidth(300) 
         self.main_splitter.addWidget(self.map_view_widget)
 
@@ -434,8 +1243,20 @@ class MainWindow(QMainWindow):
         self.select_all_checkbox = QCheckBox("Select/Deselect All")
         self.select_all_checkbox.stateChanged.connect(self.toggle_all_checkboxes)
         checkbox_header_layout.addWidget(self.select_all_checkbox)
+        self.check_visible_button = QPushButton("Check Visible"); self.check_visible_button.setToolTip("Check every row that passes the current filters")
+        self.check_visible_button.clicked.connect(self.check_visible_rows); checkbox_header_layout.addWidget(self.check_visible_button)
+        self.invert_checks_button = QPushButton("Invert Checks"); self.invert_checks_button.setToolTip("Invert the check state of the rows that pass the current filters")
+        self.invert_checks_button.clicked.connect(self.invert_visible_checks); checkbox_header_layout.addWidget(self.invert_checks_button)
+        self.check_by_query_button = QPushButton("Check by Query..."); self.check_by_query_button.setToolTip("Check every record matching a status or export state")
+        self.check_by_query_button.clicked.connect(self.check_rows_by_query); checkbox_header_layout.addWidget(self.check_by_query_button)
         checkbox_header_layout.addStretch()
+        checkbox_header_layout.addWidget(QLabel("Show on Map:"))
+        self.map_layer_combo = QComboBox(); self.map_layer_combo.addItems(MAP_LAYER_MODES)
+        self.map_layer_combo.setToolTip("Draw every checked or filtered record on the map, not just the selected one")
+        self.map_layer_combo.currentIndexChanged.connect(lambda: self.update_map_layer(fit=True)); checkbox_header_layout.addWidget(self.map_layer_combo)
         table_layout.addLayout(checkbox_header_layout)
+        self.table_loading_label = QLabel("Loading records..."); self.table_loading_label.setStyleSheet(f"color: {INFO_COLOR_MW};")
+        table_layout.addWidget(self.table_loading_label)
         
         self.table_view = QTableView()
         self.source_model = PolygonTableModel(); 
@@ -469,18 +1290,21 @@ class MainWindow(QMainWindow):
 
         table_layout.addWidget(self.table_view) 
         self.right_splitter.addWidget(table_container)
+        self.map_selection_timer = QTimer(self); self.map_selection_timer.setSingleShot(True)
+        self.map_selection_timer.setInterval(MAP_SELECTION_DEBOUNCE_MS); self.map_selection_timer.timeout.connect(self.update_map_for_selection)
         self.table_view.selectionModel().selectionChanged.connect(self.on_table_selection_changed)
-
-        log_container = QWidget()
-        log_layout = QVBoxLayout(log_container)
-        log_layout.setContentsMargins(0,10,0,0) 
-        log_label = QLabel("Status and Logs:")
-        log_layout.addWidget(log_label)
-        self.log_text_edit_qt_actual = QTextEdit() 
-        self.log_text_edit_qt_actual.setReadOnly(True)
-        self.log_text_edit_qt_actual.setFont(QFont("Segoe UI", 9))
-        log_layout.addWidget(self.log_text_edit_qt_actual) 
-        self.right_splitter.addWidget(log_container)
+        self._map_layer_rings = EMPTY_RING_CACHE # Sorted record ids, their last_modified stamps and lon/lat rings (NaN: no valid polygon)
+        self.map_layer_thread = None; self._map_layer_pending = None # fit flag of an update requested while a load is running
+        self.map_layer_timer = QTimer(self); self.map_layer_timer.setSingleShot(True)
+        self.map_layer_timer.setInterval(MAP_LAYER_DEBOUNCE_MS); self.map_layer_timer.timeout.connect(self.update_map_layer)
+        for signal in (self.filter_proxy_model.modelReset, self.filter_proxy_model.layoutChanged, self.filter_proxy_model.rowsInserted,
+                       self.filter_proxy_model.rowsRemoved, self.source_model.checkStatesChanged, self.source_model.dataChanged):
+            signal.connect(self.schedule_map_layer_update)
+
+        self.log_panel = LogPanel({"info": INFO_COLOR_MW, "error": ERROR_COLOR_MW, "success": SUCCESS_COLOR_MW}, FG_COLOR_MW,
+                                  os.path.join(os.path.dirname(self.db_path), "logs", LOG_FILE_NAME_MW))
+        self.log_panel.flushed.connect(lambda message, level: self.statusBar.showMessage(message, 7000 if level == "info" else 10000) if hasattr(self, 'statusBar') else None)
+        self.right_splitter.addWidget(self.log_panel)
         
         # Set stretch factors for the vertical splitter
         self.right_splitter.setStretchFactor(0, 3) # Table container gets more space
@@ -502,7 +1326,28 @@ class MainWindow(QMainWindow):
         check_state = Qt.CheckState(state_int)
         self.source_model.set_all_checkboxes(check_state)
 
+    def check_visible_rows(self):
+        self.source_model.set_rows_checked(self.filter_proxy_model.accepted_source_mask())
+        self.log_message(f"{self.source_model.checked_count()} record(s) checked.", "info")
+
+    def invert_visible_checks(self):
+        self.source_model.invert_checkboxes(self.filter_proxy_model.accepted_source_mask())
+        self.log_message(f"{self.source_model.checked_count()} record(s) checked.", "info")
+
+    def check_rows_by_query(self):
+        queries = {"Not exported": {"exported": False}, "Exported": {"exported": True},
+                   "Error records": {"errors": True}, "Valid records": {"errors": False}}
+        queries.update({f"Status: {status}": {"status": status} for status in self.source_model.statuses()})
+        query, ok = QInputDialog.getItem(self, "Check by Query", "Check all records that are:", list(queries), 0, False)
+        if not ok: return
+        matching = self.source_model.rows_matching(**queries[query])
+        self.source_model.set_rows_checked(matching)
+        self.log_message(f"Checked {int(matching.sum())} record(s) matching '{query}'; {self.source_model.checked_count()} checked in total.", "info")
+
     def on_table_selection_changed(self, selected, deselected):
+        self.map_selection_timer.start()
+
+    def update_map_for_selection(self):
         selected_proxy_indexes = self.table_view.selectionModel().selectedRows()
         if not selected_proxy_indexes:
             if hasattr(self, 'map_view_widget'): self.map_view_widget.clear_map(); return
@@ -529,8 +1374,37 @@ class MainWindow(QMainWindow):
         except (ValueError, TypeError): self.log_message(f"Map: Invalid ID for selected row.","error"); self.map_view_widget.clear_map()
         except Exception as e: self.log_message(f"Map: Update error: {e}","error"); self.map_view_widget.clear_map()
 
+    def schedule_map_layer_update(self, *args):
+        if self.map_layer_combo.currentIndex() > 0: self.map_layer_timer.start()
+
+    @traced("ui.map_layer")
+    def update_map_layer(self, fit=False):
+        """Shows the checked or filtered records as the map's records layer (or removes it in selected-record mode)."""
+        self.map_layer_timer.stop()
+        mode = self.map_layer_combo.currentText()
+        if mode == "Selected Record": self.map_view_widget.clear_records_layer(); return
+        if self.map_layer_thread: # One load at a time: the latest request runs when the current one finishes
+            self._map_layer_pending = bool(self._map_layer_pending) or fit; return
+        if mode == "Checked Records": ids = self.source_model.get_checked_item_db_ids()
+        else: ids = self.source_model.record_ids(self.filter_proxy_model.accepted_source_mask())
+        self.map_layer_thread = MapLayerThread(self.db_manager, ids, self._map_layer_rings, self)
+        self.map_layer_thread.layer_finished.connect(lambda ids, rings, ring_cache, error: self._on_map_layer_loaded(ids, rings, ring_cache, error, fit, mode))
+        self.map_layer_thread.start()
+
+    def _on_map_layer_loaded(self, ids, rings, ring_cache, error, fit, mode):
+        self.map_layer_thread.wait(); self.map_layer_thread.deleteLater(); self.map_layer_thread = None # run() returns right after emitting
+        if error: self.log_message(f"Map: Could not load polygons for the map layer: {error}", "error")
+        elif ring_cache is not None:
+            self._map_layer_rings = ring_cache
+            if self._map_layer_pending is None and self.map_layer_combo.currentText() == mode: # Skip a layer that is already outdated
+                self.map_view_widget.set_records_layer(ids, rings, fit=fit and len(ids) > 0)
+                if fit: self.log_message(f"Map: Showing {len(ids)} {mode.lower()} with valid polygons.", "info")
+        if self._map_layer_pending is not None:
+            pending_fit, self._map_layer_pending = self._map_layer_pending, None
+            self.update_map_layer(fit=pending_fit)
+
     def refresh_api_source_dropdown(self):
-        if hasattr(self, 'api_source_combo_toolbar'):
+        if hasattr(self, 'api_source_combo_toolbar') and self.db_manager:
             current_text = self.api_source_combo_toolbar.currentText()
             self.api_source_combo_toolbar.clear()
             sources = self.db_manager.get_mwater_sources()
@@ -552,16 +1426,44 @@ class MainWindow(QMainWindow):
                 self._process_imported_data(list(reader), f"CSV '{os.path.basename(filepath)}'") 
         except Exception as e: self.log_message(f"Error reading CSV '{filepath}': {e}", "error"); QMessageBox.critical(self, "CSV Error", f"Could not read CSV file:\n{e}")
 
+    def handle_import_kml(self):
+        filepath, _ = QFileDialog.getOpenFileName(self, "Select KML/KMZ File", os.path.expanduser("~/Documents"), "KML files (*.kml *.kmz);;All files (*.*)")
+        if not filepath: return
+        self.log_message(f"Loading KML: {filepath}", "info")
+        self.import_kml_action.setEnabled(False)
+        self.kml_import_progress_dialog = QProgressDialog("Importing KML: reading placemarks...", "Cancel", 0, 0, self)
+        self.kml_import_progress_dialog.setWindowTitle("Import KML/KMZ")
+        self.kml_import_progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.kml_import_progress_dialog.setMinimumDuration(500)
+        self.kml_import_thread = KMLImportThread(self.db_manager, filepath, self)
+        self.kml_import_thread.progress.connect(lambda read: self.kml_import_progress_dialog.setLabelText(f"Importing KML: {read} placemarks read..."))
+        self.kml_import_thread.import_finished.connect(lambda new, skip, err, cancelled, error: self._on_kml_import_finished(new, skip, err, cancelled, error, filepath))
+        self.kml_import_progress_dialog.canceled.connect(self.kml_import_thread.cancel)
+        self.kml_import_thread.start()
+
+    def _on_kml_import_finished(self, new, skip, err, cancelled, error, filepath):
+        self.kml_import_progress_dialog.reset(); self.import_kml_action.setEnabled(True)
+        self.kml_import_thread.wait(); self.kml_import_thread.deleteLater(); self.kml_import_thread = None # run() returns right after emitting
+        if new: self.load_data_into_table() # Batches are committed as they go, so a stopped import keeps what it inserted
+        counts = f"Imported: {new}, Skipped (already in DB): {skip}, With errors: {err}."
+        if error:
+            self.log_message(f"Import from KML '{os.path.basename(filepath)}' failed: {error}. Before the failure: {counts}", "error")
+            QMessageBox.critical(self, "KML Import Error", f"Could not read KML file:\n{error}\n\nBefore the failure: {counts}")
+        elif cancelled: self.log_message(f"Import from KML '{os.path.basename(filepath)}' cancelled. {counts}", "info")
+        else: self.log_message(f"Import from KML '{os.path.basename(filepath)}': {counts}", "info")
+
     def handle_fetch_from_api(self):
         selected_api_title = self.api_source_combo_toolbar.currentText() 
         selected_api_url = self.api_source_combo_toolbar.currentData() 
         if not selected_api_url: QMessageBox.information(self, "API Fetch", "No API source selected or URL is missing."); return
         self.log_message(f"Fetching from API: {selected_api_title}...", "info") 
+        from core.api_handler import fetch_data_from_mwater_api
         rows_from_api, error_msg = fetch_data_from_mwater_api(selected_api_url, selected_api_title)
         if error_msg: self.log_message(f"API Fetch Error ({selected_api_title}): {error_msg}", "error"); QMessageBox.warning(self, "API Fetch Error", error_msg); return
         if rows_from_api is not None: self._process_imported_data(rows_from_api, selected_api_title) 
         else: self.log_message(f"No data returned or error for {selected_api_title}.", "info")
 
+    @traced("ui.import")
     def _process_imported_data(self, row_list, source_description): 
         new, skip, err = 0,0,0; self.apply_choice_to_all_duplicates=False; self.session_duplicate_choice="skip"
         if not row_list: self.log_message(f"No data rows in {source_description}.",tag="info_tag"); return
@@ -570,7 +1472,7 @@ class MainWindow(QMainWindow):
             rc_from_row = ""; 
             for k,v in original_row_dict.items():
                 if k.lstrip('\ufeff') == CSV_HEADERS["response_code"]: rc_from_row = v.strip(); break
-            if not rc_from_row: self.log_message(f"Row {i+1} from {source_description} skipped: Missing RC.", "error"); err+=1; continue
+            if not rc_from_row: self.log_message(f"Row {i+1} from {source_description} skipped: Missing RC.", "error", detail=True); err+=1; continue
             
             action, apply_now = self.session_duplicate_choice, self.apply_choice_to_all_duplicates
             is_dup_id = self.db_manager.check_duplicate_response_code(rc_from_row) 
@@ -578,7 +1480,7 @@ class MainWindow(QMainWindow):
                 if not apply_now: action, apply_now = DuplicateDialog(self,rc_from_row).get_user_choice()
                 if apply_now: self.apply_choice_to_all_duplicates=True; self.session_duplicate_choice=action
                 if action=="cancel_all": self.log_message("Import cancelled.", "info"); break 
-                elif action=="skip": self.log_message(f"Skipped duplicate RC '{rc_from_row}'.", "info"); skip+=1; continue
+                elif action=="skip": self.log_message(f"Skipped duplicate RC '{rc_from_row}'.", "info", detail=True); skip+=1; continue
             
             processed_flat = process_csv_row_data(original_row_dict) 
             cur_uuid, cur_rc = processed_flat.get("uuid"), processed_flat.get("response_code")
@@ -591,21 +1493,35 @@ class MainWindow(QMainWindow):
         self.load_data_into_table() 
         self.log_message(f"Import from {source_description}: Processed: {new}, Skipped: {skip}, Errors: {err}.", "info")
 
-    def handle_export_displayed_data_csv(self): 
-        model_to_export = self.table_view.model() 
-        if not model_to_export or model_to_export.rowCount() == 0: QMessageBox.information(self, "Export Data", "No data displayed to export."); return
-        filepath, _ = QFileDialog.getSaveFileName(self, "Save Displayed Data As CSV", os.path.expanduser("~/Documents/dilasa_displayed_data.csv"), "CSV Files (*.csv)")
-        if not filepath: return
-        try:
-            headers = self.source_model._headers 
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.writer(csvfile); writer.writerow(headers[1:]) 
-                for row in range(model_to_export.rowCount()):
-                    row_data = [model_to_export.data(model_to_export.index(row, col)) for col in range(1, model_to_export.columnCount())] 
-                    writer.writerow(row_data)
-            self.log_message(f"Data exported to {filepath}", "success")
-            QMessageBox.information(self, "Export Successful", f"{model_to_export.rowCount()} displayed records exported to:\n{filepath}")
-        except Exception as e: self.log_message(f"Error exporting displayed data to CSV: {e}", "error"); QMessageBox.critical(self, "Export Error", f"Could not export displayed data: {e}")
+    def handle_export_displayed_data(self):
+        # Visible rows are resolved once from the filter mask (the proxy keeps source order) and written from a column snapshot
+        row_indexes = np.flatnonzero(self.filter_proxy_model.accepted_source_mask()).tolist()
+        if not row_indexes: QMessageBox.information(self, "Export Data", "No data displayed to export."); return
+        filters = {f"{name} (*{ext})": key for key, (name, ext, _) in TABLE_EXPORT_FORMATS.items()}
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Export Displayed Data", os.path.expanduser("~/Documents/dilasa_displayed_data.csv"), ";;".join(filters))
+        if not path: return
+        format_key = filters.get(selected_filter, "csv")
+        name, ext, exporter = TABLE_EXPORT_FORMATS[format_key]
+        if not path.lower().endswith(ext): path += ext
+        headers, columns = self.source_model.table_snapshot()
+        options = {"integer_columns": {headers[PolygonTableModel.ID_COL - 1], headers[PolygonTableModel.EXPORT_COUNT_COL - 1]}} if format_key == "parquet" else {}
+        self.export_data_action.setEnabled(False)
+        self.log_message(f"Exporting {len(row_indexes)} displayed records as {name} to: {path}", "info")
+        self.table_export_progress_dialog = QProgressDialog(f"Exporting {len(row_indexes)} records as {name}...", "Cancel", 0, len(row_indexes), self)
+        self.table_export_progress_dialog.setWindowTitle("Export Displayed Data")
+        self.table_export_progress_dialog.setMinimumDuration(500)
+        self.table_export_thread = TableExportThread(exporter, headers, columns, row_indexes, path, options, self)
+        self.table_export_thread.progress.connect(lambda done, total: self.table_export_progress_dialog.setValue(done))
+        self.table_export_thread.export_finished.connect(lambda written, error, cancelled: self._on_table_export_finished(written, error, cancelled, path))
+        self.table_export_progress_dialog.canceled.connect(self.table_export_thread.cancel)
+        self.table_export_thread.start()
+
+    def _on_table_export_finished(self, written, error, cancelled, path):
+        self.table_export_progress_dialog.reset(); self.export_data_action.setEnabled(True)
+        if cancelled: self.log_message("Displayed data export cancelled.", "info")
+        elif error: self.log_message(f"Error exporting displayed data: {error}", "error"); QMessageBox.critical(self, "Export Error", f"Could not export displayed data: {error}")
+        else: self.log_message(f"Data exported to {path}", "success"); QMessageBox.information(self, "Export Successful", f"{written} displayed records exported to:\n{path}")
+        self.table_export_thread.wait(); self.table_export_thread.deleteLater(); self.table_export_thread = None # run() returns right after emitting
 
     def handle_delete_checked_rows(self): 
         checked_ids = self.source_model.get_checked_item_db_ids()
@@ -618,59 +1534,240 @@ class MainWindow(QMainWindow):
     def handle_clear_all_data(self):
         if QMessageBox.question(self, "Confirm Clear All", "Delete ALL polygon data records permanently?\nThis cannot be undone.", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
             if self.db_manager.delete_all_polygon_data():
-                self.log_message("All polygon data records deleted.", "info"); self.source_model._check_states.clear(); self.load_data_into_table()
+                self.log_message("All polygon data records deleted.", "info"); self.source_model.set_all_checkboxes(Qt.CheckState.Unchecked); self.load_data_into_table()
             else: self.log_message("Failed to clear data.", "error"); QMessageBox.warning(self, "DB Error", "Could not clear data.")
     
+    def handle_archive_records(self):
+        months, ok = QInputDialog.getInt(self, "Archive Old Exported Records",
+                                         "Archive records exported to KML and not modified for at least (months):", 12, 1, 240)
+        if not ok: return
+        if QMessageBox.question(self, "Confirm Archive", f"Move exported records not modified in the last {months} month(s) to the archive database?\nThey stay searchable with 'Include Archived Records'.", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No) != QMessageBox.StandardButton.Yes: return
+        archived_count = self.db_manager.archive_polygon_data(older_than_months=months, exported_only=True)
+        if archived_count is None: self.log_message("Failed to archive records.", "error"); QMessageBox.warning(self, "DB Error", "Could not archive records."); return
+        self.log_message(f"{archived_count} record(s) archived. Archive now holds {self.db_manager.get_archived_record_count()} record(s).", "success" if archived_count else "info")
+        self.load_data_into_table()
+
     def handle_generate_kml(self): 
         checked_ids = self.source_model.get_checked_item_db_ids()
         if not checked_ids: QMessageBox.information(self, "Generate KML", "No records checked for KML generation."); return
-        records_data = [self.db_manager.get_polygon_data_by_id(db_id) for db_id in checked_ids]
-        valid_for_kml = [r for r in records_data if r and r.get('status') == 'valid_for_kml']
-        if not valid_for_kml: QMessageBox.information(self, "Generate KML", "Checked records are not valid for KML."); return
+        valid_ids = self.db_manager.get_valid_for_kml_ids(checked_ids)
+        if not valid_ids: QMessageBox.information(self, "Generate KML", "Checked records are not valid for KML."); return
         output_folder = QFileDialog.getExistingDirectory(self, "Select Output Folder", os.path.expanduser("~/Documents"))
         if not output_folder: self.log_message("KML generation cancelled.", "info"); return
         output_mode_dialog = OutputModeDialog(self); kml_output_mode = output_mode_dialog.get_selected_mode()
         if not kml_output_mode: self.log_message("KML gen cancelled (mode selection).", "info"); return
-        self.log_message(f"Generating KMLs to: {output_folder} (Mode: {kml_output_mode})", "info")
+        kmz, precision = output_mode_dialog.kmz_output, output_mode_dialog.coordinate_precision
+        ext = "kmz" if kmz else "kml"
+        self.log_message(f"Generating {ext.upper()}s to: {output_folder} (Mode: {kml_output_mode})", "info")
+        if kml_output_mode == "multiple":
+            self._start_parallel_kml_export(valid_ids, output_folder, kmz, precision); return
         files_gen, ids_gen = 0, []
         try:
-            if kml_output_mode == "single":
-                ts=datetime.datetime.now().strftime('%d.%m.%y'); fn=f"Consolidate_ALL_KML_{ts}_{len(valid_for_kml)}.kml"
-                doc=simplekml.Kml(name=f"Consolidated - {ts}")
-                for pd in valid_for_kml: 
-                    if add_polygon_to_kml_object(doc, pd): ids_gen.append(pd['id'])
-                if doc.features: doc.save(os.path.join(output_folder,fn)); files_gen=1
-            elif kml_output_mode == "multiple":
-                for pd in valid_for_kml:
-                    doc=simplekml.Kml(name=pd['uuid'])
-                    if add_polygon_to_kml_object(doc, pd): doc.save(os.path.join(output_folder,f"{pd['uuid']}.kml")); ids_gen.append(pd['id']); files_gen+=1
-            for rid in ids_gen: self.db_manager.update_kml_export_status(rid)
-            if ids_gen: self.load_data_into_table()
+            with span("ui.generate_kml", mode=kml_output_mode, records=len(valid_ids)):
+                if kml_output_mode == "single":
+                    # Streamed straight to disk as records are fetched, so memory stays flat for large exports
+                    ts=datetime.datetime.now().strftime('%d.%m.%y'); fn=f"Consolidate_ALL_KML_{ts}_{len(valid_ids)}.{ext}"
+                    out_path=os.path.join(output_folder,fn)
+                    with open_kml_output(out_path, kmz) as kml_file, StreamingKMLWriter(kml_file, f"Consolidated - {ts}", precision) as writer:
+                        for pd in self.db_manager.iter_polygon_data_by_ids(valid_ids):
+                            if writer.add_polygon(pd): ids_gen.append(pd['id'])
+                    if ids_gen:
+                        files_gen=1
+                        if not kmz: save_placemark_index(out_path, writer) # Lets "Export Changes" update this file later
+                    else: os.remove(out_path)
+                elif kml_output_mode == "regions":
+                    ts=datetime.datetime.now().strftime('%d.%m.%y'); region_folder=os.path.join(output_folder,f"Region_KML_{ts}_{len(valid_ids)}")
+                    root_path, ids_gen, file_count = write_region_hierarchy_kml(self.db_manager.get_region_groups_for_ids(valid_ids),
+                                                                                self.db_manager.iter_polygon_data_by_ids, region_folder,
+                                                                                f"Regions - {ts}", precision, kmz)
+                    files_gen = file_count if ids_gen else 0
+                    if ids_gen: self.log_message(f"Region hierarchy written, open: {root_path}", "info")
+                if ids_gen: self.db_manager.update_kml_export_status_bulk(ids_gen); self.load_data_into_table()
             msg=f"{files_gen} KMLs generated for {len(ids_gen)} records." if files_gen > 0 else "No KMLs generated."
             self.log_message(msg,"success" if files_gen>0 else "info"); QMessageBox.information(self,"KML Generation",msg)
         except Exception as e: self.log_message(f"KML Gen Error: {e}","error"); QMessageBox.critical(self,"KML Error",f"Error:\n{e}")
 
+    def handle_export_changed_kml(self):
+        changed_ids = self.db_manager.get_changed_since_export_ids()
+        if not changed_ids: QMessageBox.information(self, "Export Changes", "No new or modified valid records since the last KML export."); return
+        choice_box = QMessageBox(QMessageBox.Icon.Question, "Export Changes", f"{len(changed_ids)} valid record(s) are new or modified since their last KML export.\nHow do you want to export them?", parent=self)
+        delta_button = choice_box.addButton("Write Delta KML...", QMessageBox.ButtonRole.AcceptRole)
+        update_button = choice_box.addButton("Update Existing Consolidated KML...", QMessageBox.ButtonRole.AcceptRole)
+        choice_box.addButton(QMessageBox.StandardButton.Cancel)
+        choice_box.exec()
+        ids_gen = []
+        try:
+            if choice_box.clickedButton() == delta_button:
+                output_folder = QFileDialog.getExistingDirectory(self, "Select Output Folder", os.path.expanduser("~/Documents"))
+                if not output_folder: return
+                ts=datetime.datetime.now().strftime('%d.%m.%y_%H%M'); out_path=os.path.join(output_folder, f"Delta_KML_{ts}_{len(changed_ids)}.kml")
+                with open_kml_output(out_path) as kml_file, StreamingKMLWriter(kml_file, f"Changes - {ts}", DEFAULT_KML_COORDINATE_PRECISION) as writer:
+                    for pd in self.db_manager.iter_polygon_data_by_ids(changed_ids):
+                        if writer.add_polygon(pd): ids_gen.append(pd['id'])
+                if ids_gen: save_placemark_index(out_path, writer); msg = f"Delta KML with {len(ids_gen)} record(s) written to {out_path}"
+                else: os.remove(out_path); msg = "No KML generated."
+            elif choice_box.clickedButton() == update_button:
+                kml_path, _ = QFileDialog.getOpenFileName(self, "Select Consolidated KML to Update", os.path.expanduser("~/Documents"), "KML files (*.kml)")
+                if not kml_path: return
+                append_new = QMessageBox.question(self, "Export Changes", "Also append changed records that are not in this file yet?\n(No only replaces placemarks already in the file.)",
+                                                  QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes
+                ids_gen, updated, added = update_consolidated_kml(kml_path, self.db_manager.iter_polygon_data_by_ids(changed_ids), append_new_records=append_new)
+                msg = f"Updated {os.path.basename(kml_path)}: {updated} placemark(s) replaced, {added} added."
+            else: return
+            if ids_gen: self.db_manager.update_kml_export_status_bulk(ids_gen); self.load_data_into_table()
+            self.log_message(msg, "success" if ids_gen else "info"); QMessageBox.information(self, "Export Changes", msg)
+        except Exception as e: self.log_message(f"Export Changes Error: {e}", "error"); QMessageBox.critical(self, "KML Error", f"Error:\n{e}")
+
+    def handle_export_gis_data(self):
+        checked_ids = self.source_model.get_checked_item_db_ids()
+        if not checked_ids: QMessageBox.information(self, "Export GIS Data", "No records checked for export."); return
+        valid_ids = self.db_manager.get_valid_for_kml_ids(checked_ids)
+        if not valid_ids: QMessageBox.information(self, "Export GIS Data", "Checked records are not valid for export."); return
+        filters = {f"{name} (*{ext})": key for key, (name, ext, _) in GIS_EXPORT_FORMATS.items()}
+        ts = datetime.datetime.now().strftime('%d.%m.%y')
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Export GIS Data", os.path.join(os.path.expanduser("~/Documents"), f"Polygons_{ts}_{len(valid_ids)}"), ";;".join(filters))
+        if not path: self.log_message("GIS export cancelled.", "info"); return
+        name, ext, exporter = GIS_EXPORT_FORMATS[filters.get(selected_filter, "gpkg")]
+        if not path.lower().endswith(ext): path += ext
+        self.log_message(f"Exporting {len(valid_ids)} records as {name} to: {path}", "info")
+        self.export_gis_action.setEnabled(False)
+        self.gis_export_progress_dialog = QProgressDialog(f"Exporting {len(valid_ids)} records as {name}...", "Cancel", 0, len(valid_ids), self)
+        self.gis_export_progress_dialog.setWindowTitle("Export GIS Data")
+        self.gis_export_progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.gis_export_progress_dialog.setMinimumDuration(500)
+        self.gis_export_thread = GISExportThread(self.db_manager, exporter, valid_ids, path, self)
+        self.gis_export_thread.progress.connect(lambda done, total: self.gis_export_progress_dialog.setValue(done))
+        self.gis_export_thread.export_finished.connect(lambda written, error, cancelled: self._on_gis_export_finished(written, error, cancelled, name, path))
+        self.gis_export_progress_dialog.canceled.connect(self.gis_export_thread.cancel)
+        self.gis_export_thread.start()
+
+    def _on_gis_export_finished(self, written, error, cancelled, name, path):
+        self.gis_export_progress_dialog.reset(); self.export_gis_action.setEnabled(True)
+        self.gis_export_thread.wait(); self.gis_export_thread.deleteLater(); self.gis_export_thread = None # run() returns right after emitting
+        if cancelled: self.log_message("GIS export cancelled.", "info")
+        elif error: self.log_message(f"GIS Export Error: {error}", "error"); QMessageBox.critical(self, "Export Error", f"Error:\n{error}")
+        else:
+            msg = f"{written} polygon(s) exported as {name} to {path}"
+            self.log_message(msg, "success" if written else "info"); QMessageBox.information(self, "Export GIS Data", msg)
+
+    def handle_seed_map_tiles(self):
+        checked_ids = self.source_model.get_checked_item_db_ids()
+        if not checked_ids: QMessageBox.information(self, "Pre-seed Map Tiles", "Check the records whose surroundings should be available offline."); return
+        valid_ids = self.db_manager.get_valid_for_kml_ids(checked_ids)
+        if not valid_ids: QMessageBox.information(self, "Pre-seed Map Tiles", "Checked records have no valid polygons."); return
+        zoom_min, ok = QInputDialog.getInt(self, "Pre-seed Map Tiles", "From zoom level:", 14, 1, MAX_SEED_ZOOM)
+        if not ok: return
+        zoom_max, ok = QInputDialog.getInt(self, "Pre-seed Map Tiles", "To zoom level:", max(zoom_min, 18), zoom_min, MAX_SEED_ZOOM)
+        if not ok: return
+        rings, valid = records_to_lonlat_rings(list(self.db_manager.iter_polygon_data_by_ids(valid_ids)))
+        rings = rings[valid]
+        bboxes = np.column_stack([rings[:, :, 0].min(axis=1), rings[:, :, 1].min(axis=1), rings[:, :, 0].max(axis=1), rings[:, :, 1].max(axis=1)]).tolist()
+        try: tile_count = len(tiles_for_bboxes(bboxes, zoom_min, zoom_max, max_tiles=MAX_SEED_TILES))
+        except TileLimitExceeded as e:
+            self.log_message(f"Pre-seed map tiles refused: {e}", "error")
+            QMessageBox.warning(self, "Pre-seed Map Tiles", f"{e}\n\nAt most {MAX_SEED_TILES} tiles can be pre-seeded at once. "
+                                "Choose a lower 'To zoom level' or check fewer records."); return
+        if not tile_count: QMessageBox.information(self, "Pre-seed Map Tiles", "No polygon coordinates could be converted."); return
+        if QMessageBox.question(self, "Pre-seed Map Tiles", f"Cache up to {tile_count} satellite tiles for {len(bboxes)} polygon(s) at zoom {zoom_min}-{zoom_max}?",
+                                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) != QMessageBox.StandardButton.Yes: return
+        self.seed_tiles_action.setEnabled(False)
+        self.tile_seed_progress_dialog = QProgressDialog(f"Downloading {tile_count} map tiles...", "Cancel", 0, tile_count, self)
+        self.tile_seed_progress_dialog.setWindowTitle("Pre-seed Map Tiles")
+        self.tile_seed_progress_dialog.setMinimumDuration(500)
+        self.tile_seed_thread = TileSeedThread(self.tile_cache_path, bboxes, zoom_min, zoom_max, self)
+        self.tile_seed_thread.progress.connect(lambda done, total: self.tile_seed_progress_dialog.setValue(done))
+        self.tile_seed_thread.seed_finished.connect(self._on_tile_seed_finished)
+        self.tile_seed_progress_dialog.canceled.connect(self.tile_seed_thread.cancel)
+        self.tile_seed_thread.start()
+
+    def _on_tile_seed_finished(self, downloaded, cached, failed, cancelled, error):
+        self.tile_seed_progress_dialog.reset(); self.seed_tiles_action.setEnabled(True)
+        self.tile_seed_thread.wait(); self.tile_seed_thread.deleteLater(); self.tile_seed_thread = None # run() returns right after emitting
+        if error: self.log_message(f"Tile pre-seeding failed: {error}", "error"); QMessageBox.critical(self, "Pre-seed Map Tiles", f"Error:\n{error}"); return
+        msg = f"Map tiles {'pre-seeding cancelled' if cancelled else 'pre-seeded'}: {downloaded} downloaded, {cached} already cached, {failed} failed."
+        self.log_message(msg, "error" if failed and not downloaded else "success"); QMessageBox.information(self, "Pre-seed Map Tiles", msg)
+
+    def _start_parallel_kml_export(self, valid_ids, output_folder, kmz, precision):
+        self.generate_kml_action.setEnabled(False)
+        self.kml_progress_dialog = QProgressDialog(f"Exporting {len(valid_ids)} KML files...", "Cancel", 0, len(valid_ids), self)
+        self.kml_progress_dialog.setWindowTitle("KML Generation")
+        self.kml_progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.kml_progress_dialog.setMinimumDuration(500)
+        self.kml_export_thread = KMLExportThread(self.db_manager, valid_ids, output_folder, kmz, precision, self)
+        self.kml_export_thread.progress.connect(lambda done, total: self.kml_progress_dialog.setValue(done))
+        self.kml_export_thread.export_finished.connect(self._on_parallel_kml_export_finished)
+        self.kml_progress_dialog.canceled.connect(self.kml_export_thread.cancel)
+        self.kml_export_thread.start()
+
+    def _on_parallel_kml_export_finished(self, results, cancelled):
+        self.kml_progress_dialog.reset(); self.generate_kml_action.setEnabled(True)
+        ids_gen = [rid for rid, path, err in results if path]
+        failures = [(rid, err) for rid, path, err in results if not path]
+        for rid, err in failures[:20]: self.log_message(f"KML export failed for record ID {rid}: {err}", "error")
+        if len(failures) > 20: self.log_message(f"... and {len(failures) - 20} more KML export failures.", "error")
+        if ids_gen: self.db_manager.update_kml_export_status_bulk(ids_gen); self.load_data_into_table()
+        msg=f"{len(ids_gen)} KMLs generated for {len(ids_gen)} records." if ids_gen else "No KMLs generated."
+        if failures: msg += f" {len(failures)} failed."
+        if cancelled: msg = "KML generation cancelled. " + msg
+        self.log_message(msg,"success" if ids_gen else "info"); QMessageBox.information(self,"KML Generation",msg)
+        self.kml_export_thread.wait(); self.kml_export_thread.deleteLater(); self.kml_export_thread = None # run() returns right after emitting
+
     def handle_about(self):
         QMessageBox.about(self, f"About {APP_NAME_MW}", f"<b>{APP_NAME_MW}</b><br>Version: {APP_VERSION_MW}<br><br>{ORGANIZATION_TAGLINE_MW}<br><br>Processes geographic data for KML generation.")
 
-    def log_message(self, message, level="info"): 
-        if hasattr(self, 'log_text_edit_qt_actual'): 
-            color_map = {"info": INFO_COLOR_MW, "error": ERROR_COLOR_MW, "success": SUCCESS_COLOR_MW}
-            self.log_text_edit_qt_actual.setTextColor(QColor(color_map.get(level, FG_COLOR_MW)))
-            self.log_text_edit_qt_actual.append(f"[{level.upper()}] {message}")
-            self.log_text_edit_qt_actual.ensureCursorVisible() 
+    def handle_toggle_tracing(self, enabled):
+        if enabled: tracer.enable(); self.log_message("Performance tracing on; see Tools > Diagnostics for the summary and trace export.", "info")
+        else: tracer.disable(); self.log_message("Performance tracing off (recorded spans are kept).", "info")
+
+    def handle_show_trace_summary(self):
+        self.log_message("Performance trace summary:\n" + tracer.format_summary(), "info", detail=True)
+        self.handle_show_diagnostics(1)
+
+    def handle_show_diagnostics(self, current_tab=0):
+        DiagnosticsDialog(self, [("UI Stalls", self.stall_watchdog.format_report), ("Performance Trace", tracer.format_summary)], current_tab).exec()
+
+    def _on_ui_stall(self, stall):
+        self.log_message(f"The window was unresponsive for {stall['duration_ms'] / 1000:.1f} s in {stall['slot']} (Tools > Diagnostics > Show UI Stalls).", "error")
+
+    def handle_export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Performance Trace", os.path.expanduser("~/Documents/dilasa_trace.json"), "Trace JSON (*.json)")
+        if not path: return
+        try: self.log_message(f"{tracer.export_chrome_trace(path)} span(s) written to {path} (open in ui.perfetto.dev or chrome://tracing).", "success")
+        except OSError as e: self.log_message(f"Could not write trace: {e}", "error"); QMessageBox.critical(self, "Export Trace", f"Could not write trace:\n{e}")
+
+    def handle_toggle_profiling(self, enabled):
+        if enabled: tracer.start_profile(); self.log_message("cProfile started on the GUI thread.", "info"); return
+        path, _ = QFileDialog.getSaveFileName(self, "Save cProfile Output", os.path.expanduser("~/Documents/dilasa_profile.prof"), "Profile (*.prof)")
+        try:
+            tracer.stop_profile(path or None)
+            self.log_message(f"cProfile output saved to {path}." if path else "cProfile stopped; output discarded.", "success" if path else "info")
+        except OSError as e: self.log_message(f"Could not save profile: {e}", "error")
+
+    def log_message(self, message, level="info", detail=False): 
+        # Buffered: the panel and status bar catch up on the next flush; detail=True messages only go to the log file
+        if hasattr(self, 'log_panel'): self.log_panel.log(message, level, detail)
         else: print(f"LOG [{level.upper()}]: {message}")
-        if hasattr(self, 'statusBar'): self.statusBar.showMessage(message, 7000 if level=="info" else 10000)
             
+    @traced("ui.load_table")
     def load_data_into_table(self): 
         try:
-            polygon_records = self.db_manager.get_all_polygon_data_for_display()
+            include_archive = hasattr(self, 'include_archive_checkbox') and self.include_archive_checkbox.isChecked()
+            polygon_records = self.db_manager.get_all_polygon_data_for_display(include_archive=include_archive)
             self.source_model.update_data(polygon_records) 
         except Exception as e:
             self.log_message(f"Error loading data into table: {e}", "error")
             QMessageBox.warning(self, "Load Data Error", f"Could not load polygon records: {e}")
 
     def closeEvent(self, event):
+        if hasattr(self, 'stall_watchdog'): self.stall_watchdog.stop()
+        if getattr(self, 'initial_load_thread', None): self.initial_load_thread.cancel(); self.initial_load_thread.wait()
+        if getattr(self, 'kml_export_thread', None): self.kml_export_thread.cancel(); self.kml_export_thread.wait()
+        if getattr(self, 'table_export_thread', None): self.table_export_thread.cancel(); self.table_export_thread.wait()
+        if getattr(self, 'kml_import_thread', None): self.kml_import_thread.cancel(); self.kml_import_thread.wait()
+        if getattr(self, 'gis_export_thread', None): self.gis_export_thread.cancel(); self.gis_export_thread.wait()
+        if getattr(self, 'tile_seed_thread', None): self.tile_seed_thread.cancel(); self.tile_seed_thread.wait()
+        if getattr(self, 'map_layer_thread', None): self.map_layer_thread.cancel(); self.map_layer_thread.wait()
         if hasattr(self, 'map_view_widget') and self.map_view_widget: self.map_view_widget.cleanup()
         if hasattr(self, 'db_manager') and self.db_manager: self.db_manager.close()
+        if hasattr(self, 'log_panel'): self.log_panel.close_log_file()
         super().closeEvent(event)
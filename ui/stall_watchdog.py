@@ -0,0 +1,186 @@
+# File: DilasaKMLTool_v4/ui/stall_watchdog.py
+# ----------------------------------------------------------------------
+# Purpose: Detects when the GUI thread stops running the Qt event loop
+#          (the window "hangs"). A heartbeat QTimer on the GUI thread
+#          stamps the time; a helper thread checks the stamp and, once the
+#          GUI thread has been blocked past the threshold, samples its
+#          Python stack with sys._current_frames(). When the loop resumes
+#          the stall is recorded with its duration, the slot that was
+#          running (the outermost project frame, e.g. handle_generate_kml)
+#          and where the samples landed, and appended to a log file.
+# ----------------------------------------------------------------------
+import os
+import sys
+import time
+import datetime
+import threading
+import linecache
+import collections
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from core import tracing
+
+STALL_THRESHOLD_ENV_VAR = "DILASA_STALL_MS" # Overrides the threshold; 0 turns the watchdog off
+DEFAULT_STALL_THRESHOLD_MS = 500
+HEARTBEAT_INTERVAL_MS = 100
+CHECK_INTERVAL_MS = 50 # How often the helper thread looks at the heartbeat
+STACK_SAMPLE_INTERVAL_MS = 250 # Stack samples taken while a stall lasts
+MAX_STACK_SAMPLES = 40 # Per stall; a longer stall keeps its first samples
+MAX_STALLS_KEPT = 200
+LATENCY_WINDOW_BEATS = 600 # Heartbeats the event-loop latency percentiles cover (one minute)
+REPORTED_STACK_FRAMES = 25
+STALL_LOG_FILE_NAME = "ui_stalls.log"
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TRACING_FILE = os.path.abspath(tracing.__file__)
+
+def _stack_of(frame):
+    """(filename, lineno, qualified name) tuples from the outermost frame to frame."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, frame.f_lineno, getattr(code, "co_qualname", code.co_name)))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def _is_main_script(filename):
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+    return bool(main_file) and os.path.abspath(filename) == os.path.abspath(main_file)
+
+def _is_project_file(filename):
+    # The entry script only runs the event loop, and @traced wrappers are not where the work is
+    return filename.startswith(PROJECT_ROOT) and not _is_main_script(filename) and os.path.abspath(filename) != _TRACING_FILE
+
+def _describe(frame_info):
+    filename, lineno, name = frame_info
+    return f"{name} ({os.path.relpath(filename, PROJECT_ROOT) if filename.startswith(PROJECT_ROOT) else filename}:{lineno})"
+
+class StallWatchdog(QObject):
+    """
+    Measures event-loop latency and records GUI-thread stalls longer than threshold_ms.
+    Create, connect stall_detected and call start() on the GUI thread; stop() before exit.
+    """
+    stall_detected = Signal(dict) # The stall record (see _record_stall), emitted on the GUI thread
+
+    def __init__(self, threshold_ms=DEFAULT_STALL_THRESHOLD_MS, log_path=None, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self.stalls = collections.deque(maxlen=MAX_STALLS_KEPT)
+        self.stall_count = 0
+        self.latencies_ms = collections.deque(maxlen=LATENCY_WINDOW_BEATS) # Heartbeat lateness
+        self._lock = threading.Lock()
+        self._last_beat = time.perf_counter()
+        self._beat_number = 0
+        self._samples = [] # (blocked_ms, stack) taken by the helper thread during the current stall
+        self._gui_thread_id = None
+        self._stop_event = threading.Event()
+        self._monitor_thread = None
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(HEARTBEAT_INTERVAL_MS)
+        self.heartbeat_timer.timeout.connect(self._on_heartbeat)
+
+    @property
+    def running(self): return self._monitor_thread is not None
+
+    def start(self):
+        if self._monitor_thread or self.threshold_ms <= 0: return
+        self._gui_thread_id = threading.get_ident()
+        with self._lock: self._last_beat = time.perf_counter(); self._samples = []
+        self.heartbeat_timer.start()
+        self._stop_event.clear()
+        self._monitor_thread = threading.Thread(target=self._monitor, name="StallWatchdog", daemon=True)
+        self._monitor_thread.start()
+
+    def stop(self):
+        if not self._monitor_thread: return
+        self.heartbeat_timer.stop()
+        self._stop_event.set()
+        self._monitor_thread.join(1.0)
+        self._monitor_thread = None
+
+    def _on_heartbeat(self):
+        now = time.perf_counter()
+        with self._lock:
+            gap_ms = (now - self._last_beat) * 1000
+            self._last_beat = now; self._beat_number += 1
+            samples, self._samples = self._samples, []
+        self.latencies_ms.append(max(0.0, gap_ms - HEARTBEAT_INTERVAL_MS))
+        if gap_ms - HEARTBEAT_INTERVAL_MS >= self.threshold_ms: self._record_stall(gap_ms - HEARTBEAT_INTERVAL_MS, samples)
+
+    def _monitor(self):
+        """Helper thread: samples the GUI thread's stack while it is blocked past the threshold."""
+        while not self._stop_event.wait(CHECK_INTERVAL_MS / 1000):
+            with self._lock:
+                blocked_ms = (time.perf_counter() - self._last_beat) * 1000 - HEARTBEAT_INTERVAL_MS
+                beat_number, sample_count = self._beat_number, len(self._samples)
+                last_sample_ms = self._samples[-1][0] if self._samples else None
+            if blocked_ms < self.threshold_ms or sample_count >= MAX_STACK_SAMPLES: continue
+            if last_sample_ms is not None and blocked_ms - last_sample_ms < STACK_SAMPLE_INTERVAL_MS: continue
+            frame = sys._current_frames().get(self._gui_thread_id)
+            if frame is None: continue
+            stack = _stack_of(frame)
+            del frame
+            with self._lock:
+                if self._beat_number == beat_number: self._samples.append((blocked_ms, stack)) # Same stall still going
+
+    def _record_stall(self, duration_ms, samples):
+        if samples:
+            first_stack = samples[0][1]
+            # The slot is the outermost project frame; without one, the first frame the entry script called into
+            slot_frame = next((f for f in first_stack if _is_project_file(f[0])), None) or next((f for f in first_stack if not _is_main_script(f[0])), first_stack[0])
+            slot = _describe(slot_frame)
+            # Where the samples landed: the innermost project frame of each, most frequent first
+            hotspots = collections.Counter(_describe(next((f for f in reversed(stack) if _is_project_file(f[0])), stack[-1])) for _, stack in samples)
+            stack_lines = [f"{_describe(frame_info)}  {linecache.getline(frame_info[0], frame_info[1]).strip()}" for frame_info in first_stack[-REPORTED_STACK_FRAMES:]]
+        else:
+            # The helper could not run during the stall: the GUI thread held the GIL throughout (long C call)
+            slot, hotspots, stack_lines = "unknown (no stack sample; the GUI thread did not release the GIL)", collections.Counter(), []
+        stall = {"started": datetime.datetime.now() - datetime.timedelta(milliseconds=duration_ms), "duration_ms": duration_ms,
+                 "slot": slot, "hotspots": hotspots.most_common(), "samples": len(samples), "stack": stack_lines}
+        self.stalls.append(stall); self.stall_count += 1
+        self._write_log(stall)
+        self.stall_detected.emit(stall)
+
+    def _write_log(self, stall):
+        if not self.log_path: return
+        lines = [f"{stall['started']:%Y-%m-%d %H:%M:%S}  UI stalled {stall['duration_ms']:.0f} ms in {stall['slot']}"]
+        lines += [f"    {count} sample(s) in {location}" for location, count in stall["hotspots"]]
+        if stall["stack"]: lines += ["    Stack at first sample (innermost last):"] + [f"      {line}" for line in stall["stack"]]
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as log_file: log_file.write("\n".join(lines) + "\n\n")
+        except OSError as e:
+            print(f"Warning: Could not write UI stall log '{self.log_path}': {e}")
+
+    def latency_percentiles(self):
+        """(p50, p99, max) heartbeat lateness in ms over the recent window, or None before any heartbeat."""
+        latencies = sorted(self.latencies_ms)
+        if not latencies: return None
+        return latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], latencies[-1]
+
+    def format_report(self):
+        """Text summary for the diagnostics dialog: latency, stalls per slot and the most recent stalls."""
+        if not self.running and not self.stalls: return f"The stall watchdog is off (set {STALL_THRESHOLD_ENV_VAR} above 0 to enable it)."
+        lines = [f"Stall threshold {self.threshold_ms} ms, heartbeat every {HEARTBEAT_INTERVAL_MS} ms."]
+        percentiles = self.latency_percentiles()
+        if percentiles: lines.append(f"Event-loop latency over the last {len(self.latencies_ms)} heartbeats: p50 {percentiles[0]:.1f} ms, p99 {percentiles[1]:.1f} ms, max {percentiles[2]:.0f} ms.")
+        lines.append(f"{self.stall_count} stall(s) since start" + (f"; log: {self.log_path}" if self.log_path else "") + ".")
+        if not self.stalls: return "\n".join(lines)
+        by_slot = {}
+        for stall in self.stalls:
+            count, total_ms, max_ms = by_slot.get(stall["slot"], (0, 0.0, 0.0))
+            by_slot[stall["slot"]] = (count + 1, total_ms + stall["duration_ms"], max(max_ms, stall["duration_ms"]))
+        lines += ["", f"{'slot':<70} {'stalls':>6} {'total ms':>10} {'max ms':>8}"]
+        for slot, (count, total_ms, max_ms) in sorted(by_slot.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{slot:<70} {count:>6} {total_ms:>10.0f} {max_ms:>8.0f}")
+        lines += ["", "Most recent stalls:"]
+        for stall in list(self.stalls)[-10:][::-1]:
+            lines.append(f"  {stall['started']:%H:%M:%S}  {stall['duration_ms']:>7.0f} ms  {stall['slot']}")
+            lines += [f"      {count} sample(s) in {location}" for location, count in stall["hotspots"][:5]]
+        return "\n".join(lines)
+
+def stall_threshold_from_environment(environ=os.environ):
+    """The threshold in ms from DILASA_STALL_MS, or the default when unset or invalid."""
+    try: return int(environ.get(STALL_THRESHOLD_ENV_VAR, DEFAULT_STALL_THRESHOLD_MS))
+    except ValueError: return DEFAULT_STALL_THRESHOLD_MS
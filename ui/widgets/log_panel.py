@@ -0,0 +1,115 @@
+# File: DilasaKMLTool_v4/ui/widgets/log_panel.py
+# ----------------------------------------------------------------------
+# Purpose: Buffered log panel. Messages go to a size-capped ring buffer
+#          and are flushed to a QPlainTextEdit in batches on a timer, so
+#          an import logging tens of thousands of lines does not repaint
+#          the widget per line. Every message is also written to a
+#          rotating log file; detail-only messages go to the file alone.
+# ----------------------------------------------------------------------
+import os
+import html
+import time
+import logging
+import collections
+from logging.handlers import RotatingFileHandler
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPlainTextEdit
+from PySide6.QtGui import QFont
+from PySide6.QtCore import QTimer, Signal
+
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_BUFFER_SIZE = 2000        # Messages kept between flushes; older ones are dropped from the panel (not from the file)
+LOG_PANEL_MAX_LINES = 10000   # Lines kept in the panel
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 3
+
+class LogPanel(QWidget):
+    """
+    Status and log panel. log() is cheap enough to call per row: it only counts the message, writes it
+    to the log file and appends it to the ring buffer. The panel, counters and status message are
+    updated once per flush.
+    """
+    flushed = Signal(str, str) # Last message and its level, once per flush
+
+    def __init__(self, level_colors, default_color, log_file_path=None, parent=None):
+        super().__init__(parent)
+        self._buffer = collections.deque(maxlen=LOG_BUFFER_SIZE)
+        self._dropped = 0
+        self._flush_pending = False
+        self.counts = collections.Counter()
+        self._level_colors = dict(level_colors)
+        self._default_color = default_color
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 10, 0, 0)
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(QLabel("Status and Logs:"))
+        header_layout.addStretch()
+        self.counts_label = QLabel("")
+        header_layout.addWidget(self.counts_label)
+        layout.addLayout(header_layout)
+        self.text_edit = QPlainTextEdit()
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setFont(QFont("Segoe UI", 9))
+        self.text_edit.setMaximumBlockCount(LOG_PANEL_MAX_LINES)
+        layout.addWidget(self.text_edit)
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+        self.log_file_path = log_file_path
+        self._file_handler = None
+        self._file_lines = [] # (time, level, message) waiting to be written
+        if log_file_path:
+            try:
+                os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+                self._file_handler = RotatingFileHandler(log_file_path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT, encoding="utf-8")
+                self._file_handler.setFormatter(logging.Formatter("%(message)s"))
+            except OSError as e:
+                print(f"Warning: Could not open log file '{log_file_path}': {e}")
+
+    def log(self, message, level="info", detail=False):
+        """Queues a message for the panel, or with detail=True writes it to the log file only."""
+        self.counts[level] += 1
+        if self._file_handler:
+            self._file_lines.append((time.time(), level, message))
+            if len(self._file_lines) >= LOG_BUFFER_SIZE: self._write_file_lines()
+        if not detail:
+            if len(self._buffer) == self._buffer.maxlen: self._dropped += 1
+            self._buffer.append((level, message))
+        if not self._flush_pending: # Detail messages still need the counters refreshed
+            self._flush_pending = True
+            self._flush_timer.start()
+
+    def flush(self):
+        self._flush_timer.stop()
+        self._flush_pending = False
+        if self._file_lines: self._write_file_lines()
+        if self._buffer or self._dropped:
+            lines = list(self._buffer)
+            if self._dropped:
+                where = f", see {self.log_file_path}" if self._file_handler else ""
+                lines.insert(0, ("info", f"... {self._dropped} earlier message(s) not shown{where}"))
+            # The whole batch goes in as one HTML fragment, one paragraph (block) per message; appendHtml keeps
+            # the view pinned to the bottom unless the user has scrolled up
+            self.text_edit.appendHtml("".join(f'<p style="color:{self._level_colors.get(level, self._default_color)}">'
+                                              f"[{level.upper()}] {html.escape(message)}</p>" for level, message in lines))
+            last_level, last_message = lines[-1]
+            self._buffer.clear(); self._dropped = 0
+            self.flushed.emit(last_message, last_level)
+        self.counts_label.setText("  ".join(f"{level.capitalize()}: {count}" for level, count in sorted(self.counts.items())))
+
+    def _write_file_lines(self):
+        # One record per batch: the handler checks for rollover once instead of formatting and stat-ing the file per line
+        text = "\n".join(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))} [{level.upper()}] {message}"
+                         for timestamp, level, message in self._file_lines)
+        self._file_lines = []
+        self._file_handler.handle(logging.makeLogRecord({"msg": text, "levelno": logging.INFO, "levelname": "INFO"}))
+
+    def close_log_file(self):
+        self.flush()
+        if self._file_handler:
+            self._file_handler.close()
+            self._file_handler = None
@@ -1,119 +1,353 @@
 # File: DilasaKMLTool_v4/ui/widgets/map_view_widget.py
 # ----------------------------------------------------------------------
-from PySide6.QtWidgets import QWidget, QVBoxLayout
-from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtWebEngineCore import QWebEngineSettings 
-from PySide6.QtCore import QUrl, Slot 
-import folium
+# Purpose: Map panel. The Leaflet page (built with folium) is loaded once;
+#          selections, fitBounds calls and overlays are then pushed to it
+#          as small JSON messages through runJavaScript, so the page and
+#          its tiles are never reloaded for a selection change.
+#          Basemap tiles can be served through the dilasatile:// URL
+#          scheme from the on-disk tile cache (core/tile_cache.py).
+#          A records layer draws many polygons on one canvas: the page
+#          reports its viewport over QWebChannel and only the polygons
+#          inside it, simplified for the zoom level, are sent back.
+#          Zoomed out, the layer is drawn as a density grid instead.
+#          The web view (and folium) are only loaded once the widget is
+#          first shown, so they do not hold up application startup.
+# ----------------------------------------------------------------------
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
+# QtWebEngineCore is needed up front: the URL scheme must be registered before the QApplication exists
+from PySide6.QtWebEngineCore import QWebEngineSettings, QWebEngineUrlScheme, QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob
+from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+from PySide6.QtWebChannel import QWebChannel
+from PySide6.QtCore import Qt, QUrl, QBuffer, QIODevice, QObject, QTimer, Signal, Slot
+import shiboken6
+import numpy as np
 import os
-import tempfile 
+import json
+import tempfile
+
+from core.tile_cache import TileCache, TILE_PROVIDERS, TILE_FETCH_USER_AGENT, MAX_SEED_ZOOM, tile_url
+from core.spatial_index import BBoxGridIndex, DensityGrids, DENSITY_ZOOM_LEVELS, ring_bboxes, viewport_layer
+
+TILE_URL_SCHEME = b"dilasatile"
+DEFAULT_MAP_CENTER = (20.5937, 78.9629)
+DEFAULT_MAP_ZOOM = 5
+QWEBCHANNEL_SCRIPT_URL = "qrc:///qtwebchannel/qwebchannel.js"
+RECORDS_LAYER_VIEWPORT_PADDING = 0.25 # Fraction of the viewport added on each side, so short pans do not uncover empty map
+RECORDS_LAYER_DENSITY_MAX_ZOOM = DENSITY_ZOOM_LEVELS[-1] # Up to this zoom the records layer is a density grid, past it real polygons
+
+# Message handler installed into the folium page, rendered right after the map it drives
+_MAP_API_TEMPLATE = """
+{% macro script(this, kwargs) %}
+window.dilasaMap = (function (map) {
+    var defaultCenter = map.getCenter(), defaultZoom = map.getZoom();
+    // Records are drawn on one canvas in their own pane, below the (SVG) selection
+    map.createPane("records").style.zIndex = 350;
+    var recordsRenderer = L.canvas({pane: "records", padding: 0.25});
+    var records = L.layerGroup().addTo(map);
+    var selection = L.featureGroup().addTo(map);
+    var overlays = {};
+    var handlers = {
+        polygon: function (msg) {
+            selection.clearLayers();
+            L.polygon(msg.coords, {color: "blue", weight: 3, fill: true, fillColor: "blue", fillOpacity: 0.1})
+                .bindTooltip("Selected Polygon").addTo(selection);
+            if (msg.marker) L.marker(msg.marker).bindTooltip("Polygon Area").addTo(selection);
+            map.fitBounds(selection.getBounds(), {maxZoom: msg.zoom, animate: false});
+        },
+        clear: function () {
+            selection.clearLayers();
+            map.setView(defaultCenter, defaultZoom, {animate: false});
+        },
+        fitBounds: function (msg) { map.fitBounds(msg.bounds, {maxZoom: msg.maxZoom}); },
+        overlay: function (msg) {
+            if (overlays[msg.name]) { map.removeLayer(overlays[msg.name]); delete overlays[msg.name]; }
+            if (msg.geojson) overlays[msg.name] = L.geoJSON(msg.geojson, {style: msg.style || {}}).addTo(map);
+        },
+        records: function (msg) {
+            // polygons: [id, lat1, lon1, lat2, lon2, ...]; points: [lat, lon] for polygons too small to see;
+            // cells: [x, y, count] density grid cells of cellPixels pixels at zoom cellZoom
+            records.clearLayers();
+            var size = msg.cellPixels, maxLog = Math.log(1 + msg.maxCount);
+            msg.cells.forEach(function (c) {
+                var t = Math.log(1 + c[2]) / maxLog;
+                L.rectangle([map.unproject([c[0] * size, (c[1] + 1) * size], msg.cellZoom), map.unproject([(c[0] + 1) * size, c[1] * size], msg.cellZoom)],
+                            {renderer: recordsRenderer, stroke: false, fillColor: "hsl(" + Math.round(60 * (1 - t)) + ",100%,50%)", fillOpacity: 0.3 + 0.5 * t})
+                    .bindTooltip(c[2] + " plot(s)").addTo(records);
+            });
+            msg.polygons.forEach(function (p) {
+                var latlngs = [];
+                for (var i = 1; i < p.length; i += 2) latlngs.push([p[i], p[i + 1]]);
+                L.polygon(latlngs, {renderer: recordsRenderer, color: msg.color, weight: 1, fillOpacity: 0.25})
+                    .bindTooltip("ID " + p[0]).addTo(records);
+            });
+            msg.points.forEach(function (p) {
+                L.circleMarker(p, {renderer: recordsRenderer, radius: 2, stroke: false, fillColor: msg.color, fillOpacity: 0.8}).addTo(records);
+            });
+        }
+    };
+    if (window.QWebChannel && window.qt && qt.webChannelTransport) {
+        new QWebChannel(qt.webChannelTransport, function (channel) {
+            var bridge = channel.objects.dilasaBridge;
+            var report = function () {
+                var b = map.getBounds();
+                bridge.reportViewport(b.getWest(), b.getSouth(), b.getEast(), b.getNorth(), map.getZoom());
+            };
+            map.on("moveend", report);
+            report();
+        });
+    }
+    return {handle: function (msg) { handlers[msg.type](msg); }};
+})({{ this._parent.get_name() }});
+{% endmacro %}
+"""
+
+def _map_message_handler():
+    """MacroElement rendering _MAP_API_TEMPLATE; branca is imported here, with folium, rather than at startup."""
+    from branca.element import MacroElement
+    from jinja2 import Template
+    handler = MacroElement()
+    handler._template = Template(_MAP_API_TEMPLATE)
+    return handler
+
+class _MapBridge(QObject):
+    """Object the page calls through QWebChannel."""
+    viewportChanged = Signal(float, float, float, float, int) # west, south, east, north, zoom
+
+    @Slot(float, float, float, float, int)
+    def reportViewport(self, west, south, east, north, zoom):
+        self.viewportChanged.emit(west, south, east, north, zoom)
+
+# Base layers: (tile provider key, layer name, attribution); the first one is shown by default
+BASEMAP_LAYERS = [
+    ("esri", "Satellite View (Default)", "Esri World Imagery"),
+    ("osm", "Street Map", "&copy; OpenStreetMap contributors"),
+    ("carto", "Light Map", "&copy; OpenStreetMap contributors &copy; CARTO"),
+]
+
+def register_tile_url_scheme():
+    """Registers the dilasatile:// scheme with QtWebEngine. Must run before the QApplication is created."""
+    scheme = QWebEngineUrlScheme(TILE_URL_SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(QWebEngineUrlScheme.Flag.SecureScheme | QWebEngineUrlScheme.Flag.CorsEnabled)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+class TileSchemeHandler(QWebEngineUrlSchemeHandler):
+    """
+    Serves dilasatile://<provider>/<z>/<x>/<y> from the tile cache. Misses are downloaded asynchronously
+    (QNetworkAccessManager, GUI thread never blocks), stored, then served; offline misses fail quietly.
+    """
+    def __init__(self, cache_path, parent=None):
+        super().__init__(parent)
+        self.cache = TileCache(cache_path)
+        self.network = QNetworkAccessManager(self)
+        self._network_replies = set() # Downloads in flight, aborted by close()
+
+    def requestStarted(self, job):
+        url = job.requestUrl()
+        try:
+            provider, (z, x, y) = url.host(), map(int, url.path().strip("/").split("/"))
+            if provider not in TILE_PROVIDERS: raise ValueError(provider)
+        except ValueError:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlInvalid); return
+        if self.cache is None: job.fail(QWebEngineUrlRequestJob.Error.RequestFailed); return # Closed, the window is going away
+        data = self.cache.get(provider, z, x, y)
+        if data is not None: self._reply(job, provider, data); return
+        request = QNetworkRequest(QUrl(tile_url(provider, z, x, y)))
+        request.setHeader(QNetworkRequest.KnownHeaders.UserAgentHeader, TILE_FETCH_USER_AGENT)
+        network_reply = self.network.get(request)
+        self._network_replies.add(network_reply)
+        network_reply.finished.connect(lambda: self._on_tile_downloaded(network_reply, job, (provider, z, x, y)))
+
+    def _on_tile_downloaded(self, network_reply, job, tile):
+        self._network_replies.discard(network_reply)
+        network_reply.deleteLater()
+        data = bytes(network_reply.readAll()) if network_reply.error() == QNetworkReply.NetworkError.NoError else None
+        if data and self.cache is not None: self.cache.put(*tile, data) # None once close() ran
+        if not shiboken6.isValid(job): return # The page dropped the request meanwhile
+        if data: self._reply(job, tile[0], data)
+        else: job.fail(QWebEngineUrlRequestJob.Error.RequestFailed)
+
+    def _reply(self, job, provider, data):
+        buffer = QBuffer(job) # Owned by the job, so it lives exactly as long as the reply needs it
+        buffer.setData(data)
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        job.reply(TILE_PROVIDERS[provider][1].encode(), buffer)
+
+    def close(self):
+        for network_reply in list(self._network_replies): network_reply.abort() # Emits finished, which fails the job
+        self._network_replies.clear()
+        if self.cache is not None: self.cache.close()
+        self.cache = None
 
 class MapViewWidget(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, tile_cache_path=None):
         super().__init__(parent)
+        self.tile_cache_path = tile_cache_path
+        self.web_view = None # Created by create_web_view() once the widget is shown; messages queue until the page loads
+        self.placeholder_label = QLabel("Loading map...")
+        self.placeholder_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.placeholder_label)
+        self.setLayout(layout)
+
+        self.tile_scheme_handler = None
+        self.bridge = _MapBridge(self)
+        self.bridge.viewportChanged.connect(self._on_viewport_changed)
+        self.web_channel = QWebChannel(self)
+        self.web_channel.registerObject("dilasaBridge", self.bridge)
+        self._viewport = None      # ((west, south, east, north), zoom) as last reported by the page
+        self._records_layer = None # (BBoxGridIndex, rings, ids, color)
+        self.density_grids = DensityGrids() # Kept across layer changes, so a new filter only re-bins the records that differ
+
+        self.temp_map_file = None
+        self._page_ready = False
+        self._web_view_scheduled = False
+        self._pending_scripts = {} # Latest script per target while the page is loading, in the order last queued
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.web_view is None and not self._web_view_scheduled:
+            self._web_view_scheduled = True
+            QTimer.singleShot(0, self.create_web_view) # After the window's first paint
+
+    def create_web_view(self):
+        """Creates the web view, installs the tile cache and loads the map page. Runs once, on first show."""
+        if self.web_view is not None: return
+        from PySide6.QtWebEngineWidgets import QWebEngineView
         self.web_view = QWebEngineView()
-        
         settings = self.web_view.settings()
         settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
         settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
         settings.setAttribute(QWebEngineSettings.WebAttribute.ScrollAnimatorEnabled, True)
+        self.layout().replaceWidget(self.placeholder_label, self.web_view)
+        self.placeholder_label.deleteLater()
 
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(self.web_view)
-        self.setLayout(layout)
-        
-        self.temp_map_file = None
-        self._initialize_map()
+        if self.tile_cache_path:
+            try:
+                self.tile_scheme_handler = TileSchemeHandler(self.tile_cache_path, self)
+                profile = self.web_view.page().profile()
+                if profile.urlSchemeHandler(TILE_URL_SCHEME) is None: profile.installUrlSchemeHandler(TILE_URL_SCHEME, self.tile_scheme_handler)
+            except Exception as e:
+                print(f"Warning: Tile cache unavailable, map tiles will load from the network: {e}")
+                if self.tile_scheme_handler: self.tile_scheme_handler.close()
+                self.tile_scheme_handler = None
 
-    def _initialize_map(self, lat=20.5937, lon=78.9629, zoom=5): 
-        """Initializes the map with Esri Satellite as the default base layer."""
-        # Default to Esri Satellite
-        m = folium.Map(
-            location=[lat, lon], 
-            zoom_start=zoom, 
-            tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-            attr='Esri World Imagery' # Attribution for Esri
-        )
-        
-        # Add other base layers for selection
-        folium.TileLayer('openstreetmap', name='OpenStreetMap').add_to(m)
-        folium.TileLayer('CartoDB positron', name='CartoDB Positron (Light)').add_to(m)
-        # The Esri layer is already the base, but we can add it to LayerControl explicitly if needed or for consistency
-        # If we want it to appear in LayerControl with a specific name, add it again (it won't duplicate the base map itself)
-        folium.TileLayer(
-            tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-            attr='Esri',
-            name='Esri Satellite (Default)', # Name for LayerControl
-            overlay=False, # Base layer
-            control=True # Show in LayerControl
-        ).add_to(m)
+        self.web_view.page().setWebChannel(self.web_channel)
+        self.web_view.loadFinished.connect(self._on_load_finished)
+        self._initialize_map()
 
+    def _build_base_map(self, lat=DEFAULT_MAP_CENTER[0], lon=DEFAULT_MAP_CENTER[1], zoom=DEFAULT_MAP_ZOOM):
+        """Base map with Esri Satellite as the default layer, street and light maps selectable."""
+        import folium
+        m = folium.Map(location=[lat, lon], zoom_start=zoom, tiles=None)
+        for i, (provider, name, attribution) in enumerate(BASEMAP_LAYERS):
+            # Through the tile cache when it is available, straight from the provider otherwise
+            tiles = f"{TILE_URL_SCHEME.decode()}://{provider}/{{z}}/{{x}}/{{y}}" if self.tile_scheme_handler else TILE_PROVIDERS[provider][0]
+            folium.TileLayer(tiles=tiles, attr=attribution, name=name, overlay=False, control=True, show=(i == 0), max_zoom=MAX_SEED_ZOOM).add_to(m)
         folium.LayerControl().add_to(m)
-        self.update_map(m)
+        return m
 
-    def update_map(self, folium_map_object):
+    def _initialize_map(self, lat=DEFAULT_MAP_CENTER[0], lon=DEFAULT_MAP_CENTER[1], zoom=DEFAULT_MAP_ZOOM):
+        """Loads the persistent map page. Only done once; later updates go through _send()."""
+        from branca.element import JavascriptLink
+        m = self._build_base_map(lat, lon, zoom)
+        m.get_root().header.add_child(JavascriptLink(QWEBCHANNEL_SCRIPT_URL))
+        _map_message_handler().add_to(m)
+        self._load_page(m)
+
+    def _load_page(self, folium_map_object):
         if self.temp_map_file and os.path.exists(self.temp_map_file):
-            try: os.remove(self.temp_map_file) 
+            try: os.remove(self.temp_map_file)
             except OSError as e: print(f"Error removing old temp map file: {e}")
-            self.temp_map_file = None 
+            self.temp_map_file = None
 
+        self._page_ready = False
         try:
             fd, new_temp_file_path = tempfile.mkstemp(suffix=".html", prefix="map_view_")
-            os.close(fd) 
-            self.temp_map_file = new_temp_file_path 
+            os.close(fd)
+            self.temp_map_file = new_temp_file_path
             folium_map_object.save(self.temp_map_file)
             self.web_view.setUrl(QUrl.fromLocalFile(self.temp_map_file))
         except Exception as e:
             print(f"Error saving or loading map: {e}")
             self.web_view.setHtml("<html><body style='display:flex;justify-content:center;align-items:center;height:100%;font-family:sans-serif;'><h1>Error loading map</h1></body></html>")
 
+    def _on_load_finished(self, ok):
+        self._page_ready = ok
+        if not ok: print("Error: Map page failed to load."); return
+        for script in self._pending_scripts.values(): self.web_view.page().runJavaScript(script)
+        self._pending_scripts.clear()
+
+    def _send(self, message, target):
+        """Pushes one message to the page. Until the page has loaded, only the latest message per target is kept."""
+        script = f"dilasaMap.handle({json.dumps(message)});"
+        if self._page_ready: self.web_view.page().runJavaScript(script)
+        else:
+            self._pending_scripts.pop(target, None)
+            self._pending_scripts[target] = script
 
     def display_polygon(self, polygon_coords_lat_lon, centroid_lat_lon=None, zoom_level=18):
         if not polygon_coords_lat_lon:
-            self._initialize_map(); return
-
-        center_loc = centroid_lat_lon if centroid_lat_lon else polygon_coords_lat_lon[0]
-        
-        # Default to Esri Satellite
-        m = folium.Map(
-            location=center_loc, 
-            zoom_start=zoom_level, 
-            tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-            attr='Esri World Imagery',
-            name='Satellite View (Default)'
-        )
-
-        # Add other base layers for selection
-        folium.TileLayer('openstreetmap', name='Street Map').add_to(m)
-        folium.TileLayer('CartoDB positron', name='Light Map').add_to(m)
-        # Explicitly add Esri Satellite to LayerControl if not already covered by default `tiles` in control
-        folium.TileLayer(
-            tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-            attr='Esri',
-            name='Satellite View (Default)', # Name for LayerControl
-            overlay=False,
-            control=True
-        ).add_to(m)
-        
-        folium.Polygon(
-            locations=polygon_coords_lat_lon,
-            color="blue", weight=3, fill=True, fill_color="blue", fill_opacity=0.1,
-            tooltip="Selected Polygon"
-        ).add_to(m)
-        
-        if center_loc:
-            folium.Marker(location=center_loc, tooltip="Polygon Area").add_to(m)
+            self.clear_map(); return
+        marker = centroid_lat_lon if centroid_lat_lon else polygon_coords_lat_lon[0]
+        self._send({"type": "polygon", "coords": [list(point) for point in polygon_coords_lat_lon],
+                    "marker": list(marker), "zoom": zoom_level}, "selection")
 
-        folium.LayerControl().add_to(m)
-        self.update_map(m)
+    def fit_bounds(self, south_west_lat_lon, north_east_lat_lon, max_zoom=18):
+        self._send({"type": "fitBounds", "bounds": [list(south_west_lat_lon), list(north_east_lat_lon)], "maxZoom": max_zoom}, "view")
+
+    def set_overlay(self, name, geojson, style=None):
+        """Adds or replaces a named GeoJSON overlay (dict) on the map; geojson=None removes it."""
+        self._send({"type": "overlay", "name": name, "geojson": geojson, "style": style or {}}, f"overlay:{name}")
+
+    def remove_overlay(self, name):
+        self.set_overlay(name, None)
 
     def clear_map(self):
-        self._initialize_map()
+        self._send({"type": "clear"}, "selection")
+
+    def set_records_layer(self, ids, rings, color="#FF7800", fit=False):
+        """
+        Shows many polygons at once: ids are record ids, rings the matching closed (n, k, 2) lon/lat rings.
+        The rings are indexed here and only the part inside the viewport is sent on each pan or zoom;
+        zoomed out, a density grid of the ring centroids is sent instead.
+        """
+        rings = np.asarray(rings, dtype=float)
+        if not len(rings): self.clear_records_layer(); return
+        index = BBoxGridIndex(ring_bboxes(rings))
+        self.density_grids.sync(ids, rings[:, :-1].mean(axis=1))
+        self._records_layer = (index, rings, np.asarray(ids), color)
+        if fit:
+            bboxes = index.bboxes
+            self.fit_bounds((bboxes[:, 1].min(), bboxes[:, 0].min()), (bboxes[:, 3].max(), bboxes[:, 2].max()))
+        self._send_records_layer()
+
+    def clear_records_layer(self):
+        self._records_layer = None
+        self.density_grids.sync([], [])
+        self._send_records_layer()
+
+    def _on_viewport_changed(self, west, south, east, north, zoom):
+        self._viewport = ((west, south, east, north), zoom)
+        if self._records_layer: self._send_records_layer()
+
+    def _send_records_layer(self):
+        polygons, points, cells, cell_zoom, max_count, color = [], [], [], 0, 0, None
+        if self._records_layer and self._viewport:
+            index, rings, ids, color = self._records_layer
+            (west, south, east, north), zoom = self._viewport
+            pad_x, pad_y = (east - west) * RECORDS_LAYER_VIEWPORT_PADDING, (north - south) * RECORDS_LAYER_VIEWPORT_PADDING
+            viewport = (west - pad_x, south - pad_y, east + pad_x, north + pad_y)
+            if zoom <= RECORDS_LAYER_DENSITY_MAX_ZOOM: cells, cell_zoom, max_count = self.density_grids.cells(viewport, zoom)
+            else: polygons, points = viewport_layer(index, rings, ids, viewport, zoom)
+        self._send({"type": "records", "polygons": polygons, "points": points, "cells": cells, "cellZoom": cell_zoom,
+                    "cellPixels": self.density_grids.cell_pixels, "maxCount": max_count, "color": color}, "records")
 
     def cleanup(self):
+        if self.tile_scheme_handler: self.tile_scheme_handler.close()
         if self.temp_map_file and os.path.exists(self.temp_map_file):
             try: os.remove(self.temp_map_file)
             except OSError as e: print(f"Error removing temp map file during cleanup: {e}")
         self.temp_map_file = None
-